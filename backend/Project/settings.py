@@ -36,10 +36,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework_simplejwt',
     'rest_framework',
     'drf_spectacular',
+    'channels',
     'user',
     # 'stumart',
     'vendor',
@@ -100,6 +102,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Project.wsgi.application'
+ASGI_APPLICATION = 'Project.asgi.application'
 
 
 # Database
@@ -132,6 +135,72 @@ DATABASES = {
     )
 }
 
+# Cache
+# Redis when REDIS_URL is set, else memcached when MEMCACHED_LOCATION is
+# (comma-separated host:port list) — either is shared by
+# every worker. Otherwise a per-process in-memory cache, which is what
+# tests and local dev use. Cache-aside helpers live in stumart.caching.
+
+REDIS_URL = config('REDIS_URL', default='')
+MEMCACHED_LOCATION = config('MEMCACHED_LOCATION', default='')
+CACHE_KEY_PREFIX = config('CACHE_KEY_PREFIX', default='stumart')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                # A Redis outage degrades to cache misses instead of 500s
+                'IGNORE_EXCEPTIONS': True,
+            },
+        }
+    }
+elif MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': [host.strip() for host in MEMCACHED_LOCATION.split(',') if host.strip()],
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'OPTIONS': {
+                'no_delay': True,
+                'ignore_exc': True,
+                'use_pooling': True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'stumart',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+        }
+    }
+
+# Channels
+# WebSocket push (chat.realtime) fans out through Redis when available so
+# every ASGI worker sees every event; the in-memory layer serves tests and
+# single-process local dev.
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -304,6 +373,8 @@ EMAIL_PORT = 587
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Newsletter campaigns are paced to stay under the SMTP provider's sending limits
+NEWSLETTER_SEND_RATE_PER_MINUTE = config('NEWSLETTER_SEND_RATE_PER_MINUTE', default=120, cast=int)
 ADMIN_EMAIL = config('ADMIN_EMAIL')
 
 PAYSTACK_SECRET_KEY = config('PAYSTACK_SECRET_KEY')
@@ -377,7 +448,13 @@ except Exception as e:
 
 PAYSTACK_SECRET_KEY = os.getenv('PAYSTACK_SECRET_KEY', 'your-secret-key-here')
 PAYSTACK_PUBLIC_KEY = os.getenv('PAYSTACK_PUBLIC_KEY', 'your-public-key-here')
-PAYSTACK_BASE_URL = 'https://api.paystack.co'
+# Overridable so payouts can be exercised against a local fake Paystack server
+PAYSTACK_BASE_URL = os.getenv('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+# Concurrent transfer requests when paying out a multi-vendor order
+PAYSTACK_TRANSFER_WORKERS = int(os.getenv('PAYSTACK_TRANSFER_WORKERS', '8'))
+# check_payout_status: concurrent transfer verifications and their requests-per-second ceiling
+PAYOUT_RECONCILE_WORKERS = int(os.getenv('PAYOUT_RECONCILE_WORKERS', '8'))
+PAYOUT_RECONCILE_RATE = float(os.getenv('PAYOUT_RECONCILE_RATE', '10'))
 
 # Withdrawal Settings
 MIN_WITHDRAWAL_AMOUNT = 5000  # ₦1,000
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Contact
+from .models import Contact, DailyPlatformMetrics, InstitutionStockMetrics, NewsletterCampaign
 
 # Register your models here.
 
@@ -10,3 +10,27 @@ class ContactAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
 admin.site.register(Contact, ContactAdmin)
+
+
+class NewsletterCampaignAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'institution', 'user_type', 'status', 'total_recipients', 'sent_count', 'failed_count', 'created_at')
+    search_fields = ('subject', 'institution')
+    list_filter = ('status', 'user_type', 'created_at')
+    ordering = ('-created_at',)
+    readonly_fields = ('total_recipients', 'sent_count', 'failed_count', 'created_at', 'started_at', 'completed_at')
+admin.site.register(NewsletterCampaign, NewsletterCampaignAdmin)
+
+
+class DailyPlatformMetricsAdmin(admin.ModelAdmin):
+    list_display = ('day', 'signups', 'orders', 'paid_orders', 'gmv', 'updated_at')
+    ordering = ('-day',)
+    readonly_fields = ('updated_at',)
+admin.site.register(DailyPlatformMetrics, DailyPlatformMetricsAdmin)
+
+
+class InstitutionStockMetricsAdmin(admin.ModelAdmin):
+    list_display = ('institution', 'day', 'products', 'out_of_stock')
+    search_fields = ('institution',)
+    list_filter = ('day',)
+    ordering = ('-day', 'institution')
+admin.site.register(InstitutionStockMetrics, InstitutionStockMetricsAdmin)
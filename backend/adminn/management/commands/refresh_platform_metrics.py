@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from adminn.metrics import DAILY_WINDOW_DAYS, refresh_all
+
+
+class Command(BaseCommand):
+    help = 'Refresh the materialized admin dashboard metrics (scheduled every five minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=DAILY_WINDOW_DAYS,
+            help=f'Recent days of daily history to recompute (default: {DAILY_WINDOW_DAYS})'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the entire daily history instead of the recent window'
+        )
+
+    def handle(self, *args, **options):
+        snapshot, day_rows, institutions = refresh_all(days=max(options['days'], 1), full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Platform metrics refreshed at {snapshot.refreshed_at:%Y-%m-%d %H:%M:%S}: "
+                f"{day_rows} day(s) of history, {institutions} institution stock row(s)"
+            )
+        )
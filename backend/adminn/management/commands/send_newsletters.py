@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from adminn.newsletter import send_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued newsletter campaigns (throttled, resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Recipients claimed per batch; each batch shares one SMTP connection (default: 100)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new campaigns instead of exiting once everything is sent'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=10.0,
+            help='Seconds to wait between polls when idle in --loop mode (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_retried = total_failed = 0
+
+        while True:
+            sent, retried, failed = send_batch(options['batch_size'])
+            total_sent += sent
+            total_retried += retried
+            total_failed += failed
+
+            if sent or retried or failed:
+                self.stdout.write(f"Batch: {sent} sent, {retried} retrying, {failed} failed")
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Newsletters delivered: {total_sent} sent, {total_retried} retrying, {total_failed} failed"
+            )
+        )
@@ -0,0 +1,248 @@
+# metrics.py
+"""
+Materialized platform metrics for the admin dashboard.
+
+The dashboard used to aggregate the User, Order and Product tables on
+every load. Those numbers are now written into summary tables by
+``python manage.py refresh_platform_metrics`` (stumart.scheduler runs it
+every five minutes) and the dashboard reads them back:
+
+    PlatformMetricsSnapshot    current totals, one row  (dashboard cards)
+    DailyPlatformMetrics       signups / orders / GMV per day (trends)
+    InstitutionStockMetrics    products and out-of-stock per school per day
+
+A refresh is three grouped queries for the snapshot plus two for the
+recent daily window, whatever the table sizes. Orders are bucketed by the
+day they were created; since an order's status keeps changing after that
+day, each refresh recomputes the last ``DAILY_WINDOW_DAYS`` days
+(``--full`` rebuilds the whole history). Stock levels are point-in-time,
+so each refresh overwrites today's row per institution and earlier days
+keep the last value recorded for them.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from stumart.models import Order, Product
+from user.models import User
+from vendor.analytics import PAID_STATUSES
+from .models import DailyPlatformMetrics, InstitutionStockMetrics, PlatformMetricsSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PK = 1
+# Older than this and the snapshot is served flagged as stale while one
+# dashboard request recomputes it (the scheduled refresh isn't running)
+SNAPSHOT_MAX_AGE = timedelta(minutes=30)
+REFRESH_LOCK_KEY = 'adminn:metrics:refresh'
+REFRESH_LOCK_SECONDS = 300
+DAILY_WINDOW_DAYS = 7
+PICKER_TYPES = ('picker', 'student_picker')
+
+
+# ── Snapshot ──────────────────────────────────────────────────────────────────
+
+def refresh_snapshot():
+    """Recompute the dashboard totals into the snapshot row and return it."""
+    users = User.objects.aggregate(
+        total=Count('id'),
+        students=Count('id', filter=Q(user_type='student')),
+        vendors=Count('id', filter=Q(user_type='vendor')),
+        pickers=Count('id', filter=Q(user_type__in=PICKER_TYPES)),
+    )
+
+    orders_by_status, paid = {}, {'sales': None, 'tax': None}
+    rows = (
+        Order.objects.values('order_status')
+        .annotate(n=Count('id'), sales=Sum('total'), tax=Sum('tax'))
+        .order_by()
+    )
+    for row in rows:
+        orders_by_status[row['order_status']] = row['n']
+        if row['order_status'] == 'PAID':
+            paid = row
+
+    products = Product.objects.aggregate(
+        total=Count('id'),
+        out_of_stock=Count('id', filter=Q(in_stock=0)),
+    )
+
+    snapshot, _ = PlatformMetricsSnapshot.objects.update_or_create(
+        pk=SNAPSHOT_PK,
+        defaults={
+            'users_total': users['total'],
+            'students': users['students'],
+            'vendors': users['vendors'],
+            'pickers': users['pickers'],
+            # Dashboard semantics: "orders" and "sales" mean orders sitting in PAID
+            'orders_paid': orders_by_status.get('PAID', 0),
+            'orders_pending': orders_by_status.get('PENDING', 0),
+            'orders_by_status': orders_by_status,
+            'total_sales': paid['sales'] or 0,
+            'total_profit': paid['tax'] or 0,
+            'products_total': products['total'],
+            'products_out_of_stock': products['out_of_stock'],
+            'refreshed_at': timezone.now(),
+        },
+    )
+    return snapshot
+
+
+def _is_stale(snapshot):
+    return snapshot.refreshed_at < timezone.now() - SNAPSHOT_MAX_AGE
+
+
+def current_snapshot():
+    """
+    The stored snapshot, with ``is_stale`` set. Computed on the spot only
+    when none exists yet; a stale one is recomputed by whichever request
+    takes the refresh lock, and everyone else is served the stale row.
+    """
+    snapshot = PlatformMetricsSnapshot.objects.filter(pk=SNAPSHOT_PK).first()
+    if snapshot is None:
+        logger.info("No platform metrics snapshot yet; computing one now")
+        snapshot = refresh_snapshot()
+    elif _is_stale(snapshot) and cache.add(REFRESH_LOCK_KEY, 1, REFRESH_LOCK_SECONDS):
+        # The lock is left to expire, so a failing refresh isn't retried on every load
+        logger.warning("Platform metrics snapshot is from %s; is refresh_platform_metrics scheduled?",
+                       snapshot.refreshed_at)
+        try:
+            with transaction.atomic():
+                snapshot = refresh_snapshot()
+        except Exception:
+            logger.exception("Refreshing the platform metrics snapshot failed; serving the stale one")
+    snapshot.is_stale = _is_stale(snapshot)
+    return snapshot
+
+
+# ── Daily history ─────────────────────────────────────────────────────────────
+
+def refresh_daily(days=DAILY_WINDOW_DAYS, full=False):
+    """
+    Rebuild DailyPlatformMetrics for the last ``days`` days (or everything
+    when ``full``) with one GROUP BY over users and one over orders.
+    Returns the number of day rows written.
+    """
+    since = None if full else timezone.localdate() - timedelta(days=days - 1)
+
+    users = User.objects.all()
+    orders = Order.objects.all()
+    if since is not None:
+        users = users.filter(date_joined__date__gte=since)
+        orders = orders.filter(created_at__date__gte=since)
+
+    buckets = {}
+
+    def bucket(day):
+        if day not in buckets:
+            buckets[day] = DailyPlatformMetrics(
+                day=day, signups=0, signups_by_type={}, orders=0,
+                orders_by_status={}, paid_orders=0, gmv=Decimal('0'),
+            )
+        return buckets[day]
+
+    signup_rows = (
+        users.annotate(day=TruncDate('date_joined'))
+        .values('day', 'user_type').annotate(n=Count('id')).order_by()
+    )
+    for row in signup_rows:
+        entry = bucket(row['day'])
+        entry.signups += row['n']
+        entry.signups_by_type[row['user_type']] = row['n']
+
+    order_rows = (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('day', 'order_status').annotate(n=Count('id'), total=Sum('total')).order_by()
+    )
+    for row in order_rows:
+        entry = bucket(row['day'])
+        entry.orders += row['n']
+        entry.orders_by_status[row['order_status']] = row['n']
+        if row['order_status'] in PAID_STATUSES:
+            entry.paid_orders += row['n']
+            entry.gmv += row['total'] or 0
+
+    with transaction.atomic():
+        stale = DailyPlatformMetrics.objects.all()
+        if since is not None:
+            stale = stale.filter(day__gte=since)
+        stale.delete()
+        DailyPlatformMetrics.objects.bulk_create(buckets.values(), batch_size=1000)
+
+    return len(buckets)
+
+
+def snapshot_stock(day=None):
+    """Record today's product and out-of-stock counts per institution. One GROUP BY."""
+    day = day or timezone.localdate()
+    rows = (
+        Product.objects.values('institution')
+        .annotate(products=Count('id'), out_of_stock=Count('id', filter=Q(in_stock=0)))
+        .order_by()
+    )
+    with transaction.atomic():
+        InstitutionStockMetrics.objects.filter(day=day).delete()
+        InstitutionStockMetrics.objects.bulk_create([
+            InstitutionStockMetrics(
+                institution=row['institution'] or '',
+                day=day,
+                products=row['products'],
+                out_of_stock=row['out_of_stock'],
+            )
+            for row in rows
+        ], batch_size=1000)
+    return len(rows)
+
+
+def refresh_all(days=DAILY_WINDOW_DAYS, full=False):
+    snapshot = refresh_snapshot()
+    day_rows = refresh_daily(days=days, full=full)
+    institutions = snapshot_stock()
+    return snapshot, day_rows, institutions
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def daily_series(days):
+    """Zero-filled per-day metrics for the last ``days`` days, oldest first. One range read."""
+    today = timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    stored = {row.day: row for row in DailyPlatformMetrics.objects.filter(day__gte=since)}
+
+    series = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        row = stored.get(day)
+        series.append({
+            'day': day.isoformat(),
+            'signups': row.signups if row else 0,
+            'signups_by_type': row.signups_by_type if row else {},
+            'orders': row.orders if row else 0,
+            'orders_by_status': row.orders_by_status if row else {},
+            'paid_orders': row.paid_orders if row else 0,
+            'gmv': float(row.gmv) if row else 0.0,
+        })
+    return series
+
+
+def stock_series(days, institution=None):
+    """``{institution: [{day, products, out_of_stock}, ...]}`` for the last ``days`` days."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = InstitutionStockMetrics.objects.filter(day__gte=since).order_by('institution', 'day')
+    if institution:
+        rows = rows.filter(institution=institution)
+
+    series = {}
+    for row in rows:
+        series.setdefault(row.institution, []).append({
+            'day': row.day.isoformat(),
+            'products': row.products,
+            'out_of_stock': row.out_of_stock,
+        })
+    return series
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminn', '0002_newsletter_campaigns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPlatformMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('signups', models.PositiveIntegerField(default=0)),
+                ('signups_by_type', models.JSONField(default=dict)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('orders_by_status', models.JSONField(default=dict)),
+                ('paid_orders', models.PositiveIntegerField(default=0)),
+                ('gmv', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatformMetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('users_total', models.PositiveIntegerField(default=0)),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('vendors', models.PositiveIntegerField(default=0)),
+                ('pickers', models.PositiveIntegerField(default=0)),
+                ('orders_paid', models.PositiveIntegerField(default=0)),
+                ('orders_pending', models.PositiveIntegerField(default=0)),
+                ('orders_by_status', models.JSONField(default=dict)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('products_total', models.PositiveIntegerField(default=0)),
+                ('products_out_of_stock', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InstitutionStockMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('institution', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('products', models.PositiveIntegerField(default=0)),
+                ('out_of_stock', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', 'institution'],
+                'indexes': [models.Index(fields=['day'], name='inst_stock_day_idx')],
+                'unique_together': {('institution', 'day')},
+            },
+        ),
+    ]
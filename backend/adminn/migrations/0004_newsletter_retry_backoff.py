@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminn', '0003_platform_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsletterrecipient',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -14,3 +14,138 @@ class Contact(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+
+class NewsletterCampaign(models.Model):
+    """A targeted newsletter send; delivered in the background by adminn.newsletter"""
+    STATUS_QUEUED = 'queued'
+    STATUS_SENDING = 'sending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    cta_url = models.CharField(max_length=500, blank=True, default='')
+    cta_text = models.CharField(max_length=100, blank=True, default='')
+    show_recipient_info = models.BooleanField(default=True)
+
+    # Audience filters, kept for the template and for the record
+    state = models.CharField(max_length=100)
+    institution = models.CharField(max_length=255)
+    user_type = models.CharField(max_length=20)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+
+    created_by = models.ForeignKey(
+        'user.User', null=True, blank=True, on_delete=models.SET_NULL, related_name='newsletter_campaigns'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+    @property
+    def pending_count(self):
+        return max(self.total_recipients - self.sent_count - self.failed_count, 0)
+
+
+class NewsletterRecipient(models.Model):
+    """One row per addressee so a campaign can resume exactly where it stopped"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    campaign = models.ForeignKey(NewsletterCampaign, on_delete=models.CASCADE, related_name='recipients')
+    user = models.ForeignKey('user.User', null=True, blank=True, on_delete=models.SET_NULL)
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)  # set while a worker holds the row
+    next_attempt_at = models.DateTimeField(null=True, blank=True)  # retry backoff after a failed send
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['campaign', 'status'], name='newsletter_rcpt_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} - {self.status}"
+
+
+# ── Platform metrics (see adminn.metrics) ─────────────────────────────────────
+
+class PlatformMetricsSnapshot(models.Model):
+    """Latest platform-wide totals for the admin dashboard; a single row (pk=1)"""
+    users_total = models.PositiveIntegerField(default=0)
+    students = models.PositiveIntegerField(default=0)
+    vendors = models.PositiveIntegerField(default=0)
+    pickers = models.PositiveIntegerField(default=0)
+
+    orders_paid = models.PositiveIntegerField(default=0)
+    orders_pending = models.PositiveIntegerField(default=0)
+    orders_by_status = models.JSONField(default=dict)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    products_total = models.PositiveIntegerField(default=0)
+    products_out_of_stock = models.PositiveIntegerField(default=0)
+
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Platform metrics @ {self.refreshed_at:%Y-%m-%d %H:%M}"
+
+
+class DailyPlatformMetrics(models.Model):
+    """Per-day signups, orders and GMV, bucketed by creation date"""
+    day = models.DateField(unique=True)
+    signups = models.PositiveIntegerField(default=0)
+    signups_by_type = models.JSONField(default=dict)
+    orders = models.PositiveIntegerField(default=0)
+    orders_by_status = models.JSONField(default=dict)
+    paid_orders = models.PositiveIntegerField(default=0)
+    gmv = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"{self.day}: {self.orders} orders, {self.signups} signups"
+
+
+class InstitutionStockMetrics(models.Model):
+    """Daily catalogue size and out-of-stock count per institution"""
+    institution = models.CharField(max_length=100)
+    day = models.DateField()
+    products = models.PositiveIntegerField(default=0)
+    out_of_stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day', 'institution']
+        unique_together = ('institution', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='inst_stock_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.institution} {self.day}: {self.out_of_stock}/{self.products} out of stock"
@@ -0,0 +1,214 @@
+# newsletter.py
+"""
+Targeted newsletter campaigns.
+
+The API only records a campaign and snapshots its audience into
+NewsletterRecipient rows; ``python manage.py send_newsletters`` does the
+sending. Each batch reuses one SMTP connection, every recipient's outcome
+is stored on its row (so a restarted worker resumes with the next pending
+address instead of starting over), failed sends are retried with
+exponential backoff, and sends are paced to NEWSLETTER_SEND_RATE_PER_MINUTE
+to stay inside the provider's limits. stumart.scheduler runs the command
+every minute; ``--loop`` runs it as a dedicated worker instead.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from user.models import User
+from .models import NewsletterCampaign, NewsletterRecipient
+
+logger = logging.getLogger(__name__)
+
+VALID_USER_TYPES = ['student', 'vendor', 'picker', 'student_picker', 'all']
+TEMPLATE = 'email/targeted-email.html'
+MAX_ATTEMPTS = 3
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 60 * 60
+STALE_CLAIM_MINUTES = 15
+RECIPIENT_INSERT_BATCH = 1000
+
+
+def send_rate_per_minute():
+    return getattr(settings, 'NEWSLETTER_SEND_RATE_PER_MINUTE', 120)
+
+
+def audience(state, institution, user_type):
+    filters = Q(state=state, institution=institution, is_active=True)
+    if user_type != 'all':
+        filters &= Q(user_type=user_type)
+    return User.objects.filter(filters)
+
+
+def create_campaign(created_by=None, **fields):
+    """
+    Persist a campaign and one pending recipient row per matching user.
+    Returns the campaign (``total_recipients`` may be 0).
+    """
+    with transaction.atomic():
+        campaign = NewsletterCampaign.objects.create(created_by=created_by, **fields)
+
+        users = (
+            audience(campaign.state, campaign.institution, campaign.user_type)
+            .exclude(email='')
+            .values_list('id', 'email')
+            .order_by('id')
+        )
+        batch, total = [], 0
+        for user_id, email in users.iterator(chunk_size=RECIPIENT_INSERT_BATCH):
+            batch.append(NewsletterRecipient(campaign=campaign, user_id=user_id, email=email))
+            if len(batch) >= RECIPIENT_INSERT_BATCH:
+                NewsletterRecipient.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            NewsletterRecipient.objects.bulk_create(batch)
+            total += len(batch)
+
+        campaign.total_recipients = total
+        if not total:
+            campaign.status = NewsletterCampaign.STATUS_COMPLETED
+            campaign.completed_at = timezone.now()
+        campaign.save(update_fields=['total_recipients', 'status', 'completed_at'])
+    return campaign
+
+
+def build_message(campaign, recipient, connection=None):
+    context = {
+        'user': recipient.user,
+        'subject': campaign.subject,
+        'message': campaign.message,
+        'institution': campaign.institution,
+        'state': campaign.state,
+        'user_type': campaign.user_type,
+        'cta_url': campaign.cta_url,
+        'cta_text': campaign.cta_text,
+        'show_recipient_info': campaign.show_recipient_info,
+        'current_year': timezone.now().year,
+    }
+    html_message = render_to_string(TEMPLATE, context)
+    email_msg = EmailMultiAlternatives(
+        subject=campaign.subject,
+        body=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient.email],
+        connection=connection,
+    )
+    email_msg.attach_alternative(html_message, 'text/html')
+    return email_msg
+
+
+def _claim(batch_size):
+    """
+    Claim the next pending recipients that are due (oldest campaign first).
+    SKIP LOCKED plus claimed_at keeps concurrent workers off each other's
+    rows; claims left behind by a crashed worker expire after
+    STALE_CLAIM_MINUTES.
+    """
+    current = timezone.now()
+    stale = current - timedelta(minutes=STALE_CLAIM_MINUTES)
+    with transaction.atomic():
+        rows = list(
+            NewsletterRecipient.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(
+                Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale),
+                Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=current),
+                status=NewsletterRecipient.STATUS_PENDING,
+                campaign__status__in=[NewsletterCampaign.STATUS_QUEUED, NewsletterCampaign.STATUS_SENDING],
+            )
+            .select_related('campaign', 'user')
+            .order_by('campaign_id', 'id')[:batch_size]
+        )
+        NewsletterRecipient.objects.filter(id__in=[row.id for row in rows]).update(claimed_at=current)
+        campaign_ids = {row.campaign_id for row in rows}
+        NewsletterCampaign.objects.filter(
+            id__in=campaign_ids, status=NewsletterCampaign.STATUS_QUEUED
+        ).update(status=NewsletterCampaign.STATUS_SENDING, started_at=timezone.now())
+    return rows
+
+
+def _finish_completed(campaign_ids):
+    for campaign_id in campaign_ids:
+        pending = NewsletterRecipient.objects.filter(
+            campaign_id=campaign_id, status=NewsletterRecipient.STATUS_PENDING
+        ).exists()
+        if not pending:
+            NewsletterCampaign.objects.filter(
+                id=campaign_id, status=NewsletterCampaign.STATUS_SENDING
+            ).update(status=NewsletterCampaign.STATUS_COMPLETED, completed_at=timezone.now())
+
+
+def _record(row, counter):
+    # Persist each outcome as it happens: a worker killed mid-batch never
+    # re-sends what already went out, and progress is live
+    with transaction.atomic():
+        row.save(update_fields=['status', 'attempts', 'error', 'claimed_at', 'next_attempt_at', 'sent_at'])
+        if counter:
+            NewsletterCampaign.objects.filter(id=row.campaign_id).update(**{counter: F(counter) + 1})
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS))
+
+
+def send_batch(batch_size=100):
+    """
+    Send up to ``batch_size`` due newsletter emails over one SMTP
+    connection. Returns ``(sent, retried, failed)``; ``(0, 0, 0)`` means
+    nothing is due.
+    """
+    rows = _claim(batch_size)
+    if not rows:
+        return 0, 0, 0
+
+    interval = 60.0 / max(send_rate_per_minute(), 1)
+    sent = retried = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+        for row in rows:
+            started = time.monotonic()
+            row.attempts += 1
+            row.claimed_at = None
+            counter = None
+            try:
+                build_message(row.campaign, row, connection=connection).send()
+            except Exception as exc:
+                logger.warning("Newsletter %s to %s failed (attempt %d): %s",
+                               row.campaign_id, row.email, row.attempts, exc)
+                row.error = f"{type(exc).__name__}: {exc}"
+                if row.attempts >= MAX_ATTEMPTS:
+                    row.status = NewsletterRecipient.STATUS_FAILED
+                    counter = 'failed_count'
+                    failed += 1
+                else:
+                    # Stays pending; backing off keeps one SMTP outage from
+                    # burning every attempt within seconds
+                    row.next_attempt_at = timezone.now() + _backoff(row.attempts)
+                    retried += 1
+            else:
+                row.status = NewsletterRecipient.STATUS_SENT
+                row.sent_at = timezone.now()
+                row.error = ''
+                counter = 'sent_count'
+                sent += 1
+            _record(row, counter)
+
+            # Throttle to the provider's sending rate
+            remaining = interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+    finally:
+        connection.close()
+
+    _finish_completed({row.campaign_id for row in rows})
+    return sent, retried, failed
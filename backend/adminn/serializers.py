@@ -2,7 +2,7 @@ from rest_framework import serializers
 from user.models import User, Vendor, Picker, StudentPicker, KYCVerification
 from stumart.models import Product, Order, OrderItem, Transaction
 from wallet.models import VendorWallets
-from adminn.models import Contact
+from adminn.models import Contact, NewsletterCampaign
 
 
 # ======================== Dashboard Stats Serializers ========================
@@ -20,6 +20,7 @@ class OrderStatsSerializer(serializers.Serializer):
     total = serializers.IntegerField()
     recent = serializers.IntegerField()
     pending = serializers.IntegerField()
+    by_status = serializers.DictField(child=serializers.IntegerField(), required=False)
 
 
 class FinancialStatsSerializer(serializers.Serializer):
@@ -347,12 +348,32 @@ class SendNewsletterRequestSerializer(serializers.Serializer):
     show_recipient_info = serializers.BooleanField(required=False, default=True)
 
 
+class NewsletterCampaignSerializer(serializers.ModelSerializer):
+    """Campaign with delivery progress"""
+    campaign_id = serializers.IntegerField(source='id', read_only=True)
+    pending = serializers.IntegerField(source='pending_count', read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = NewsletterCampaign
+        fields = [
+            'campaign_id', 'subject', 'state', 'institution', 'user_type', 'status',
+            'total_recipients', 'sent_count', 'failed_count', 'pending', 'progress',
+            'created_at', 'started_at', 'completed_at',
+        ]
+
+    def get_progress(self, obj):
+        """Percentage of recipients processed (sent or permanently failed)"""
+        if not obj.total_recipients:
+            return 100.0
+        return round(100.0 * (obj.sent_count + obj.failed_count) / obj.total_recipients, 1)
+
+
 class SendNewsletterResponseSerializer(serializers.Serializer):
-    """Response serializer for newsletter sending"""
+    """Response serializer for a queued newsletter campaign"""
     message = serializers.CharField()
-    sent = serializers.IntegerField()
-    failed = serializers.IntegerField()
     total = serializers.IntegerField()
+    campaign = NewsletterCampaignSerializer()
     filters = serializers.DictField()
 
 
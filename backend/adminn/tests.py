@@ -1,3 +1,205 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from adminn import metrics, newsletter
+from adminn.models import DailyPlatformMetrics, NewsletterRecipient, PlatformMetricsSnapshot
+from stumart.models import Order, OrderItem, Product, Transaction
+from user.models import User, Vendor
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)  # production settings redirect plain-HTTP test requests
+class AdminListQueryBudgetTest(TestCase):
+    """
+    The admin list endpoints must cost a fixed number of queries per page
+    (COUNT + the page itself) no matter how many rows are on it.
+    """
+    QUERY_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@stumart.test', password='x')
+        cls.picker = User.objects.create_user(
+            email='picker@stumart.test', phone_number='08000000001', user_type='picker',
+            state='Lagos', institution='UNILAG', first_name='Pat', last_name='Picker',
+        )
+        cls.sequence = 0
+
+    @classmethod
+    def add_rows(cls, count):
+        for _ in range(count):
+            cls.sequence += 1
+            n = cls.sequence
+            owner = User.objects.create_user(
+                email=f'vendor{n}@stumart.test', phone_number=f'0810000{n:04d}', user_type='vendor',
+                state='Lagos', institution='UNILAG', first_name='Val', last_name=f'Vendor{n}',
+            )
+            vendor = Vendor.objects.create(
+                user=owner, business_name=f'Shop {n}', business_category='food',
+                bank_name='Bank', account_number='0123456789', account_name='Val',
+            )
+            product = Product.objects.create(
+                vendor=owner, name=f'Item {n}', description='-', price=Decimal('100.00'), in_stock=5,
+            )
+            order = Order.objects.create(
+                order_number=f'ORD{n:06d}', user=owner, picker=cls.picker,
+                first_name='Cus', last_name='Tomer', email=f'buyer{n}@stumart.test', phone='0800',
+                address='Hall 1', subtotal=Decimal('200.00'), shipping_fee=Decimal('0.00'),
+                tax=Decimal('0.00'), total=Decimal('200.00'), order_status='PAID',
+            )
+            for _ in range(2):
+                OrderItem.objects.create(
+                    order=order, product=product, quantity=1, price=Decimal('100.00'), vendor=vendor,
+                )
+            Transaction.objects.create(
+                order=order, transaction_id=f'TXN{n:06d}', amount=Decimal('200.00'), status='SUCCESS',
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assert_constant_queries(self, url):
+        self.add_rows(2)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.add_rows(8)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.data['results']), 2)
+
+        self.assertLessEqual(len(small), self.QUERY_BUDGET)
+        self.assertEqual(len(small), len(large))
+        return response
+
+    def test_users(self):
+        self.assert_constant_queries('/api/admin/users/')
+
+    def test_vendors(self):
+        response = self.assert_constant_queries('/api/admin/vendors/')
+        row = response.data['results'][0]
+        self.assertEqual(row['total_products'], 1)
+        self.assertEqual(row['total_sales'], Decimal('200.00'))
+
+    def test_orders(self):
+        response = self.assert_constant_queries('/api/admin/orders/?status=PAID')
+        row = response.data['results'][0]
+        self.assertEqual(row['items_count'], 2)
+        self.assertEqual(row['picker']['email'], 'picker@stumart.test')
+
+    def test_payments(self):
+        response = self.assert_constant_queries('/api/admin/payments/')
+        self.assertTrue(response.data['results'][0]['order_number'].startswith('ORD'))
+
+    def test_page_size(self):
+        self.add_rows(3)
+        response = self.client.get('/api/admin/orders/?page_size=2')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PlatformMetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@stumart.test', password='x')
+        cls.student = User.objects.create_user(
+            email='student@stumart.test', phone_number='08000000002', user_type='student',
+            state='Lagos', institution='UNILAG', first_name='Sam', last_name='Student',
+        )
+
+    def order(self, n, status='PAID', days_ago=0):
+        order = Order.objects.create(
+            order_number=f'MET{n:06d}', user=self.student,
+            first_name='Cus', last_name='Tomer', email='buyer@stumart.test', phone='0800',
+            address='Hall 1', subtotal=Decimal('200.00'), shipping_fee=Decimal('0.00'),
+            tax=Decimal('10.00'), total=Decimal('210.00'), order_status=status,
+        )
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def test_refresh_is_idempotent(self):
+        self.order(1)
+        self.order(2, status='PENDING')
+
+        first = metrics.refresh_all()
+        first_days = list(DailyPlatformMetrics.objects.values('day', 'orders', 'paid_orders', 'gmv'))
+        second = metrics.refresh_all()
+
+        self.assertEqual(PlatformMetricsSnapshot.objects.count(), 1)
+        self.assertEqual(first[1:], second[1:])
+        self.assertEqual(list(DailyPlatformMetrics.objects.values('day', 'orders', 'paid_orders', 'gmv')), first_days)
+        snapshot = second[0]
+        self.assertEqual((snapshot.orders_paid, snapshot.orders_pending), (1, 1))
+        self.assertEqual(snapshot.total_sales, Decimal('210.00'))
+
+    def test_dashboard_reads_the_snapshot(self):
+        metrics.refresh_snapshot()
+        PlatformMetricsSnapshot.objects.filter(pk=metrics.SNAPSHOT_PK).update(users_total=999)
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/admin/stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_stats']['total'], 999)
+
+    def test_stale_snapshot_is_recomputed_once(self):
+        cache.delete(metrics.REFRESH_LOCK_KEY)
+        stale_at = timezone.now() - metrics.SNAPSHOT_MAX_AGE - timedelta(minutes=1)
+        metrics.refresh_snapshot()
+        PlatformMetricsSnapshot.objects.filter(pk=metrics.SNAPSHOT_PK).update(users_total=999, refreshed_at=stale_at)
+
+        snapshot = metrics.current_snapshot()
+        self.assertEqual(snapshot.users_total, User.objects.count())
+        self.assertFalse(snapshot.is_stale)
+
+        # The refresh lock is still held: later requests serve the stale row instead of recomputing
+        PlatformMetricsSnapshot.objects.filter(pk=metrics.SNAPSHOT_PK).update(users_total=999, refreshed_at=stale_at)
+        with mock.patch('adminn.metrics.refresh_snapshot') as refresh:
+            snapshot = metrics.current_snapshot()
+        refresh.assert_not_called()
+        self.assertEqual(snapshot.users_total, 999)
+        self.assertTrue(snapshot.is_stale)
+
+    def test_full_rebuilds_history_outside_the_window(self):
+        self.order(1, days_ago=30)
+        old_day = timezone.localdate() - timedelta(days=30)
+
+        metrics.refresh_daily()
+        self.assertFalse(DailyPlatformMetrics.objects.filter(day=old_day).exists())
+
+        metrics.refresh_daily(full=True)
+        row = DailyPlatformMetrics.objects.get(day=old_day)
+        self.assertEqual((row.orders, row.paid_orders, row.gmv), (1, 1, Decimal('210.00')))
+
+
+class NewsletterRetryTest(SimpleTestCase):
+    @mock.patch('adminn.newsletter._finish_completed')
+    @mock.patch('adminn.newsletter._record')
+    @mock.patch('adminn.newsletter.get_connection')
+    @mock.patch('adminn.newsletter.build_message', side_effect=OSError('SMTP down'))
+    def test_failed_send_backs_off_before_retrying(self, build_message, get_connection, record, finish):
+        row = NewsletterRecipient(campaign_id=1, email='a@b.c', attempts=1)
+        with mock.patch('adminn.newsletter._claim', return_value=[row]), \
+                mock.patch('adminn.newsletter.send_rate_per_minute', return_value=60000):
+            self.assertEqual(newsletter.send_batch(), (0, 1, 0))
+
+        self.assertEqual(row.status, NewsletterRecipient.STATUS_PENDING)
+        self.assertEqual(row.attempts, 2)
+        self.assertIsNone(row.claimed_at)
+        self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=newsletter.BACKOFF_BASE_SECONDS))
+        self.assertEqual(newsletter._backoff(2).total_seconds(), 2 * newsletter.BACKOFF_BASE_SECONDS)
+        self.assertEqual(newsletter._backoff(20).total_seconds(), newsletter.BACKOFF_MAX_SECONDS)
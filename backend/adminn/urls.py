@@ -1,9 +1,11 @@
 from django.urls import path
 from .views import (
     DashboardStatsAPIView,
+    DashboardTrendsAPIView,
     GetUserCountByFiltersView,
     SendTargetedNewsletterView,
     SendTargetedNewsletterView, 
+    NewsletterCampaignView,
     UsersAPIView, 
     VendorsAPIView, 
     PickersAPIView, 
@@ -19,6 +21,7 @@ from .views import (
 urlpatterns = [
     # Dashboard overview
     path('admin/stats/', DashboardStatsAPIView.as_view(), name='dashboard_stats'),
+    path('admin/stats/trends/', DashboardTrendsAPIView.as_view(), name='dashboard_trends'),
     
     # Users management
     path('admin/users/', UsersAPIView.as_view(), name='users_list'),
@@ -52,5 +55,7 @@ urlpatterns = [
 
   
     path('admin/send-targeted-newsletter/', SendTargetedNewsletterView.as_view(), name='send-newsletter'),
+    path('admin/newsletter-campaigns/', NewsletterCampaignView.as_view(), name='newsletter-campaigns'),
+    path('admin/newsletter-campaigns/<int:campaign_id>/', NewsletterCampaignView.as_view(), name='newsletter-campaign-detail'),
     path('admin/user-targeted-count/', GetUserCountByFiltersView.as_view(), name='user-count'),
 ]
\ No newline at end of file
@@ -3,13 +3,18 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
-from django.db.models import Count, Sum, Avg, Q
+from django.db.models import Count, Sum, Avg, Q, OuterRef, Subquery, Value, DecimalField, IntegerField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 from user.models import User, Vendor, Picker, StudentPicker, KYCVerification
 from stumart.models import Product, Order, OrderItem, Transaction
 from wallet.models import VendorWallets
 from .serializers import*
+from .models import NewsletterCampaign
+from . import metrics, newsletter
+from stumart.paginations import CustomPagination
 from django.conf import settings
 from django.core.mail import send_mail
 import logging
@@ -18,6 +23,35 @@ logger = logging.getLogger(__name__)
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+
+# ── List pagination ───────────────────────────────────────────────────────────
+# Admin tables are served one page at a time (``?page=``, ``?page_size=``).
+# Every queryset below carries its per-row extras as annotations or joins,
+# so a page costs the same fixed number of queries — a COUNT and the page
+# itself — however many rows the table holds.
+
+class AdminListPagination(CustomPagination):
+    page_size = 50
+    max_page_size = 200
+
+
+def paginated_response(request, queryset, to_dict):
+    paginator = AdminListPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response([to_dict(row) for row in page])
+
+
+def filter_created_between(queryset, request, field='created_at'):
+    """Apply ``?created_from=`` / ``?created_to=`` (YYYY-MM-DD, inclusive)."""
+    created_from = parse_date(request.query_params.get('created_from', '') or '')
+    created_to = parse_date(request.query_params.get('created_to', '') or '')
+    if created_from:
+        queryset = queryset.filter(**{f'{field}__date__gte': created_from})
+    if created_to:
+        queryset = queryset.filter(**{f'{field}__date__lte': created_to})
+    return queryset
+
+
 class DashboardStatsAPIView(APIView):
     """API endpoint for dashboard overview statistics"""
     permission_classes = [IsAuthenticated]
@@ -32,12 +66,31 @@ class DashboardStatsAPIView(APIView):
             )
 
         try:
+            snapshot = metrics.current_snapshot()
             return Response({
-                'user_stats': self._get_user_stats(),
-                'order_stats': self._get_order_stats(),
-                'financial_stats': self._get_financial_stats(),
-                'product_stats': self._get_product_stats(),
-                'last_updated': timezone.now().isoformat()
+                'user_stats': {
+                    'total': snapshot.users_total,
+                    'breakdown': {
+                        'students': snapshot.students,
+                        'vendors': snapshot.vendors,
+                        'pickers': snapshot.pickers
+                    }
+                },
+                'order_stats': {
+                    'total': snapshot.orders_paid,
+                    'pending': snapshot.orders_pending,
+                    'by_status': snapshot.orders_by_status
+                },
+                'financial_stats': {
+                    'total_sales': float(snapshot.total_sales),
+                    'total_profit': float(snapshot.total_profit),
+                },
+                'product_stats': {
+                    'total': snapshot.products_total,
+                    'out_of_stock': snapshot.products_out_of_stock
+                },
+                'last_updated': snapshot.refreshed_at.isoformat(),
+                'stale': snapshot.is_stale
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -47,54 +100,25 @@ class DashboardStatsAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def _get_user_stats(self):
-        """Get user statistics"""
-        user_counts = User.objects.aggregate(
-            total=Count('id'),
-            students=Count('id', filter=Q(user_type='student')),
-            vendors=Count('id', filter=Q(user_type='vendor')),
-            pickers=Count('id', filter=Q(user_type__in=['picker', 'student_picker']))
-        )
-
-        return {
-            'total': user_counts['total'],
-            'breakdown': {
-                'students': user_counts['students'],
-                'vendors': user_counts['vendors'],
-                'pickers': user_counts['pickers']
-            }
-        }
-
-    def _get_order_stats(self):
-        """Get order statistics"""
-        return {
-            'total': Order.objects.filter(order_status='PAID').count(),
-            'pending': Order.objects.filter(order_status='PENDING').count()
-        }
-
-    def _get_financial_stats(self):
-        """Get financial statistics"""
-        financial_data = Order.objects.filter(order_status='PAID').aggregate(
-            total_sales=Sum('total'),
-            total_profit=Sum('tax'),
-        )
 
-        return {
-            'total_sales': float(financial_data['total_sales'] or 0),
-            'total_profit': float(financial_data['total_profit'] or 0),
-        }
+class DashboardTrendsAPIView(APIView):
+    """Daily history behind the dashboard cards, read from the metrics tables"""
+    permission_classes = [IsAdminUser]
+    MAX_DAYS = 365
 
-    def _get_product_stats(self):
-        """Get product statistics"""
-        product_counts = Product.objects.aggregate(
-            total=Count('id'),
-            out_of_stock=Count('id', filter=Q(in_stock=0))
-        )
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        days = max(1, min(days, self.MAX_DAYS))
+        institution = request.query_params.get('institution', '')
 
-        return {
-            'total': product_counts['total'],
-            'out_of_stock': product_counts['out_of_stock']
-        }
+        return Response({
+            'days': days,
+            'daily': metrics.daily_series(days),
+            'out_of_stock_by_institution': metrics.stock_series(days, institution or None),
+        })
 
 
 class UsersAPIView(APIView):
@@ -106,7 +130,7 @@ class UsersAPIView(APIView):
         user_type = request.query_params.get('user_type', '')
         verified = request.query_params.get('verified', '')
         
-        users = User.objects.all()
+        users = User.objects.all().order_by('-date_joined', '-id')
         
         if query:
             users = users.filter(
@@ -122,26 +146,28 @@ class UsersAPIView(APIView):
         if verified:
             is_verified = verified.lower() == 'true'
             users = users.filter(is_verified=is_verified)
-            
-        user_data = []
-        for user in users:
-            user_dict = {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'phone_number': user.phone_number,
-                'user_type': user.user_type,
-                'is_verified': user.is_verified,
-                'date_joined': user.date_joined,
-                'institution': user.institution,
-                'profile_pic': str(user.profile_pic) if user.profile_pic else None,
-                'is_active': user.is_active
-            }
-            user_data.append(user_dict)
-            # print("API Response:", user_data)
-            
-        return Response(user_data)
+
+        institution = request.query_params.get('institution', '')
+        if institution:
+            users = users.filter(institution=institution)
+
+        return paginated_response(request, users, self.user_dict)
+
+    @staticmethod
+    def user_dict(user):
+        return {
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'phone_number': user.phone_number,
+            'user_type': user.user_type,
+            'is_verified': user.is_verified,
+            'date_joined': user.date_joined,
+            'institution': user.institution,
+            'profile_pic': str(user.profile_pic) if user.profile_pic else None,
+            'is_active': user.is_active
+        }
     
     def put(self, request, user_id):
         try:
@@ -163,26 +189,29 @@ class VendorsAPIView(APIView):
     permission_classes = [IsAdminUser]
     
     def get(self, request):
-        from django.db.models import Count
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
         query = request.query_params.get('query', '')
         category = request.query_params.get('category', '')
         verified = request.query_params.get('verified', '')
         state = request.query_params.get('state', '')
         institution = request.query_params.get('institution', '')
         
-        # Debug logging
-        logger.info(f"Filters: category={category}, query={query}, verified={verified}, state={state}, institution={institution}")
-        
-        # Build base queryset with optimized queries
+        # Product count and sales come from correlated subqueries rather than
+        # joins: joining both relations would multiply rows and inflate the Sum
+        product_count = (
+            Product.objects.filter(vendor_id=OuterRef('user_id'))
+            .order_by().values('vendor_id').annotate(n=Count('id')).values('n')
+        )
+        sales_total = (
+            OrderItem.objects.filter(vendor_id=OuterRef('pk'))
+            .order_by().values('vendor_id').annotate(total=Sum('price')).values('total')
+        )
         vendors = Vendor.objects.select_related('user').annotate(
-            total_products=Count('user__products', distinct=True)
-        ).all()
-        
-        logger.info(f"Total vendors before filters: {vendors.count()}")
+            total_products=Coalesce(Subquery(product_count, output_field=IntegerField()), Value(0)),
+            total_sales=Coalesce(
+                Subquery(sales_total, output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(0), output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        ).order_by('-user__date_joined', '-id')
         
         if query:
             vendors = vendors.filter(
@@ -194,7 +223,6 @@ class VendorsAPIView(APIView):
         
         if category:
             vendors = vendors.filter(business_category=category.lower())
-            logger.info(f"Vendors after category filter '{category.lower()}': {vendors.count()}")
             
         if verified:
             is_verified = verified.lower() == 'true'
@@ -206,46 +234,33 @@ class VendorsAPIView(APIView):
         
         if institution:
             vendors = vendors.filter(user__institution=institution)
-            
-        logger.info(f"Final vendor count: {vendors.count()}")
-            
-        vendor_data = []
-        for vendor in vendors:
-            # Get total sales with optimized query
-            total_sales = OrderItem.objects.filter(vendor=vendor).aggregate(
-                total=Sum('price'))['total'] or 0
-            
-            vendor_dict = {
-                'id': vendor.id,
-                'user_id': vendor.user.id,
-                'email': vendor.user.email,
-                'business_name': vendor.business_name,
-                'business_category': vendor.business_category,
-                'specific_category': vendor.specific_category,
-                'shop_image': str(vendor.shop_image) if vendor.shop_image else None,
-                'rating': vendor.rating,
-                'total_ratings': vendor.total_ratings,
-                'is_verified': vendor.user.is_verified,
-                'bank_name': vendor.bank_name,
-                'account_number': vendor.account_number,
-                'account_name': vendor.account_name,
-                'date_joined': vendor.user.date_joined,
-                'user_name': f"{vendor.user.first_name} {vendor.user.last_name}",
-                'phone_number': vendor.user.phone_number,
-                'state': vendor.user.state,
-                'institution': vendor.user.institution,
-                'total_products': vendor.total_products,
-                'total_sales': total_sales
-            }
-            
-            vendor_data.append(vendor_dict)
-        
-        # Debug: include available categories and counts
-        from django.db.models import Count as CountFunc
-        category_counts = Vendor.objects.values('business_category').annotate(count=CountFunc('id')).order_by('-count')
-        logger.info(f"Available categories in DB: {list(category_counts)}")
-            
-        return Response(vendor_data)
+
+        return paginated_response(request, vendors, self.vendor_dict)
+
+    @staticmethod
+    def vendor_dict(vendor):
+        return {
+            'id': vendor.id,
+            'user_id': vendor.user.id,
+            'email': vendor.user.email,
+            'business_name': vendor.business_name,
+            'business_category': vendor.business_category,
+            'specific_category': vendor.specific_category,
+            'shop_image': str(vendor.shop_image) if vendor.shop_image else None,
+            'rating': vendor.rating,
+            'total_ratings': vendor.total_ratings,
+            'is_verified': vendor.user.is_verified,
+            'bank_name': vendor.bank_name,
+            'account_number': vendor.account_number,
+            'account_name': vendor.account_name,
+            'date_joined': vendor.user.date_joined,
+            'user_name': f"{vendor.user.first_name} {vendor.user.last_name}",
+            'phone_number': vendor.user.phone_number,
+            'state': vendor.user.state,
+            'institution': vendor.user.institution,
+            'total_products': vendor.total_products,
+            'total_sales': vendor.total_sales
+        }
     
     def put(self, request, vendor_id):
         try:
@@ -398,7 +413,11 @@ class OrdersAPIView(APIView):
         query = request.query_params.get('query', '')
         status_filter = request.query_params.get('status', '')
         
-        orders = Order.objects.all().order_by('-created_at')
+        orders = (
+            Order.objects.select_related('picker')
+            .annotate(items_count=Count('order_items'))
+            .order_by('-created_at', '-id')
+        )
         
         if query:
             orders = orders.filter(
@@ -411,36 +430,41 @@ class OrdersAPIView(APIView):
             
         if status_filter:
             orders = orders.filter(order_status=status_filter)
-            
-        order_data = []
-        for order in orders:
-            order_dict = {
-                'id': order.id,
-                'order_number': order.order_number,
-                'customer_name': f"{order.first_name} {order.last_name}",
-                'email': order.email,
-                'phone': order.phone,
-                'address': order.address,
-                'subtotal': order.subtotal,
-                'shipping_fee': order.shipping_fee,
-                'tax': order.tax,
-                'total': order.total,
-                'status': order.order_status,
-                'created_at': order.created_at,
-                'items_count': order.order_items.count()
+
+        picker_id = request.query_params.get('picker', '')
+        if picker_id.isdigit():
+            orders = orders.filter(picker_id=picker_id)
+
+        orders = filter_created_between(orders, request)
+
+        return paginated_response(request, orders, self.order_dict)
+
+    @staticmethod
+    def order_dict(order):
+        order_dict = {
+            'id': order.id,
+            'order_number': order.order_number,
+            'customer_name': f"{order.first_name} {order.last_name}",
+            'email': order.email,
+            'phone': order.phone,
+            'address': order.address,
+            'subtotal': order.subtotal,
+            'shipping_fee': order.shipping_fee,
+            'tax': order.tax,
+            'total': order.total,
+            'status': order.order_status,
+            'created_at': order.created_at,
+            'items_count': order.items_count
+        }
+        
+        # Get picker info if assigned
+        if order.picker:
+            order_dict['picker'] = {
+                'id': order.picker.id,
+                'name': f"{order.picker.first_name} {order.picker.last_name}",
+                'email': order.picker.email
             }
-            
-            # Get picker info if assigned
-            if order.picker:
-                order_dict['picker'] = {
-                    'id': order.picker.id,
-                    'name': f"{order.picker.first_name} {order.picker.last_name}",
-                    'email': order.picker.email
-                }
-            
-            order_data.append(order_dict)
-            
-        return Response(order_data)
+        return order_dict
     
     def get_order_detail(self, request, order_id):
         try:
@@ -532,7 +556,7 @@ class PaymentsAPIView(APIView):
         query = request.query_params.get('query', '')
         status_filter = request.query_params.get('status', '')
         
-        transactions = Transaction.objects.all().order_by('-created_at')
+        transactions = Transaction.objects.select_related('order').order_by('-created_at', '-id')
         
         if query:
             transactions = transactions.filter(
@@ -543,22 +567,27 @@ class PaymentsAPIView(APIView):
             
         if status_filter:
             transactions = transactions.filter(status=status_filter)
-            
-        transaction_data = []
-        for transaction in transactions:
-            transaction_dict = {
-                'id': transaction.id,
-                'transaction_id': transaction.transaction_id,
-                'order_number': transaction.order.order_number,
-                'customer_name': f"{transaction.order.first_name} {transaction.order.last_name}",
-                'amount': transaction.amount,
-                'status': transaction.status,
-                'payment_method': transaction.payment_method,
-                'created_at': transaction.created_at
-            }
-            transaction_data.append(transaction_dict)
-            
-        return Response(transaction_data)
+
+        payment_method = request.query_params.get('payment_method', '')
+        if payment_method:
+            transactions = transactions.filter(payment_method=payment_method)
+
+        transactions = filter_created_between(transactions, request)
+
+        return paginated_response(request, transactions, self.transaction_dict)
+
+    @staticmethod
+    def transaction_dict(transaction):
+        return {
+            'id': transaction.id,
+            'transaction_id': transaction.transaction_id,
+            'order_number': transaction.order.order_number,
+            'customer_name': f"{transaction.order.first_name} {transaction.order.last_name}",
+            'amount': transaction.amount,
+            'status': transaction.status,
+            'payment_method': transaction.payment_method,
+            'created_at': transaction.created_at
+        }
     
     def get_vendor_wallets(self, request):
         """Get all vendor wallets for payouts"""
@@ -825,7 +854,9 @@ class VendorProductsListView(APIView):
 
 class SendTargetedNewsletterView(APIView):
     """
-    Send newsletter to specific user types within a state and institution
+    Queue a newsletter to specific user types within a state and institution.
+    Delivery happens in the background (manage.py send_newsletters); poll
+    NewsletterCampaignView for progress.
     """
     permission_classes = [IsAuthenticated]
     
@@ -849,93 +880,51 @@ class SendTargetedNewsletterView(APIView):
                 )
             
             # Validate user_type
-            valid_user_types = ['student', 'vendor', 'picker', 'student_picker', 'all']
-            if user_type not in valid_user_types:
+            if user_type not in newsletter.VALID_USER_TYPES:
                 return Response(
-                    {'error': f'Invalid user_type. Must be one of: {", ".join(valid_user_types)}'},
+                    {'error': f'Invalid user_type. Must be one of: {", ".join(newsletter.VALID_USER_TYPES)}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Build query filters
-            filters = Q(state=state, institution=institution, is_active=True)
-            
-            # Add user_type filter if not 'all'
-            if user_type != 'all':
-                filters &= Q(user_type=user_type)
-            
-            # Get filtered users
-            recipients = User.objects.filter(filters)
+            filters = {
+                'state': state,
+                'institution': institution,
+                'user_type': user_type
+            }
             
-            if not recipients.exists():
+            if not newsletter.audience(state, institution, user_type).exists():
                 return Response(
                     {
                         'message': 'No users found matching the criteria',
                         'count': 0,
-                        'filters': {
-                            'state': state,
-                            'institution': institution,
-                            'user_type': user_type
-                        }
+                        'filters': filters
                     },
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Send emails to each recipient
-            sent_count = 0
-            failed_count = 0
-            
-            for user in recipients:
-                try:
-                    # Prepare context for the email template
-                    context = {
-                        'user': user,
-                        'subject': subject,
-                        'message': message,
-                        'institution': institution,
-                        'state': state,
-                        'user_type': user_type,
-                        'cta_url': cta_url,
-                        'cta_text': cta_text,
-                        'show_recipient_info': show_recipient_info,
-                        'current_year': timezone.now().year,
-                    }
-                    
-                    # Render HTML email
-                    html_message = render_to_string('email/targeted-email.html', context)
-                    plain_message = strip_tags(html_message)
-                    
-                    # Send email
-                    send_mail(
-                        subject=subject,
-                        message=plain_message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                        html_message=html_message,
-                        fail_silently=False,
-                    )
-                    
-                    sent_count += 1
-                    
-                except Exception as email_error:
-                    failed_count += 1
-                    print(f"Failed to send email to {user.email}: {str(email_error)}")
+            # Persist the campaign and its recipient list; the worker sends it
+            campaign = newsletter.create_campaign(
+                created_by=request.user,
+                subject=subject,
+                message=message,
+                cta_url=cta_url or '',
+                cta_text=cta_text or '',
+                show_recipient_info=show_recipient_info,
+                **filters
+            )
             
             return Response(
                 {
-                    'message': f'Newsletter sending completed',
-                    'sent': sent_count,
-                    'failed': failed_count,
-                    'total': recipients.count(),
-                    'filters': {
-                        'state': state,
-                        'institution': institution,
-                        'user_type': user_type
-                    }
+                    'message': 'Newsletter queued for delivery',
+                    'total': campaign.total_recipients,
+                    'campaign': NewsletterCampaignSerializer(campaign).data,
+                    'filters': filters
                 },
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
                 
         except Exception as e:
+            logger.exception("Failed to queue newsletter")
             return Response(
                 {
                     'error': 'An error occurred while processing the request',
@@ -945,6 +934,27 @@ class SendTargetedNewsletterView(APIView):
             )
 
 
+class NewsletterCampaignView(APIView):
+    """
+    Newsletter campaigns and their delivery progress
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request, campaign_id=None):
+        if campaign_id is not None:
+            try:
+                campaign = NewsletterCampaign.objects.get(id=campaign_id)
+            except NewsletterCampaign.DoesNotExist:
+                return Response({'error': 'Campaign not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(NewsletterCampaignSerializer(campaign).data, status=status.HTTP_200_OK)
+        
+        campaigns = NewsletterCampaign.objects.all()[:50]
+        return Response(
+            {'campaigns': NewsletterCampaignSerializer(campaigns, many=True).data},
+            status=status.HTTP_200_OK
+        )
+
+
 class GetUserCountByFiltersView(APIView):
     """
     Get count of users matching the filters before sending newsletter
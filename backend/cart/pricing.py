@@ -0,0 +1,124 @@
+"""
+cart/pricing.py
+───────────────
+Cart pricing engine shared by the cart summary and checkout.
+
+``CartPricing`` takes the cart items from one query (``priced_items``
+select-relates everything pricing and the cart serializer touch) and
+works out subtotal, vendors, food / non-food categories and the
+registered delivery fee in a single in-memory pass.
+
+Registered delivery fees (order.models.Vendor) are looked up in a
+``(institution, business name) → fee`` map that is built with one query,
+kept in the shared cache and dropped whenever an order-app Vendor or
+School changes (order/signals.py).
+"""
+from decimal import Decimal
+import logging
+
+from stumart import caching
+from stumart.models import location_key
+
+from .utils import calculate_shipping_fee, calculate_takeaway_fee
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_FEES_KEY = caching.make_key("cart", "delivery_fees")
+DELIVERY_FEES_TIMEOUT = 60 * 60
+
+
+# ─────────────────────────────────────────────────────────────
+# REGISTERED DELIVERY FEES
+# ─────────────────────────────────────────────────────────────
+
+def _load_delivery_fees():
+    from order.models import Vendor as OrderVendor
+
+    fees = {}
+    rows = (
+        OrderVendor.objects
+        .filter(is_active=True)
+        .values_list("school__name", "business_name", "delivery_fee")
+        .order_by("id")
+    )
+    for school, business_name, fee in rows:
+        fees.setdefault((location_key(school), location_key(business_name)), fee)
+    return fees
+
+
+def delivery_fee_map():
+    """``{(institution, business_name): delivery_fee}`` for active registered vendors, lower-cased keys."""
+    return caching.get_or_set(DELIVERY_FEES_KEY, _load_delivery_fees, DELIVERY_FEES_TIMEOUT)
+
+
+def invalidate_delivery_fees():
+    caching.invalidate(DELIVERY_FEES_KEY)
+
+
+# ─────────────────────────────────────────────────────────────
+# PRICING
+# ─────────────────────────────────────────────────────────────
+
+def product_price(product):
+    """What one unit is charged at: the promotion price when it is a real discount."""
+    promotion_price = product.promotion_price
+    if promotion_price and Decimal("0.00") < promotion_price < product.price:
+        return promotion_price
+    return product.price
+
+
+def priced_items(queryset):
+    """``queryset`` of CartItems with every relation pricing and CartItemSerializer read."""
+    return queryset.select_related(
+        "product", "product__vendor", "product__vendor__vendor_profile", "gift_item",
+    )
+
+
+class CartPricing:
+    """Totals for a set of cart items, computed in one pass over already-loaded rows."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.product_items = [item for item in self.items if item.product_id]
+        self.subtotal = Decimal("0.00")
+        self.categories = set()
+        self.base_delivery_fee = None
+
+        fees = delivery_fee_map() if self.product_items else {}
+        vendor_user_ids = set()
+        profiles = {}
+        for item in self.product_items:
+            product = item.product
+            self.subtotal += product_price(product) * item.quantity
+            vendor_user_ids.add(product.vendor_id)
+
+            profile = getattr(product.vendor, "vendor_profile", None)
+            if profile is None:
+                continue
+            profiles[profile.id] = profile
+            self.categories.add((profile.business_category or "").lower())
+            if self.base_delivery_fee is None:
+                # First cart item whose vendor is registered for its school sets the base fee
+                self.base_delivery_fee = fees.get(
+                    (location_key(product.vendor.institution), location_key(profile.business_name))
+                )
+
+        self.vendor_count = len(vendor_user_ids)
+        self.vendor_profiles = list(profiles.values())
+
+    @property
+    def has_food(self):
+        return "food" in self.categories
+
+    @property
+    def has_non_food(self):
+        return bool(self.categories - {"food"})
+
+    def shipping_fee(self, vendor_is_nearby=False):
+        if vendor_is_nearby:
+            return Decimal("0.00")
+        return calculate_shipping_fee(self.vendor_count, self.base_delivery_fee)
+
+    @property
+    def takeaway(self):
+        return calculate_takeaway_fee(self.has_food)
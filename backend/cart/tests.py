@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from cart.pricing import DELIVERY_FEES_KEY, CartPricing
+from stumart import caching
+from stumart.models import CartItem, Product
+from user.models import User, Vendor
+
+
+def cart_item(pk, vendor_user, price, quantity, promotion_price=None):
+    product = Product(pk=pk, vendor=vendor_user, price=Decimal(price), promotion_price=promotion_price)
+    return CartItem(pk=pk, product=product, quantity=quantity)
+
+
+class CartPricingTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        caching.get_or_set(DELIVERY_FEES_KEY, lambda: {('unilag', 'mama put'): Decimal('500.00')}, 60)
+
+        self.food = User(pk=1, institution='UNILAG ')
+        Vendor(pk=1, user=self.food, business_name='Mama Put', business_category='food')
+        self.books = User(pk=2, institution='UNILAG')
+        Vendor(pk=2, user=self.books, business_name='Page One', business_category='books')
+
+    def test_totals_from_one_pass(self):
+        pricing = CartPricing([
+            cart_item(1, self.food, '1000.00', 2, promotion_price=Decimal('800.00')),
+            cart_item(2, self.books, '300.00', 1, promotion_price=Decimal('400.00')),
+            CartItem(pk=3, quantity=1),  # gift item
+        ])
+
+        self.assertEqual(pricing.subtotal, Decimal('1900.00'))
+        self.assertEqual(pricing.vendor_count, 2)
+        self.assertEqual(len(pricing.product_items), 2)
+        self.assertTrue(pricing.has_food and pricing.has_non_food)
+        # Registered base fee 500 + two-vendor surcharge 100
+        self.assertEqual(pricing.shipping_fee(), Decimal('600.00'))
+        self.assertEqual(pricing.shipping_fee(vendor_is_nearby=True), Decimal('0.00'))
+        self.assertEqual(pricing.takeaway, Decimal('300.00'))
+
+    def test_unregistered_vendor_uses_fallback_tier(self):
+        pricing = CartPricing([cart_item(1, self.books, '300.00', 1)])
+
+        self.assertIsNone(pricing.base_delivery_fee)
+        self.assertEqual(pricing.shipping_fee(), Decimal('800.00'))
+        self.assertEqual(pricing.takeaway, Decimal('0.00'))
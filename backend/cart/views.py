@@ -4,9 +4,7 @@
 # Cart is fetched/created via request.user — no cart_code anywhere.
 
 import logging
-from decimal import Decimal
 
-from django.db.models import Case, Count, DecimalField, F, OuterRef, Subquery, Sum, When
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -21,7 +19,8 @@ from .serializers import (
     CartSummaryResponseSerializer,
     UpdateCartItemRequestSerializer,
 )
-from .utils import TAX_FEE, SHIPPING_FEE, calculate_shipping_fee, calculate_takeaway_fee
+from .pricing import CartPricing, priced_items
+from .utils import TAX_FEE
 
 logger = logging.getLogger(__name__)
 
@@ -193,64 +192,20 @@ class CartItemsView(APIView):
         base_qs = CartItem.objects.filter(cart=cart)
         selected_vendor_id = request.query_params.get("selected_vendor_id")
         if selected_vendor_id:
-            selected_vendor_user_id = (
-                Vendor.objects
-                .filter(id=selected_vendor_id)
-                .values_list("user_id", flat=True)
-                .first()
-            )
-            base_qs = base_qs.filter(product__vendor_id=selected_vendor_user_id)
-
-        # Subquery: distinct vendor count
-        vendor_subquery = (
-            base_qs.values("cart")
-            .annotate(vendor_count=Count("product__vendor", distinct=True))
-            .values("vendor_count")[:1]
-        )
-
-        # Subquery: subtotal respecting promotion_price
-        subtotal_subquery = (
-            base_qs.values("cart")
-            .annotate(
-                sub_total=Sum(
-                    Case(
-                        When(
-                            product__promotion_price__gt=0,
-                            then=F("product__promotion_price") * F("quantity"),
-                        ),
-                        default=F("product__price") * F("quantity"),
-                        output_field=DecimalField(),
-                    )
-                )
-            )
-            .values("sub_total")[:1]
-        )
-
-        cart_items = (
-            base_qs
-            .select_related("product", "product__vendor", "product__vendor__vendor_profile")
-            .annotate(
-                vendor_count=Subquery(vendor_subquery),
-                sub_total=Subquery(subtotal_subquery),
-            )
-        )
+            base_qs = base_qs.filter(product__vendor__vendor_profile__id=selected_vendor_id)
 
-        if cart_items.exists():
-            sub_total    = cart_items[0].sub_total    or Decimal("0.00")
-            vendor_count = cart_items[0].vendor_count or 0
-        else:
-            sub_total    = Decimal("0.00")
-            vendor_count = 0
+        # One query for the items; totals are worked out in memory
+        pricing = CartPricing(priced_items(base_qs))
 
-        shipping_fee = calculate_shipping_fee(vendor_count, cart_items)
-        # shipping_fee = SHIPPING_FEE
-        takeaway     = calculate_takeaway_fee(cart_items)
+        sub_total    = pricing.subtotal
+        shipping_fee = pricing.shipping_fee()
+        takeaway     = pricing.takeaway
         tax          = TAX_FEE
         total        = sub_total + shipping_fee + tax + takeaway
 
         response_data = {
-            "items":        CartItemSerializer(cart_items, many=True).data,
-            "count":        cart_items.count(),
+            "items":        CartItemSerializer(pricing.items, many=True).data,
+            "count":        len(pricing.items),
             "sub_total":    sub_total,
             "shipping_fee": shipping_fee,
             "tax":          tax,
@@ -0,0 +1,33 @@
+# consumers.py
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import user_group
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    One socket per client tab. Joins the user's group and relays every
+    event pushed through chat.realtime (new messages, unread counters,
+    order status changes). Clients may send {"type": "ping"} as a keepalive.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def push(self, event):
+        await self.send_json(event['payload'])
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:26
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Conversation = apps.get_model('chat', 'Conversation')
+    Message = apps.get_model('chat', 'Message')
+
+    def unread_from(sender_type):
+        return Coalesce(
+            Subquery(
+                Message.objects.filter(
+                    conversation=OuterRef('pk'), sender_type=sender_type, is_read=False
+                ).order_by().values('conversation').annotate(n=Count('pk')).values('n')[:1]
+            ),
+            Value(0),
+        )
+
+    Conversation.objects.update(
+        user_unread_count=unread_from('vendor'),
+        vendor_unread_count=unread_from('user'),
+        changed_at=F('updated_at'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_initial'),
+        ('stumart', '0005_product_search_vector'),
+        ('user', '0004_user_residence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='vendor_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', 'changed_at'], name='chat_conv_user_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['vendor', 'changed_at'], name='chat_conv_vendor_changed_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
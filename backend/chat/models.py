@@ -1,7 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from user.models import User, Vendor
 from stumart.models import ServiceApplication
 
+from . import realtime
+
+def _lock_conversation(conversation_id):
+    """Row-lock a conversation for the rest of the current transaction."""
+    list(Conversation.objects.select_for_update().filter(pk=conversation_id).values_list('pk', flat=True))
+
+
 class Conversation(models.Model):
     """Unified conversation model for user-vendor messaging"""
     
@@ -44,6 +53,15 @@ class Conversation(models.Model):
     )
     last_message_at = models.DateTimeField(null=True, blank=True)
     
+    # Unread counters per participant — maintained by Message.save() and
+    # mark_read() so chat lists never have to count messages
+    user_unread_count = models.PositiveIntegerField(default=0)
+    vendor_unread_count = models.PositiveIntegerField(default=0)
+    
+    # Bumped whenever anything shown in the chat list changes (new message,
+    # read receipt); drives the ?since= delta mode of the chat list
+    changed_at = models.DateTimeField(default=timezone.now)
+    
     # Status
     is_active = models.BooleanField(default=True)
     
@@ -53,6 +71,8 @@ class Conversation(models.Model):
         indexes = [
             models.Index(fields=['user', '-updated_at']),
             models.Index(fields=['vendor', '-updated_at']),
+            models.Index(fields=['user', 'changed_at'], name='chat_conv_user_changed_idx'),
+            models.Index(fields=['vendor', 'changed_at'], name='chat_conv_vendor_changed_idx'),
         ]
     
     def __str__(self):
@@ -65,6 +85,39 @@ class Conversation(models.Model):
             return self.user
         else:
             return self.vendor
+    
+    @staticmethod
+    def unread_field(reader_type):
+        """Counter holding ``reader_type``'s unread messages ('user' or 'vendor')."""
+        return f"{reader_type}_unread_count"
+    
+    def unread_count_for(self, reader_type):
+        return getattr(self, self.unread_field(reader_type))
+    
+    def mark_read(self, reader_type):
+        """
+        Mark every message from the other participant as read and zero
+        ``reader_type``'s counter. The conversation row is locked first (as
+        Message.save() does) so a message arriving mid-way is never lost
+        from the counter.
+        """
+        sender_type = 'vendor' if reader_type == 'user' else 'user'
+        field = self.unread_field(reader_type)
+        
+        with transaction.atomic():
+            _lock_conversation(self.pk)
+            updated = Message.objects.filter(
+                conversation=self,
+                sender_type=sender_type,
+                is_read=False
+            ).update(is_read=True, read_at=timezone.now())
+            if updated or self.unread_count_for(reader_type):
+                self.changed_at = timezone.now()
+                Conversation.objects.filter(pk=self.pk).update(**{field: 0, 'changed_at': self.changed_at})
+                setattr(self, field, 0)
+                realtime.push_unread(self, reader_type)
+        
+        return updated
 
 
 class Message(models.Model):
@@ -142,21 +195,36 @@ class Message(models.Model):
         elif self.sender_type == 'vendor':
             self.sender_user = None
         
-        # Update conversation's last message info
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        if not is_new:
+            return super().save(*args, **kwargs)
+        
+        # Update conversation's last message info and bump the recipient's
+        # unread counter in the same transaction, under the row lock
+        recipient_type = 'vendor' if self.sender_type == 'user' else 'user'
+        unread_field = Conversation.unread_field(recipient_type)
+        
+        with transaction.atomic():
+            _lock_conversation(self.conversation_id)
+            super().save(*args, **kwargs)
+            Conversation.objects.filter(pk=self.conversation_id).update(**{
+                'last_message': self.content,
+                'last_message_sender': self.sender_type,
+                'last_message_at': self.created_at,
+                'updated_at': self.created_at,
+                'changed_at': self.created_at,
+                unread_field: F(unread_field) + 1,
+            })
+        
+        conversation = self.conversation
+        conversation.last_message = self.content
+        conversation.last_message_sender = self.sender_type
+        conversation.last_message_at = self.created_at
+        conversation.updated_at = self.created_at
+        conversation.changed_at = self.created_at
+        setattr(conversation, unread_field, getattr(conversation, unread_field) + 1)
         
-        if is_new:
-            self.conversation.last_message = self.content
-            self.conversation.last_message_sender = self.sender_type
-            self.conversation.last_message_at = self.created_at
-            self.conversation.updated_at = self.created_at
-            self.conversation.save(update_fields=[
-                'last_message', 
-                'last_message_sender', 
-                'last_message_at', 
-                'updated_at'
-            ])
+        realtime.push_new_message(self)
 
 
 class MessageReadStatus(models.Model):
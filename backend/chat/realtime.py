@@ -0,0 +1,91 @@
+# realtime.py
+"""
+Server → client push over Django Channels.
+
+Every authenticated WebSocket joins one group per user (see consumers.py);
+anything that wants to notify a user calls ``push_to_users`` and the event
+is delivered to all of that user's open connections. Pushes are sent after
+the surrounding transaction commits and are best-effort: a channel layer
+outage is logged, never raised into the request that triggered it.
+
+Event payloads are ``{"type": "<event>", ...}`` with types:
+
+    chat.message    a new message in one of the user's conversations
+    chat.unread     a conversation's unread counter changed
+    order.status    one of the user's orders changed status
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+
+def _send(user_ids, payload):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for user_id in user_ids:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                user_group(user_id), {'type': 'push', 'payload': payload}
+            )
+        except Exception:
+            logger.exception("Failed to push %s to user %s", payload.get('type'), user_id)
+
+
+def push_to_users(user_ids, payload):
+    """Deliver ``payload`` to every open connection of ``user_ids`` once the transaction commits."""
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if user_ids:
+        transaction.on_commit(lambda: _send(user_ids, payload))
+
+
+# ── Chat ──────────────────────────────────────────────────────────────────────
+
+def participant_user_id(conversation, participant_type):
+    """User id behind a conversation participant ('user' or 'vendor')."""
+    if participant_type == 'user':
+        return conversation.user_id
+    return conversation.vendor.user_id
+
+
+def push_new_message(message):
+    from .serializers import MessageSerializer
+
+    conversation = message.conversation
+    recipient_type = 'vendor' if message.sender_type == 'user' else 'user'
+    push_to_users(
+        [participant_user_id(conversation, 'user'), participant_user_id(conversation, 'vendor')],
+        {
+            'type': 'chat.message',
+            'conversation_id': conversation.id,
+            'message': MessageSerializer(message).data,
+        },
+    )
+    push_unread(conversation, recipient_type)
+
+
+def push_unread(conversation, reader_type):
+    push_to_users([participant_user_id(conversation, reader_type)], {
+        'type': 'chat.unread',
+        'conversation_id': conversation.id,
+        'unread_count': conversation.unread_count_for(reader_type),
+    })
+
+
+# ── Orders ────────────────────────────────────────────────────────────────────
+
+def push_order_status(order, status, vendor_user_ids=()):
+    push_to_users([order.user_id, *vendor_user_ids], {
+        'type': 'order.status',
+        'order_id': order.id,
+        'order_number': order.order_number,
+        'status': status,
+    })
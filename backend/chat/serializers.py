@@ -26,6 +26,8 @@ class ChatListResponseSerializer(serializers.Serializer):
     conversations = serializers.JSONField()
     total_unread = serializers.IntegerField()
     user_type = serializers.CharField()
+    since = serializers.DateTimeField(allow_null=True)
+    next_since = serializers.DateTimeField()
 
 
 class ServiceApplicationSerializer(serializers.Serializer):
@@ -64,11 +66,22 @@ class ConversationDetailResponseSerializer(serializers.Serializer):
     """Response serializer for conversation details"""
     conversation_id = serializers.IntegerField()
     messages = serializers.JSONField()
+    has_more = serializers.BooleanField()
+    oldest_id = serializers.IntegerField(allow_null=True)
+    newest_id = serializers.IntegerField(allow_null=True)
     participant_type = serializers.CharField()
     other_participant_name = serializers.CharField()
     service_name = serializers.CharField()
 
 
+class MessagePageResponseSerializer(serializers.Serializer):
+    """Response serializer for a page of messages"""
+    messages = MessageSerializer(many=True)
+    has_more = serializers.BooleanField()
+    oldest_id = serializers.IntegerField(allow_null=True)
+    newest_id = serializers.IntegerField(allow_null=True)
+
+
 class SendMessageRequestSerializer(serializers.Serializer):
     """Request serializer for sending a message"""
     content = serializers.CharField(required=True, allow_blank=False)
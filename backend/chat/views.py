@@ -4,22 +4,98 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Exists, OuterRef
+from django.db.models import Exists, OuterRef, Sum
 from django.utils import timezone
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 import logging
 
 from .models import (
     ServiceApplication, Conversation, Message, MessageReadStatus
 )
+from stumart.paginations import seek_filter
 from .serializers import (
     MessageSerializer, ConversationListSerializer,
     ServiceApplicationSerializer, SendMessageRequestSerializer,
-    UnreadCountResponseSerializer
+    UnreadCountResponseSerializer, MessagePageResponseSerializer
 )
 
 logger = logging.getLogger(__name__)
 
+CHAT_LIST_SINCE_OVERLAP = timedelta(seconds=5)
+
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 100
+
+
+class MessageAnchorError(ValueError):
+    pass
+
+
+def get_message_page(conversation, params):
+    """
+    One page of a conversation's history, oldest first, seeking on the
+    (conversation, created_at) index instead of loading the whole thread:
+
+        (no anchor)   the latest ``limit`` messages
+        ?before=<id>  up to ``limit`` messages older than <id> (scroll-back)
+        ?after=<id>   up to ``limit`` messages newer than <id> (polling)
+
+    Returns ``(messages, has_more)`` where ``has_more`` means more messages
+    exist beyond the page in the direction being read. Raises
+    MessageAnchorError for malformed parameters or foreign anchors.
+    """
+    try:
+        limit = int(params.get('limit', MESSAGE_PAGE_SIZE))
+        before = params.get('before')
+        after = params.get('after')
+        before = int(before) if before else None
+        after = int(after) if after else None
+    except (TypeError, ValueError):
+        raise MessageAnchorError('limit, before and after must be integers')
+    if before is not None and after is not None:
+        raise MessageAnchorError('Use either before or after, not both')
+    limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+
+    queryset = Message.objects.filter(
+        conversation=conversation
+    ).select_related('sender_user', 'sender_vendor')
+
+    anchor_id = before if before is not None else after
+    forward = after is not None
+    if anchor_id is not None:
+        anchor = Message.objects.filter(
+            conversation=conversation, id=anchor_id
+        ).values('created_at', 'id').first()
+        if anchor is None:
+            raise MessageAnchorError('Message not found in this conversation')
+        queryset = queryset.filter(seek_filter([
+            ('created_at', not forward, anchor['created_at']),
+            ('id', not forward, anchor['id']),
+        ]))
+
+    if forward:
+        queryset = queryset.order_by('created_at', 'id')
+    else:
+        queryset = queryset.order_by('-created_at', '-id')
+
+    # One extra row tells us whether another page exists without counting
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+    return rows, has_more
+
+
+def _page_meta(messages, has_more):
+    return {
+        'has_more': has_more,
+        'oldest_id': messages[0].id if messages else None,
+        'newest_id': messages[-1].id if messages else None,
+    }
+
 
 class ChatListAPIView(APIView):
     """
@@ -27,11 +103,17 @@ class ChatListAPIView(APIView):
     
     Retrieve all conversations for the current user with unread message counts.
     Returns different data based on whether the user is a vendor or student.
+    
+    Pass ?since=<next_since from the previous response> to receive only the
+    conversations that changed since then (total_unread is always the full total).
     """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
     
     @extend_schema(
+        parameters=[
+            OpenApiParameter('since', str, description="ISO timestamp; return only conversations changed since then"),
+        ],
         description="Retrieve all conversations for the current user"
     )
     def get(self, request):
@@ -50,15 +132,33 @@ class ChatListAPIView(APIView):
             
             if is_vendor:
                 conversations_query = Conversation.objects.filter(vendor=user.vendor_profile)
-                unread_filter = Q(messages__sender_type='user', messages__is_read=False)
+                unread_field = Conversation.unread_field('vendor')
             else:
                 conversations_query = Conversation.objects.filter(user=user)
-                unread_filter = Q(messages__sender_type='vendor', messages__is_read=False)
+                unread_field = Conversation.unread_field('user')
+            
+            # Delta mode: only conversations that changed since the client's
+            # last poll. The next cursor overlaps slightly so rows committed
+            # by transactions still in flight are not skipped.
+            since = None
+            since_param = request.query_params.get('since')
+            if since_param:
+                since = parse_datetime(since_param)
+                if since is None:
+                    return Response(
+                        {'error': 'Invalid since timestamp. Use ISO 8601, e.g. 2025-01-31T12:00:00Z'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since)
+            next_since = timezone.now() - CHAT_LIST_SINCE_OVERLAP
+            
+            changed_query = conversations_query
+            if since is not None:
+                changed_query = changed_query.filter(changed_at__gte=since)
             
-            conversations_data = conversations_query.select_related(
+            conversations_data = changed_query.select_related(
                 'user', 'vendor', 'service_application'
-            ).annotate(
-                unread_count=Count('messages', filter=unread_filter)
             ).order_by('-updated_at')
             
             conversations = []
@@ -72,16 +172,21 @@ class ChatListAPIView(APIView):
                     'conversation': conv,
                     'other_participant_name': other_participant_name,
                     'service_name': conv.service_name or 'General Inquiry',
-                    'unread_count': conv.unread_count
+                    'unread_count': getattr(conv, unread_field)
                 })
             
             serializer = ConversationListSerializer(conversations, many=True)
-            total_unread = sum(conv['unread_count'] for conv in conversations)
+            if since is None:
+                total_unread = sum(conv['unread_count'] for conv in conversations)
+            else:
+                total_unread = conversations_query.aggregate(total=Sum(unread_field))['total'] or 0
             
             return Response({
                 'conversations': serializer.data,
                 'total_unread': total_unread,
-                'user_type': 'vendor' if is_vendor else 'student'
+                'user_type': 'vendor' if is_vendor else 'student',
+                'since': since,
+                'next_since': next_since,
             })
             
         except Exception as e:
@@ -288,17 +393,15 @@ class ConversationDetailAPIView(APIView):
                 participant_type = 'user'
                 other_participant_name = conversation.vendor.business_name
             
-            messages_list = Message.objects.filter(
-                conversation=conversation
-            ).select_related('sender_user', 'sender_vendor').order_by('created_at')
+            # Mark messages as read and reset this participant's unread counter
+            conversation.mark_read(participant_type)
             
-            # Mark messages as read
-            opposite_sender_type = 'vendor' if participant_type == 'user' else 'user'
-            Message.objects.filter(
-                conversation=conversation,
-                sender_type=opposite_sender_type,
-                is_read=False
-            ).update(is_read=True, read_at=timezone.now())
+            # Latest page only — older history is fetched via GetMessagesAPIView?before=
+            try:
+                messages_list, has_more = get_message_page(conversation, request.query_params)
+            except MessageAnchorError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            last_message = messages_list[-1] if messages_list else None
             
             # Update read status
             if participant_type == 'user':
@@ -306,18 +409,22 @@ class ConversationDetailAPIView(APIView):
                     conversation=conversation,
                     reader_type='user',
                     reader_user=user,
-                    defaults={'last_read_message': messages_list.last() if messages_list else None}
+                    defaults={'last_read_message': last_message}
                 )
             else:
                 read_status, created = MessageReadStatus.objects.get_or_create(
                     conversation=conversation,
                     reader_type='vendor',
                     reader_vendor=user.vendor_profile,
-                    defaults={'last_read_message': messages_list.last() if messages_list else None}
+                    defaults={'last_read_message': last_message}
                 )
             
-            if not created and messages_list:
-                read_status.last_read_message = messages_list.last()
+            # An older page (?before=) must not move read status backwards
+            if not created and last_message and (
+                read_status.last_read_message_id is None
+                or last_message.id > read_status.last_read_message_id
+            ):
+                read_status.last_read_message = last_message
                 read_status.save()
             
             message_serializer = MessageSerializer(messages_list, many=True)
@@ -325,6 +432,7 @@ class ConversationDetailAPIView(APIView):
             return Response({
                 'conversation_id': conversation.id,
                 'messages': message_serializer.data,
+                **_page_meta(messages_list, has_more),
                 'participant_type': participant_type,
                 'other_participant_name': other_participant_name,
                 'service_name': conversation.service_name or 'General Inquiry'
@@ -414,13 +522,21 @@ class GetMessagesAPIView(APIView):
     """
     Get Messages API
     
-    Retrieve all messages for a specific conversation.
+    Retrieve a page of messages for a specific conversation, oldest first.
+    Without parameters returns the latest messages; ?before=<id> scrolls back,
+    ?after=<id> returns only messages newer than <id> (for polling).
     """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
     
     @extend_schema(
-        description="Retrieve all messages for a conversation"
+        parameters=[
+            OpenApiParameter('before', int, description="Return messages older than this message id"),
+            OpenApiParameter('after', int, description="Return messages newer than this message id"),
+            OpenApiParameter('limit', int, description=f"Page size (default {MESSAGE_PAGE_SIZE}, max {MAX_MESSAGE_PAGE_SIZE})"),
+        ],
+        responses=MessagePageResponseSerializer,
+        description="Retrieve a page of messages for a conversation"
     )
     def get(self, request, conversation_id):
         try:
@@ -445,13 +561,17 @@ class GetMessagesAPIView(APIView):
                         status=status.HTTP_403_FORBIDDEN
                     )
             
-            messages_list = Message.objects.filter(
-                conversation=conversation
-            ).select_related('sender_user', 'sender_vendor').order_by('created_at')
+            try:
+                messages_list, has_more = get_message_page(conversation, request.query_params)
+            except MessageAnchorError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
             serializer = MessageSerializer(messages_list, many=True)
             
-            return Response({'messages': serializer.data})
+            return Response({
+                'messages': serializer.data,
+                **_page_meta(messages_list, has_more),
+            })
             
         except Exception as e:
             logger.error(f"Error in GetMessagesAPIView: {str(e)}", exc_info=True)
@@ -485,17 +605,13 @@ class UnreadCountAPIView(APIView):
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             if hasattr(user, 'vendor_profile') and user.vendor_profile:
-                unread_count = Message.objects.filter(
-                    conversation__vendor=user.vendor_profile,
-                    sender_type='user',
-                    is_read=False
-                ).count()
+                unread_count = Conversation.objects.filter(
+                    vendor=user.vendor_profile
+                ).aggregate(total=Sum('vendor_unread_count'))['total'] or 0
             else:
-                unread_count = Message.objects.filter(
-                    conversation__user=user,
-                    sender_type='vendor',
-                    is_read=False
-                ).count()
+                unread_count = Conversation.objects.filter(
+                    user=user
+                ).aggregate(total=Sum('user_unread_count'))['total'] or 0
             
             return Response({'unread_count': unread_count})
             
@@ -46,7 +46,7 @@ class ProductCategoryRequestSerializer(serializers.Serializer):
 
 class CategoryLastFiveRequestSerializer(serializers.Serializer):
     """Request serializer for CategoryLastFiveView"""
-    pass  # No query parameters required
+    school = serializers.CharField(required=False, allow_blank=True, help_text="School/Institution name (guests only)")
 
 
 class VendorsBySchoolRequestSerializer(serializers.Serializer):
@@ -1,3 +1,14 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from home.views import CategoryLastFiveView
+
+
+class CategoryShelvesTest(SimpleTestCase):
+    def test_shelves_are_one_windowed_query_per_institution(self):
+        sql = str(CategoryLastFiveView().shelf_queryset('unilag').query)
+
+        self.assertIn('ROW_NUMBER() OVER (PARTITION BY "user_vendor"."business_category"', sql)
+        self.assertIn('COUNT("stumart_product"."id") OVER (PARTITION BY "user_vendor"."business_category")', sql)
+        self.assertIn('"shelf_rank" <= 6', sql)
+        self.assertIn('"institution_key" = unilag', sql)
+        self.assertNotIn('institution_key', str(CategoryLastFiveView().shelf_queryset('').query))
@@ -2,7 +2,9 @@ from collections import OrderedDict
 from django.shortcuts import render
 from rest_framework.views import APIView
 from stumart.paginations import CustomPagination
-from stumart.models import Product
+from stumart import caching, catalog_cache
+from stumart.models import Product, location_key
+from stumart.search import filter_products
 from stumart.serializers import ProductSerializer
 from rest_framework.response import Response
 from rest_framework import status
@@ -11,8 +13,8 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import get_user_model
 from decimal import Decimal, InvalidOperation
 import logging
-from django.db.models import Q, Prefetch, Count
-from django.core.cache import cache
+from django.db.models import Q, Prefetch, Count, Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
 from user.serializers import VendorSerializer
 import random
 from django.conf import settings
@@ -163,7 +165,7 @@ class ProductCategoryView(APIView):
                 'vendor__vendor_profile__business_name',
                 'vendor__vendor_profile__business_category',
                 'vendor__vendor_profile__specific_category',
-            ).filter(vendor__kyc__verification_status='approved')
+            ).filter(kyc_approved=True)
 
             # Category
             queryset = queryset.filter(
@@ -181,13 +183,13 @@ class ProductCategoryView(APIView):
                     institution = (getattr(request.user, 'institution', None) or '').strip()
                     if institution:
                         queryset = queryset.filter(
-                            vendor__institution__iexact=institution
+                            institution_key=location_key(institution)
                         )
             else:
                 if state:
-                    queryset = queryset.filter(vendor__state__iexact=state)
+                    queryset = queryset.filter(state_key=location_key(state))
                 if school:
-                    queryset = queryset.filter(vendor__institution__iexact=school)
+                    queryset = queryset.filter(institution_key=location_key(school))
 
             # Vendor
             if vendor_id:
@@ -201,11 +203,7 @@ class ProductCategoryView(APIView):
 
             # Search
             if search:
-                queryset = queryset.filter(
-                    Q(name__icontains=search) |
-                    Q(description__icontains=search) |
-                    Q(vendor__vendor_profile__business_name__icontains=search)
-                )
+                queryset = filter_products(queryset, search)
 
             # Price
             with contextlib.suppress(ValueError, TypeError, InvalidOperation):
@@ -260,13 +258,18 @@ class ProductCategoryView(APIView):
 class CategoryLastFiveView(APIView):
     """
     Category Last Five Products API
-    
-    Get the last 5 (or fewer) products for each category.
-    Results are cached for 5 minutes for performance.
+
+    Get the newest products (up to ``SHELF_SIZE``) for each category, plus
+    each category's total, in a single windowed query. Authenticated users
+    see their institution's shelves; guests may pass ``school``.
+    Cached per institution and invalidated by catalog writes (stumart.catalog_cache).
     """
     permission_classes = [AllowAny]
     serializer_class = CategoryLastFiveResponseSerializer
-    
+
+    SHELF_SIZE = 6
+    EXCLUDED_CATEGORIES = ['', 'Others', 'others']
+
     @extend_schema(
         request=CategoryLastFiveRequestSerializer,
         responses=CategoryLastFiveResponseSerializer,
@@ -274,84 +277,25 @@ class CategoryLastFiveView(APIView):
     )
     def get(self, request):
         try:
-            # Try to get from cache (5 minutes)
-            cache_key = 'category_last_five_products'
-            cached_data = cache.get(cache_key)
-            
-            if cached_data:
-                return Response({
-                    'status': 'success',
-                    'data': cached_data,
-                    'cached': True
-                }, status=status.HTTP_200_OK)
-
-            # Get all unique business categories
-            categories = (
-                User.objects
-                .filter(vendor_profile__isnull=False)
-                .exclude(vendor_profile__business_category__in=['', 'Others', 'others'])
-                .values_list('vendor_profile__business_category', flat=True)
-                .distinct()
+            institution = self._institution(request)
+            scopes = [
+                catalog_cache.institution_scope(institution) if institution
+                else catalog_cache.ALL_INSTITUTIONS
+            ]
+            cache_key = catalog_cache.build_key(
+                'category_last_five', scopes, request, extra={'institution': institution}
+            )
+            response_data, cached = caching.fetch(
+                cache_key,
+                lambda: self._build_shelves(institution),
+                catalog_cache.CATALOG_CACHE_TIMEOUT,
+                namespace='catalog:category_last_five',
             )
-
-            categories_list = list(categories)
-            
-            # Sort with Food first
-            def sort_categories(category):
-                if category.lower() == 'food':
-                    return (0, category.lower())
-                else:
-                    return (1, category.lower())
-            
-            categories_list.sort(key=sort_categories)
-
-            response_data = OrderedDict()
-
-            for category in categories_list:
-                products = (
-                    Product.objects
-                    .select_related('vendor', 'vendor__vendor_profile', 'vendor__kyc')
-                    .filter(
-                        vendor__kyc__verification_status='approved',
-                        vendor__vendor_profile__business_category__iexact=category
-                    )
-                    .only(
-                        'id', 'name', 'description', 'price', 'promotion_price',
-                        'created_at', 'image', 'in_stock', 'vendor_id',
-                        'gender', 'delivery_day',
-                        'vendor__id',
-                        'vendor__vendor_profile__business_name',
-                        'vendor__vendor_profile__business_category',
-                        'vendor__kyc__verification_status'
-                    )
-                    .order_by('-created_at')[:6]
-                )
-
-                if products:
-                    serializer = ProductSerializer(products, many=True)
-                    
-                    total_count = (
-                        Product.objects
-                        .filter(
-                            vendor__vendor_profile__business_category__iexact=category,
-                            vendor__kyc__verification_status='approved'
-                        )
-                        .count()
-                    )
-                    
-                    response_data[category] = {
-                        'category_name': category,
-                        'products': serializer.data,
-                        'total_products': total_count
-                    }
-
-            # Cache the result for 5 minutes
-            cache.set(cache_key, response_data, 300)
 
             return Response({
                 'status': 'success',
                 'data': response_data,
-                'cached': False
+                'cached': cached
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -362,6 +306,54 @@ class CategoryLastFiveView(APIView):
                 'detail': str(e) if settings.DEBUG else 'Internal server error'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _institution(self, request):
+        if request.user.is_authenticated:
+            return location_key(getattr(request.user, 'institution', None))
+        return location_key(request.query_params.get('school'))
+
+    def shelf_queryset(self, institution):
+        """Top ``SHELF_SIZE`` products per category with each category's total — one query."""
+        category = F('vendor__vendor_profile__business_category')
+        queryset = Product.objects.filter(kyc_approved=True, vendor__vendor_profile__isnull=False)
+        if institution:
+            queryset = queryset.filter(institution_key=institution)
+
+        return (
+            queryset
+            .exclude(vendor__vendor_profile__business_category__in=self.EXCLUDED_CATEGORIES)
+            .select_related('vendor', 'vendor__vendor_profile')
+            .only(
+                'id', 'name', 'description', 'price', 'promotion_price',
+                'created_at', 'image', 'in_stock', 'vendor_id',
+                'gender', 'delivery_day',
+                'vendor__id',
+                'vendor__vendor_profile__business_name',
+                'vendor__vendor_profile__business_category',
+            )
+            .annotate(
+                shelf_rank=Window(RowNumber(), partition_by=[category], order_by=[F('created_at').desc(), F('id').desc()]),
+                shelf_total=Window(Count('id'), partition_by=[category]),
+            )
+            .filter(shelf_rank__lte=self.SHELF_SIZE)
+            .order_by('vendor__vendor_profile__business_category', 'shelf_rank')
+        )
+
+    def _build_shelves(self, institution):
+        shelves = defaultdict(list)
+        for product in self.shelf_queryset(institution):
+            shelves[product.vendor.vendor_profile.business_category].append(product)
+
+        # Food first, then alphabetical
+        response_data = OrderedDict()
+        for category in sorted(shelves, key=lambda c: (c.lower() != 'food', c.lower())):
+            products = shelves[category]
+            response_data[category] = {
+                'category_name': category,
+                'products': ProductSerializer(products, many=True).data,
+                'total_products': products[0].shelf_total,
+            }
+        return response_data
+
 
 class VendorsBySchoolView(APIView):
     serializer_class = VendorsBySchoolResponseSerializer
@@ -376,89 +368,35 @@ class VendorsBySchoolView(APIView):
 
         try:
             if school_name:
-                cache_key = f'vendors_by_school_{school_name.lower().replace(" ", "_")}'
-                school_filter = Q(user__institution__iexact=school_name)
+                scope = catalog_cache.institution_scope(school_name)
                 response_school = school_name
             else:
-                cache_key = 'vendors_all_schools'
-                school_filter = Q()
+                scope = catalog_cache.ALL_INSTITUTIONS
                 response_school = 'All Schools'
 
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                return Response({
-                    'status': 'success',
-                    'data': cached_data,
-                    'school': response_school,
-                    'cached': True
-                }, status=status.HTTP_200_OK)
-
-            vendor_user_ids_with_products = set(
-                Product.objects.values_list('vendor_id', flat=True).distinct()
+            cache_key = catalog_cache.build_key(
+                'vendors_by_school', [catalog_cache.VENDORS, scope], request,
+                extra={'school': location_key(school_name)},
             )
-
-            if not vendor_user_ids_with_products:
-                return Response(
-                    {"error": "No vendors with products found"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            all_vendors = (
-                Vendor.objects
-                .select_related('user')
-                .filter(
-                    school_filter,
-                    user_id__in=vendor_user_ids_with_products,
-                    user__kyc__verification_status='approved'
-                )
-                .exclude(business_category__in=['others', 'Others'])
-                .only(
-                    'id', 'business_name', 'business_category',
-                    'shop_image', 'rating', 'user_id',
-                    'user__id', 'user__institution',
-                )
+            response_data, cached = caching.fetch(
+                cache_key,
+                lambda: self._build_categories(school_name),
+                catalog_cache.CATALOG_CACHE_TIMEOUT,
+                namespace='catalog:vendors_by_school',
+                cacheable=bool,
             )
 
-            vendors_list = list(all_vendors)
-
-            if not vendors_list:
+            if not response_data:
                 return Response(
                     {"error": f"No vendors found for {school_name}" if school_name else "No vendors found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            vendors_by_category = defaultdict(list)
-            for vendor in vendors_list:
-                vendors_by_category[vendor.business_category].append(vendor)
-
-            categories_list = sorted(
-                vendors_by_category.keys(),
-                key=lambda c: (0 if c.lower() == 'food' else 1, c.lower())
-            )
-
-            response_data = OrderedDict()
-            for category in categories_list:
-                category_vendors = vendors_by_category[category]
-                total_count = len(category_vendors)
-                selected_vendors = (
-                    random.sample(category_vendors, 5)
-                    if total_count > 5
-                    else category_vendors
-                )
-                response_data[category] = {
-                    'category_name': category,
-                    'vendors': VendorCardSerializer(selected_vendors, many=True).data,
-                    'total_vendors': total_count,
-                    'returned_count': len(selected_vendors)
-                }
-
-            cache.set(cache_key, response_data, 300)
-
             return Response({
                 'status': 'success',
                 'data': response_data,
                 'school': response_school,
-                'cached': False
+                'cached': cached
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -474,7 +412,51 @@ class VendorsBySchoolView(APIView):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-        
+
+    def _build_categories(self, school_name):
+        school_filter = Q(user__institution__iexact=school_name) if school_name else Q()
+        vendors_list = list(
+            Vendor.objects
+            .select_related('user')
+            .filter(
+                school_filter,
+                Exists(Product.objects.filter(vendor_id=OuterRef('user_id'))),
+                user__kyc__verification_status='approved'
+            )
+            .exclude(business_category__in=['others', 'Others'])
+            .only(
+                'id', 'business_name', 'business_category',
+                'shop_image', 'rating', 'user_id',
+                'user__id', 'user__institution',
+            )
+        )
+
+        vendors_by_category = defaultdict(list)
+        for vendor in vendors_list:
+            vendors_by_category[vendor.business_category].append(vendor)
+
+        categories_list = sorted(
+            vendors_by_category.keys(),
+            key=lambda c: (0 if c.lower() == 'food' else 1, c.lower())
+        )
+
+        response_data = OrderedDict()
+        for category in categories_list:
+            category_vendors = vendors_by_category[category]
+            total_count = len(category_vendors)
+            selected_vendors = (
+                random.sample(category_vendors, 5)
+                if total_count > 5
+                else category_vendors
+            )
+            response_data[category] = {
+                'category_name': category,
+                'vendors': VendorCardSerializer(selected_vendors, many=True).data,
+                'total_vendors': total_count,
+                'returned_count': len(selected_vendors)
+            }
+        return response_data
+
 
 class AllVendorNamesView(APIView):
     permission_classes = [AllowAny]
@@ -521,7 +503,7 @@ class HeroProductsView(APIView):
                 'vendor__vendor_profile__business_category',
                 'vendor__vendor_profile__rating',
             ).filter(
-                vendor__kyc__verification_status='approved',
+                kyc_approved=True,
                 vendor__vendor_profile__business_category__iexact='food',
             )
 
@@ -529,7 +511,7 @@ class HeroProductsView(APIView):
             if request.user.is_authenticated:
                 institution = (getattr(request.user, 'institution', None) or '').strip()
                 if institution:
-                    queryset = queryset.filter(vendor__institution__iexact=institution)
+                    queryset = queryset.filter(institution_key=location_key(institution))
 
             queryset = queryset.order_by('-created_at')[:10]
 
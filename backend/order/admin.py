@@ -1,6 +1,6 @@
 # admin.py
 from django.contrib import admin
-from .models import School, Vendor
+from .models import NotificationOutbox, OrderDisbursement, ScanWatermark, School, Vendor
 
 
 class VendorInline(admin.TabularInline):
@@ -71,4 +71,25 @@ class VendorAdmin(admin.ModelAdmin):
     def deactivate_vendors(self, request, queryset):
         updated = queryset.update(is_active=False)
         self.message_user(request, f'{updated} vendor(s) deactivated successfully.')
-    deactivate_vendors.short_description = "Deactivate selected vendors"
\ No newline at end of file
+    deactivate_vendors.short_description = "Deactivate selected vendors"
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['created_at', 'sent_at', 'locked_at']
+    ordering = ['-id']
+
+
+@admin.register(OrderDisbursement)
+class OrderDisbursementAdmin(admin.ModelAdmin):
+    list_display = ['order', 'status', 'attempts', 'next_attempt_at', 'created_at', 'disbursed_at']
+    list_filter = ['status']
+    raw_id_fields = ['order']
+    readonly_fields = ['created_at', 'disbursed_at']
+    ordering = ['-id']
+
+
+@admin.register(ScanWatermark)
+class ScanWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_id', 'updated_at']
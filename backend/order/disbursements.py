@@ -0,0 +1,180 @@
+# disbursements.py
+"""
+Disbursement tracking for COMPLETED orders.
+
+Every completed order gets an ``OrderDisbursement`` row. The customer
+confirmation view writes it (already disbursed) in the same transaction
+that completes the order; ``retry_pending_disbursements`` covers orders
+completed any other way:
+
+    discover   one anti-join over orders above the scan watermark:
+               COMPLETED and confirmed, no OrderDisbursement row yet.
+               Orders that already have payout ledger rows are recorded as
+               disbursed, the rest as pending.
+    advance    the watermark moves up to just below the oldest order that
+               is still in flight (not COMPLETED / CANCELLED) inside the
+               scan window, so an order that completes later is still
+               above it on the next run.
+    retry      pending rows that are due are locked with SKIP LOCKED and
+               re-run through ``process_automated_transfers``; failures
+               back off exponentially and stop at ``max_attempts``. A row
+               with no delivery opportunity, or whose transfers went out
+               before recording failed, is marked failed at once for
+               manual follow-up — retrying can't fix the first and would
+               pay twice for the second.
+
+Each run therefore touches new orders plus the handful still pending,
+instead of every completed order in the window.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .models import OrderDisbursement, ScanWatermark
+
+logger = logging.getLogger(__name__)
+
+SCAN_NAME = 'retry_pending_disbursements'
+DISBURSEMENT_TRANSACTION_TYPES = ('vendor_payment', 'delivery_payment', 'rider_earnings', 'company_earnings')
+SETTLED_ORDER_STATUSES = ('COMPLETED', 'CANCELLED')
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 6 * 60 * 60
+
+
+def record_disbursed(order):
+    """Mark ``order`` as paid out; call inside the transaction that ran its transfers."""
+    OrderDisbursement.objects.update_or_create(
+        order=order,
+        defaults={
+            'status': OrderDisbursement.STATUS_DISBURSED,
+            'attempts': 1,
+            'last_error': '',
+            'disbursed_at': timezone.now(),
+        },
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# DISCOVERY
+# ─────────────────────────────────────────────────────────────
+
+def undisbursed_orders(after_id=0, up_to_id=None, since=None):
+    """COMPLETED, confirmed orders above ``after_id`` that have no disbursement row."""
+    from stumart.models import Order
+    from wallet.models import WalletTransactionAccount
+
+    orders = Order.objects.filter(
+        id__gt=after_id, order_status='COMPLETED', confirm=True,
+    ).filter(
+        ~Exists(OrderDisbursement.objects.filter(order=OuterRef('pk')))
+    ).annotate(
+        has_payouts=Exists(WalletTransactionAccount.objects.filter(
+            order=OuterRef('pk'), transaction_type__in=DISBURSEMENT_TRANSACTION_TYPES,
+        ))
+    ).order_by('id')
+    if up_to_id is not None:
+        orders = orders.filter(id__lte=up_to_id)
+    if since is not None:
+        orders = orders.filter(created_at__gte=since)
+    return orders
+
+
+def discover(hours=24, scan_all=False, dry_run=False):
+    """
+    Record disbursement rows for newly completed orders and advance the
+    watermark. Returns ``(orders_without_payouts, orders_already_paid)``;
+    with ``dry_run`` nothing is written.
+    """
+    from stumart.models import Order
+
+    since = None if scan_all else timezone.now() - timedelta(hours=hours)
+    watermark, _ = ScanWatermark.objects.get_or_create(name=SCAN_NAME)
+    after_id = 0 if scan_all else watermark.last_id
+    ceiling = Order.objects.aggregate(top=Max('id'))['top'] or 0
+
+    found = list(undisbursed_orders(after_id, ceiling, since).select_related('user'))
+    missing = [order for order in found if not order.has_payouts]
+    paid = [order for order in found if order.has_payouts]
+    if dry_run:
+        return missing, paid
+
+    now = timezone.now()
+    OrderDisbursement.objects.bulk_create(
+        [OrderDisbursement(order=order) for order in missing]
+        + [OrderDisbursement(order=order, status=OrderDisbursement.STATUS_DISBURSED, disbursed_at=now) for order in paid],
+        ignore_conflicts=True,
+    )
+
+    in_flight = Order.objects.filter(id__gt=after_id, id__lte=ceiling).exclude(order_status__in=SETTLED_ORDER_STATUSES)
+    if since is not None:
+        in_flight = in_flight.filter(created_at__gte=since)
+    oldest_open = in_flight.aggregate(low=Min('id'))['low']
+    advanced = oldest_open - 1 if oldest_open is not None else ceiling
+    ScanWatermark.objects.filter(pk=watermark.pk, last_id__lt=advanced).update(last_id=advanced, updated_at=now)
+
+    return missing, paid
+
+
+# ─────────────────────────────────────────────────────────────
+# RETRY
+# ─────────────────────────────────────────────────────────────
+
+def due_disbursements(limit):
+    return list(
+        OrderDisbursement.objects
+        .filter(status=OrderDisbursement.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+        .values_list('id', flat=True)
+        .order_by('id')[:limit]
+    )
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS))
+
+
+def disburse(disbursement_id):
+    """
+    Run the payout for one pending row. Returns ``(row, transfer_results)``,
+    ``(row, None)`` on failure, or ``(None, None)`` if another worker holds
+    it or it is no longer pending.
+    """
+    from order.util.payouts import TransfersDispatched
+    from order.utils import process_automated_transfers
+    from wallet.models import DeliveryOpportunity
+
+    with transaction.atomic():
+        row = (
+            OrderDisbursement.objects.select_for_update(skip_locked=True)
+            .select_related('order')
+            .filter(id=disbursement_id, status=OrderDisbursement.STATUS_PENDING)
+            .first()
+        )
+        if row is None:
+            return None, None
+
+        row.attempts += 1
+        results = None
+        opportunity = DeliveryOpportunity.objects.filter(order=row.order).first()
+        try:
+            if opportunity is None:
+                raise LookupError(f"No delivery opportunity for order {row.order.order_number}")
+            with transaction.atomic():
+                results = process_automated_transfers(row.order, opportunity)
+        except Exception as exc:
+            logger.exception("Disbursement for order %s failed on attempt %d", row.order.order_number, row.attempts)
+            row.last_error = f"{type(exc).__name__}: {exc}"
+            permanent = opportunity is None or isinstance(exc, TransfersDispatched)
+            if permanent or row.attempts >= row.max_attempts:
+                row.status = OrderDisbursement.STATUS_FAILED
+            else:
+                row.next_attempt_at = timezone.now() + _backoff(row.attempts)
+        else:
+            row.status = OrderDisbursement.STATUS_DISBURSED
+            row.disbursed_at = timezone.now()
+            row.last_error = ''
+
+        row.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'disbursed_at'])
+    return row, results
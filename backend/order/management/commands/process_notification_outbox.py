@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from order.outbox import process_batch
+
+
+class Command(BaseCommand):
+    help = 'Send queued order notifications (emails, SMS, picker dispatch) from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Rows claimed per batch; each batch shares one SMTP connection (default: 50)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling instead of exiting once the outbox is drained'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when idle in --loop mode (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        totals = [0, 0, 0]
+
+        while True:
+            sent, retried, failed = process_batch(batch_size)
+            for i, n in enumerate((sent, retried, failed)):
+                totals[i] += n
+
+            if sent or retried or failed:
+                self.stdout.write(f"Batch: {sent} sent, {retried} retrying, {failed} failed")
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox drained: {totals[0]} sent, {totals[1]} retrying, {totals[2]} failed"
+            )
+        )
@@ -1,5 +1,6 @@
 # models.py
 from django.db import models
+from django.utils import timezone
 
 class School(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -36,4 +37,95 @@ class Vendor(models.Model):
         unique_together = ['school', 'business_name']
     
     def __str__(self):
-        return f"{self.business_name} - {self.school.name}"
\ No newline at end of file
+        return f"{self.business_name} - {self.school.name}"
+
+class NotificationOutbox(models.Model):
+    """
+    Durable queue of post-order notifications (emails, SMS, picker dispatch).
+
+    Rows are written inside the same transaction that changes the order, so a
+    committed order always has its notifications queued and a rolled-back one
+    never does. The ``process_notification_outbox`` worker drains the table.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'notification_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class OrderDisbursement(models.Model):
+    """
+    Payout state of a COMPLETED order. Written when the customer confirms
+    delivery (or when ``retry_pending_disbursements`` discovers a completed
+    order without one), so the retry job reads this table instead of
+    re-checking every completed order's ledger.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DISBURSED = 'disbursed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DISBURSED, 'Disbursed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    order = models.OneToOneField('stumart.Order', on_delete=models.CASCADE, related_name='disbursement')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    disbursed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'order_disbursements'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='disbursement_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Disbursement for order {self.order_id} ({self.status})"
+
+
+class ScanWatermark(models.Model):
+    """Highest id a periodic scan has fully examined, keyed by scan name."""
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'scan_watermarks'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
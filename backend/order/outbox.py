@@ -0,0 +1,224 @@
+# outbox.py
+"""
+Notification outbox.
+
+Request handlers call ``enqueue_*`` inside their transaction; the rows are
+drained by ``python manage.py process_notification_outbox`` (every 30
+seconds from stumart.scheduler, or as a dedicated worker with ``--loop``),
+which renders and sends each notification over one shared SMTP connection
+per batch and retries failures with exponential backoff.
+
+Each handler receives ``(payload, connection)`` and must raise on failure so
+the row is retried. Handlers are kept small (one recipient or one side
+effect) so a retry never re-sends what already went out.
+"""
+import logging
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+STALE_LOCK_MINUTES = 15
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# ─────────────────────────────────────────────────────────────
+# ENQUEUE
+# ─────────────────────────────────────────────────────────────
+
+def enqueue(kind, **payload):
+    return NotificationOutbox.objects.create(kind=kind, payload=payload)
+
+
+def enqueue_order_paid(order, order_items, vendors_out_of_stock=()):
+    """Queue everything that used to run in on_commit after an order is paid."""
+    vendor_ids = sorted({item.vendor_id for item in order_items if item.vendor_id})
+
+    rows = [
+        NotificationOutbox(kind='out_of_stock_email', payload={'vendor_id': vendor.id})
+        for vendor in vendors_out_of_stock
+    ]
+    rows += [
+        NotificationOutbox(kind='vendor_order_email', payload={'order_id': order.id, 'vendor_id': vendor_id})
+        for vendor_id in vendor_ids
+    ]
+    rows += [
+        NotificationOutbox(kind='customer_receipt_email', payload={'order_id': order.id}),
+        NotificationOutbox(kind='admin_order_email', payload={'order_id': order.id}),
+        NotificationOutbox(kind='order_sms', payload={'order_id': order.id}),
+    ]
+    if vendor_ids:
+        rows.append(NotificationOutbox(kind='dispatch_delivery', payload={'order_id': order.id}))
+
+    return NotificationOutbox.objects.bulk_create(rows)
+
+
+# ─────────────────────────────────────────────────────────────
+# HANDLERS
+# ─────────────────────────────────────────────────────────────
+
+def _load_order(order_id):
+    from stumart.models import Order, OrderItem
+
+    order = Order.objects.get(id=order_id)
+    order_items = list(
+        OrderItem.objects.filter(order=order).select_related("product", "vendor", "vendor__user")
+    )
+    return order, order_items
+
+
+@handler('out_of_stock_email')
+def _send_out_of_stock_email(payload, connection):
+    from user.models import Vendor
+    from .utils import build_out_of_stock_email
+
+    vendor = Vendor.objects.select_related('user').get(id=payload['vendor_id'])
+    build_out_of_stock_email(vendor, connection=connection).send()
+
+
+@handler('vendor_order_email')
+def _send_vendor_order_email(payload, connection):
+    from user.models import Vendor
+    from .utils import build_vendor_order_email
+
+    order, order_items = _load_order(payload['order_id'])
+    vendor = Vendor.objects.select_related('user').get(id=payload['vendor_id'])
+    email_msg = build_vendor_order_email(order, vendor, order_items, connection=connection)
+    if email_msg is not None:
+        email_msg.send()
+
+
+@handler('customer_receipt_email')
+def _send_customer_receipt_email(payload, connection):
+    from .utils import build_customer_receipt_email
+
+    order, order_items = _load_order(payload['order_id'])
+    build_customer_receipt_email(order, order_items, connection=connection).send()
+
+
+@handler('admin_order_email')
+def _send_admin_order_email(payload, connection):
+    from .utils import build_admin_order_email
+
+    order, order_items = _load_order(payload['order_id'])
+    email_msg = build_admin_order_email(order, order_items, connection=connection)
+    if email_msg is not None:
+        email_msg.send()
+
+
+@handler('order_sms')
+def _send_order_sms(payload, connection):
+    # Termii calls are best-effort per recipient; failures are logged inside
+    from .util.notifications_utils import send_order_notifications
+
+    order, order_items = _load_order(payload['order_id'])
+    send_order_notifications(order, order_items)
+
+
+@handler('dispatch_delivery')
+def _dispatch_delivery(payload, connection):
+    from wallet.models import DeliveryOpportunity
+    from .views import _dispatch_delivery_opportunities
+
+    order, order_items = _load_order(payload['order_id'])
+    # Opportunities are created before any email goes out — never dispatch twice
+    if DeliveryOpportunity.objects.filter(order=order).exists():
+        return
+    if order_items:
+        _dispatch_delivery_opportunities(order, order_items[0].vendor, connection=connection)
+
+
+# ─────────────────────────────────────────────────────────────
+# WORKER
+# ─────────────────────────────────────────────────────────────
+
+def claim_batch(batch_size):
+    """
+    Lock up to ``batch_size`` due rows and mark them processing. SKIP LOCKED
+    lets several workers drain the table without stepping on each other;
+    rows left 'processing' by a crashed worker are reclaimed after a while.
+    """
+    current = timezone.now()
+    stale = current - timedelta(minutes=STALE_LOCK_MINUTES)
+
+    with transaction.atomic():
+        due = (
+            NotificationOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=NotificationOutbox.STATUS_PENDING, next_attempt_at__lte=current)
+                | Q(status=NotificationOutbox.STATUS_PROCESSING, locked_at__lt=stale)
+            )
+            .order_by('id')
+        )
+        rows = list(due[:batch_size])
+        NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+            status=NotificationOutbox.STATUS_PROCESSING, locked_at=current,
+        )
+    return rows
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS))
+
+
+def process_batch(batch_size=50):
+    """
+    Send one batch. Returns ``(sent, retried, failed)`` counts.
+    All emails in the batch share a single SMTP connection.
+    """
+    rows = claim_batch(batch_size)
+    if not rows:
+        return 0, 0, 0
+
+    sent, retried, failed = [], [], []
+    connection = get_connection()
+    try:
+        connection.open()
+        for row in rows:
+            row.attempts += 1
+            row.locked_at = None
+            try:
+                fn = HANDLERS.get(row.kind)
+                if fn is None:
+                    raise LookupError(f"No outbox handler registered for '{row.kind}'")
+                fn(row.payload, connection)
+            except Exception as exc:
+                logger.exception("Outbox row %s (%s) failed on attempt %d", row.id, row.kind, row.attempts)
+                row.last_error = f"{type(exc).__name__}: {exc}"
+                if row.attempts >= row.max_attempts:
+                    row.status = NotificationOutbox.STATUS_FAILED
+                    failed.append(row)
+                else:
+                    row.status = NotificationOutbox.STATUS_PENDING
+                    row.next_attempt_at = timezone.now() + _backoff(row.attempts)
+                    retried.append(row)
+            else:
+                row.status = NotificationOutbox.STATUS_SENT
+                row.sent_at = timezone.now()
+                row.last_error = ''
+                sent.append(row)
+    finally:
+        connection.close()
+
+    NotificationOutbox.objects.bulk_update(
+        rows,
+        ['status', 'attempts', 'locked_at', 'last_error', 'next_attempt_at', 'sent_at'],
+    )
+    return len(sent), len(retried), len(failed)
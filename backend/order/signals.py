@@ -0,0 +1,68 @@
+# signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from cart import pricing
+from chat import realtime
+from stumart.models import Order, OrderItem
+from .models import School, Vendor
+
+PACKED = 'PACKED'
+
+# post_init couldn't see the status (deferred field) — the transition is unknown
+UNKNOWN = object()
+
+
+def status_change(order, consumer):
+    """
+    ``(previous, current)`` order_status as seen by ``consumer`` (a post_save
+    receiver's name): the status when ``order`` was loaded — None if unsaved,
+    UNKNOWN if deferred — or at that consumer's last call. Records the current
+    status, so every receiver sees each transition exactly once.
+    """
+    seen = order._seen_status
+    previous = seen.get(consumer, order._loaded_status)
+    seen[consumer] = current = order.order_status
+    return previous, current
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # The one status snapshot every Order post_save receiver reads through
+    # status_change. Read from __dict__ so deferred loads (.only()) don't
+    # trigger a query; None for unsaved instances, so the first save counts as creation
+    instance._loaded_status = instance.__dict__.get('order_status', UNKNOWN) if instance.pk else None
+    instance._seen_status = {}
+    instance._pushed_packed = instance.__dict__.get('packed')
+
+
+@receiver(post_save, sender=Order)
+def push_order_status(sender, instance, created, **kwargs):
+    """Tell connected clients when an order moves (PAID, PACKED, IN_TRANSIT, DELIVERED, ...)."""
+    previous, current = status_change(instance, 'push')
+    if created:
+        pass  # PENDING orders aren't pushed; the client that created it already knows
+    elif current != previous:
+        vendor_user_ids = ()
+        if instance.order_status == 'PAID':
+            # A paid order is new work for every vendor on it
+            vendor_user_ids = (
+                OrderItem.objects.filter(order=instance)
+                .values_list('vendor__user_id', flat=True)
+                .distinct()
+            )
+        realtime.push_order_status(instance, instance.order_status, vendor_user_ids)
+    elif instance.packed and not instance._pushed_packed:
+        realtime.push_order_status(instance, PACKED)
+
+    instance._pushed_packed = instance.packed
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def invalidate_delivery_fees(sender, instance, **kwargs):
+    """Registered delivery fees are cached for cart pricing; drop them once the change is committed."""
+    transaction.on_commit(pricing.invalidate_delivery_fees)
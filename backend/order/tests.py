@@ -1,3 +1,94 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from order.util.payouts import initiate_transfers
+from stumart.gateways import GatewayClient
+from user.paystack_register import PaystackTransferService
+
+
+class FakePaystackHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for POST /transfer; recipients starting with RCP_FAIL are rejected."""
+    delay = 0.3
+    lock = threading.Lock()
+    in_flight = peak = 0
+
+    @classmethod
+    def track(cls, change):
+        with cls.lock:
+            cls.in_flight += change
+            cls.peak = max(cls.peak, cls.in_flight)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.track(1)
+        time.sleep(self.delay)
+        self.track(-1)
+
+        if self.path != '/transfer':
+            self.send_response(404)
+            self.end_headers()
+            return
+        if body['recipient'].startswith('RCP_FAIL'):
+            status, payload = 400, {'status': False, 'message': 'Recipient not found'}
+        else:
+            status, payload = 200, {'status': True, 'data': {
+                'transfer_code': f"TRF_{body['reference']}", 'reference': body['reference'],
+            }}
+        encoded = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+
+class ConcurrentTransferTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakePaystackHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def service(self, path=''):
+        return PaystackTransferService(client=GatewayClient('paystack-test', self.base_url + path))
+
+    def transfers(self, *recipients):
+        return [
+            {'amount': 1000, 'recipient_code': code, 'reason': 'test', 'reference': f'ref_{n}'}
+            for n, code in enumerate(recipients)
+        ]
+
+    def test_transfers_run_concurrently_and_keep_order(self):
+        FakePaystackHandler.peak = 0
+        outcomes = initiate_transfers(self.service(), self.transfers('RCP_A', 'RCP_B', 'RCP_C', 'RCP_D'), max_workers=4)
+
+        self.assertEqual([success for success, _, _ in outcomes], [True] * 4)
+        self.assertEqual([data['reference'] for _, data, _ in outcomes], ['ref_0', 'ref_1', 'ref_2', 'ref_3'])
+        # Sequential dispatch would never have more than one request in flight
+        self.assertEqual(FakePaystackHandler.peak, 4)
+
+    def test_failures_are_reported_per_transfer(self):
+        outcomes = initiate_transfers(self.service(), self.transfers('RCP_A', 'RCP_FAIL_B'))
+
+        self.assertEqual(outcomes[0][0], True)
+        self.assertEqual(outcomes[1], (False, None, 'Recipient not found'))
+
+    def test_gateway_errors_do_not_raise(self):
+        outcomes = initiate_transfers(self.service('/missing'), self.transfers('RCP_A', 'RCP_B'))
+
+        self.assertTrue(all(not success for success, _, _ in outcomes))
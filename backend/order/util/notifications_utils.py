@@ -4,6 +4,8 @@ import logging
 from django.conf import settings
 from decimal import Decimal
 
+from stumart import gateways
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,7 +15,8 @@ class TermiiNotificationService:
     def __init__(self):
         self.api_key = getattr(settings, 'TERMII_API_KEY', '')
         self.sender_id = getattr(settings, 'TERMII_SENDER_ID', 'Stumart')
-        self.base_url = "https://api.ng.termii.com/api"
+        self.http = gateways.termii()
+        self.base_url = self.http.base_url
         
         if not self.api_key:
             logger.warning("TERMII_API_KEY not configured in settings")
@@ -53,7 +56,7 @@ class TermiiNotificationService:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.http.post(url, json=payload)
             response_data = response.json()
             
             if response.status_code == 200:
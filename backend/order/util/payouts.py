@@ -0,0 +1,50 @@
+# payouts.py
+"""
+Concurrent Paystack transfer dispatch.
+
+Paying out an order means one transfer per vendor plus one for the
+picker. Those calls are independent, so they are issued together on a
+bounded thread pool over the service's shared keep-alive session; an
+order's payout takes about as long as its slowest transfer instead of the
+sum of all of them. Worker threads only talk HTTP — every database write
+happens back on the caller's thread, inside its transaction.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TransfersDispatched(Exception):
+    """Recording an order's payout failed after its transfers were sent — retrying would pay twice."""
+
+
+def transfer_workers():
+    return max(getattr(settings, "PAYSTACK_TRANSFER_WORKERS", 8), 1)
+
+
+def _initiate(service, transfer):
+    try:
+        return service.initiate_transfer(**transfer)
+    except Exception as exc:
+        # e.g. a non-JSON error page from the gateway; treat as a failed transfer
+        logger.exception("Transfer %s raised", transfer.get("reference"))
+        return False, None, f"Internal error: {exc}"
+
+
+def initiate_transfers(service, transfers, max_workers=None):
+    """
+    Run ``service.initiate_transfer(**kwargs)`` for every dict in
+    ``transfers`` concurrently. Returns the ``(success, data, error)``
+    tuples in the same order; never raises.
+    """
+    if not transfers:
+        return []
+    if len(transfers) == 1:
+        return [_initiate(service, transfers[0])]
+
+    workers = min(max_workers or transfer_workers(), len(transfers))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="paystack-transfer") as pool:
+        return list(pool.map(lambda transfer: _initiate(service, transfer), transfers))
@@ -0,0 +1,99 @@
+# picker_matching.py
+"""
+Set-based picker matching for delivery dispatch.
+
+Everything a dispatch needs is loaded up front in a fixed number of
+queries — available student pickers with their preferred-vendor sets,
+then (only if needed) the institution's company riders or regular
+pickers — and coverage is worked out in memory. The query count does not
+grow with the number of vendors on an order or pickers at a school.
+"""
+from collections import defaultdict
+
+from user.models import CompanyRider, StudentPicker, User
+
+
+def load_student_picker_coverage(institution, vendor_ids):
+    """
+    Map each available student picker at ``institution`` to the subset of
+    ``vendor_ids`` in their preferred vendors. Two queries: the M2M rows,
+    then the picker users themselves.
+    """
+    through = StudentPicker.preferred_vendors.through
+    rows = through.objects.filter(
+        vendor_id__in=vendor_ids,
+        studentpicker__is_available=True,
+        studentpicker__user__user_type="student_picker",
+        studentpicker__user__institution=institution,
+        studentpicker__user__is_active=True,
+    ).values_list("studentpicker__user_id", "vendor_id")
+
+    vendor_sets = defaultdict(set)
+    for user_id, vendor_id in rows:
+        vendor_sets[user_id].add(vendor_id)
+
+    if not vendor_sets:
+        return {}
+
+    users = User.objects.filter(id__in=vendor_sets).order_by("id")
+    return {user: frozenset(vendor_sets[user.id]) for user in users}
+
+
+def match_student_pickers(coverage, vendor_ids):
+    """
+    Split ``coverage`` (picker → vendor_id set) into a
+    ``(full_coverage, by_vendor, uncovered)`` tuple:
+
+        full_coverage  pickers whose set contains every vendor on the order
+        by_vendor      vendor_id → pickers covering it (only when nobody
+                       covers everything)
+        uncovered      vendor_ids no student picker covers
+
+    Pure function — no queries.
+    """
+    wanted = frozenset(vendor_ids)
+
+    full_coverage = [picker for picker, covered in coverage.items() if wanted <= covered]
+    if full_coverage:
+        return full_coverage, {}, []
+
+    candidates = defaultdict(list)
+    for picker, covered in coverage.items():
+        for vendor_id in covered & wanted:
+            candidates[vendor_id].append(picker)
+
+    # Preserve the order the caller listed vendors in
+    by_vendor = {vid: candidates[vid] for vid in vendor_ids if candidates.get(vid)}
+    uncovered = [vid for vid in vendor_ids if vid not in by_vendor]
+    return [], by_vendor, uncovered
+
+
+def load_fallback_pickers(institution):
+    """
+    First non-empty fallback tier for ``institution`` as
+    ``(picker_type, rider_type, pickers)``: active riders of every company
+    at the school in one query, otherwise its regular pickers. Returns
+    ``None`` when neither tier has anyone.
+    """
+    company_riders = list(
+        CompanyRider.objects.filter(
+            status="active",
+            company__user__user_type="company",
+            company__user__institution=institution,
+            company__user__is_active=True,
+        ).select_related("company__user").order_by("company_id", "id")
+    )
+    if company_riders:
+        return "company_rider", "company", company_riders
+
+    regular_pickers = list(
+        User.objects.filter(
+            user_type="picker",
+            institution=institution,
+            is_active=True,
+        )
+    )
+    if regular_pickers:
+        return "regular_picker", "regular", regular_pickers
+
+    return None
@@ -6,11 +6,12 @@ from decimal import Decimal
 from io import BytesIO
 
 from django.conf import settings
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, EmailMessage, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.timezone import now
 from weasyprint import HTML
 
+from wallet import ledger as wallet_ledger
 from wallet.models import DeliveryOpportunity
 from wallet.models import (
     VendorWallets, CompanyWallet,
@@ -53,98 +54,111 @@ def generate_customer_confirmation_code(order_id: int) -> str:
 
 def deduct_inventory(order_items) -> set:
     """
-    Deduct stock for every item in an order.
-    Returns the set of vendors whose product just hit zero stock (for out-of-stock emails).
+    Deduct stock for every item in an order (a few bulk UPDATEs, see stumart.inventory).
+    Returns the set of vendors whose product, size or colour just hit zero stock
+    (for out-of-stock emails).
     """
-    from stumart.models import ProductSize, ProductColor
+    from stumart.inventory import deduct_stock
 
-    vendors_out_of_stock = set()
+    sold_out = deduct_stock(order_items)
 
+    vendors_out_of_stock = set()
     for item in order_items:
-        product = item.product
-
-        product.in_stock = max(product.in_stock - item.quantity, 0)
-        product.save()
-
-        if item.size:
-            try:
-                size_obj = ProductSize.objects.get(product=product, size=item.size)
-                size_obj.quantity = max(size_obj.quantity - item.quantity, 0)
-                size_obj.save()
-                logger.info(
-                    "Updated size inventory — product %s, size %s → %s",
-                    product.id, item.size, size_obj.quantity,
-                )
-                if size_obj.quantity == 0 and item.vendor:
-                    vendors_out_of_stock.add(item.vendor)
-            except ProductSize.DoesNotExist:
-                logger.warning("Size %s not found for product %s", item.size, product.id)
-
-        if item.color:
-            try:
-                from stumart.models import ProductColor
-                color_obj = ProductColor.objects.get(product=product, color=item.color)
-                color_obj.quantity = max(color_obj.quantity - item.quantity, 0)
-                color_obj.save()
-                logger.info(
-                    "Updated color inventory — product %s, color %s → %s",
-                    product.id, item.color, color_obj.quantity,
-                )
-            except ProductColor.DoesNotExist:
-                logger.warning("Color %s not found for product %s", item.color, product.id)
+        if not item.vendor:
+            continue
+        if (
+            item.product_id in sold_out["products"]
+            or (item.product_id, item.size) in sold_out["sizes"]
+            or (item.product_id, item.color) in sold_out["colors"]
+        ):
+            vendors_out_of_stock.add(item.vendor)
 
     return vendors_out_of_stock
 
 
 def restore_inventory(order_items) -> None:
     """Restore stock for a cancelled order."""
-    from stumart.models import ProductSize, ProductColor
-
-    for item in order_items:
-        product = item.product
-        product.in_stock += item.quantity
-        product.save()
-
-        if item.size:
-            try:
-                size_obj = ProductSize.objects.get(product=product, size=item.size)
-                size_obj.quantity += item.quantity
-                size_obj.save()
-            except ProductSize.DoesNotExist:
-                pass
+    from stumart.inventory import restore_stock
 
-        if item.color:
-            try:
-                color_obj = ProductColor.objects.get(product=product, color=item.color)
-                color_obj.quantity += item.quantity
-                color_obj.save()
-            except ProductColor.DoesNotExist:
-                pass
+    restore_stock(order_items)
 
 
 # ─────────────────────────────────────────────────────────────
 # EMAIL — VENDOR NOTIFICATIONS
 # ─────────────────────────────────────────────────────────────
 
+def build_out_of_stock_email(vendor, connection=None) -> EmailMessage:
+    return EmailMessage(
+        subject="Product Out of Stock",
+        body=(
+            f"Dear {vendor.business_name},\n\n"
+            "One or more of your products is now out of stock. "
+            "Please restock to continue receiving orders."
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[vendor.user.email],
+        connection=connection,
+    )
+
+
 def send_out_of_stock_emails(vendors: set) -> None:
     """Notify vendors that a product has gone out of stock."""
     for vendor in vendors:
         try:
-            send_mail(
-                subject="Product Out of Stock",
-                message=(
-                    f"Dear {vendor.business_name},\n\n"
-                    "One or more of your products is now out of stock. "
-                    "Please restock to continue receiving orders."
-                ),
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[vendor.user.email],
-            )
+            build_out_of_stock_email(vendor).send()
             logger.info("Sent out-of-stock email to vendor %s", vendor.id)
         except Exception:
             logger.exception("Failed to send out-of-stock email to vendor %s", vendor.id)
 
 
+def build_vendor_order_email(order, vendor, order_items, connection=None):
+    """
+    Personalised HTML email with a PDF attachment listing only ``vendor``'s
+    items from ``order_items``. Returns None if the vendor has no items.
+    """
+    vendor_items = []
+    vendor_total = 0
+
+    for item in order_items:
+        if item.vendor and item.vendor.id == vendor.id:
+            item_price = item.price or 0
+            item.subtotal = item_price * item.quantity
+            vendor_total += item.subtotal
+            vendor_items.append(item)
+
+    if not vendor_items:
+        return None
+
+    context = {
+        "order": order,
+        "vendor_items": vendor_items,
+        "vendor": vendor,
+        "current_year": now().year,
+        "total": vendor_total,
+        "dashboard_url": (
+            f"{settings.FRONTEND_URL}/vendor/dashboard/orders/{order.order_number}"
+        ),
+    }
+
+    html_content = render_to_string("email/ordered.html", context)
+    pdf_buffer = BytesIO()
+    HTML(string=html_content).write_pdf(pdf_buffer)
+    pdf_buffer.seek(0)
+
+    email_msg = EmailMultiAlternatives(
+        subject=f"New Order Notification - #{order.order_number}",
+        body="You have received a new order. Details are attached as a PDF.",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[vendor.user.email],
+        connection=connection,
+    )
+    email_msg.attach_alternative(html_content, "text/html")
+    email_msg.attach(
+        f"order_{order.order_number}.pdf", pdf_buffer.getvalue(), "application/pdf"
+    )
+    return email_msg
+
+
 def send_vendor_order_emails(order, order_items) -> None:
     """
     For each vendor in the order, send a personalised HTML email with a PDF
@@ -156,45 +170,9 @@ def send_vendor_order_emails(order, order_items) -> None:
 
     for vendor in vendors_to_notify:
         try:
-            vendor_items = []
-            vendor_total = 0
-
-            for item in order_items:
-                if item.vendor and item.vendor.id == vendor.id:
-                    item_price = item.price or 0
-                    item.subtotal = item_price * item.quantity
-                    vendor_total += item.subtotal
-                    vendor_items.append(item)
-
-            if not vendor_items:
+            email_msg = build_vendor_order_email(order, vendor, order_items)
+            if email_msg is None:
                 continue
-
-            context = {
-                "order": order,
-                "vendor_items": vendor_items,
-                "vendor": vendor,
-                "current_year": now().year,
-                "total": vendor_total,
-                "dashboard_url": (
-                    f"{settings.FRONTEND_URL}/vendor/dashboard/orders/{order.order_number}"
-                ),
-            }
-
-            html_content = render_to_string("email/ordered.html", context)
-            pdf_buffer = BytesIO()
-            HTML(string=html_content).write_pdf(pdf_buffer)
-            pdf_buffer.seek(0)
-
-            email_msg = EmailMultiAlternatives(
-                subject=f"New Order Notification - #{order.order_number}",
-                body="You have received a new order. Details are attached as a PDF.",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[vendor.user.email],
-            )
-            email_msg.attach_alternative(html_content, "text/html")
-            email_msg.attach(
-                f"order_{order.order_number}.pdf", pdf_buffer.getvalue(), "application/pdf"
-            )
             email_msg.send()
             logger.info("Order notification sent to vendor %s for order %s", vendor.id, order.order_number)
 
@@ -206,34 +184,40 @@ def send_vendor_order_emails(order, order_items) -> None:
 # EMAIL — CUSTOMER RECEIPT
 # ─────────────────────────────────────────────────────────────
 
-def send_customer_receipt_email(order, order_items) -> None:
-    """Send an HTML + PDF receipt to the customer."""
-    try:
-        for item in order_items:
-            item.total = (item.price or 0) * item.quantity
+def build_customer_receipt_email(order, order_items, connection=None) -> EmailMultiAlternatives:
+    """HTML + PDF receipt for the customer."""
+    for item in order_items:
+        item.total = (item.price or 0) * item.quantity
 
-        context = {
-            "order": order,
-            "order_items": order_items,
-            "current_year": now().year,
-        }
+    context = {
+        "order": order,
+        "order_items": order_items,
+        "current_year": now().year,
+    }
 
-        html_content = render_to_string("email/receipts.html", context)
-        pdf_buffer = BytesIO()
-        HTML(string=html_content).write_pdf(pdf_buffer)
-        pdf_buffer.seek(0)
+    html_content = render_to_string("email/receipts.html", context)
+    pdf_buffer = BytesIO()
+    HTML(string=html_content).write_pdf(pdf_buffer)
+    pdf_buffer.seek(0)
+
+    email_msg = EmailMultiAlternatives(
+        subject=f"Your Order Receipt - #{order.order_number}",
+        body="Your order receipt is attached as a PDF.",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[order.email],
+        connection=connection,
+    )
+    email_msg.attach_alternative(html_content, "text/html")
+    email_msg.attach(
+        f"receipt_{order.order_number}.pdf", pdf_buffer.getvalue(), "application/pdf"
+    )
+    return email_msg
 
-        email_msg = EmailMultiAlternatives(
-            subject=f"Your Order Receipt - #{order.order_number}",
-            body="Your order receipt is attached as a PDF.",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[order.email],
-        )
-        email_msg.attach_alternative(html_content, "text/html")
-        email_msg.attach(
-            f"receipt_{order.order_number}.pdf", pdf_buffer.getvalue(), "application/pdf"
-        )
-        email_msg.send()
+
+def send_customer_receipt_email(order, order_items) -> None:
+    """Send an HTML + PDF receipt to the customer."""
+    try:
+        build_customer_receipt_email(order, order_items).send()
         logger.info("Sent receipt email to %s for order %s", order.email, order.order_number)
 
     except Exception:
@@ -330,7 +314,7 @@ def send_packing_status_email(
 # EMAIL — DELIVERY OPPORTUNITY (PICKERS / RIDERS)
 # ─────────────────────────────────────────────────────────────
 
-def send_company_rider_opportunity_emails(order, vendor, rider_data: list) -> None:
+def send_company_rider_opportunity_emails(order, vendor, rider_data: list, connection=None) -> None:
     """Send personalised delivery-opportunity emails to company riders."""
     from user.models import Vendor as VendorModel
 
@@ -374,13 +358,14 @@ def send_company_rider_opportunity_emails(order, vendor, rider_data: list) -> No
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[rider.email],
                 fail_silently=False,
+                connection=connection,
             )
             logger.info("Sent delivery opportunity to rider %s (%s)", rider.name, unique_code)
         except Exception:
             logger.exception("Failed to send opportunity email to rider %s", rider.name)
 
 
-def send_regular_picker_opportunity_emails(order, vendor, picker_data: list) -> None:
+def send_regular_picker_opportunity_emails(order, vendor, picker_data: list, connection=None) -> None:
     """Send personalised delivery-opportunity emails to regular / student pickers."""
     from user.models import Vendor as VendorModel
 
@@ -421,6 +406,7 @@ def send_regular_picker_opportunity_emails(order, vendor, picker_data: list) ->
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[picker.email],
                 fail_silently=False,
+                connection=connection,
             )
             logger.info(
                 "Sent delivery opportunity to picker %s %s (%s)",
@@ -798,50 +784,62 @@ def send_admin_transfer_summary_email(order, opportunity, transfer_results: dict
 # ─────────────────────────────────────────────────────────────
 # EMAIL — ADMIN NEW ORDER NOTIFICATION
 # ─────────────────────────────────────────────────────────────
+def build_admin_order_email(order, order_items, connection=None):
+    """
+    Plain-text new-order summary for settings.ADMIN_EMAILS (env: ADMIN_EMAILS).
+    Returns None when no admin emails are configured.
+    """
+    admin_emails = getattr(settings, "ADMIN_EMAILS", [])
+
+    if not admin_emails:
+        logger.warning("No admin emails configured in settings.ADMIN_EMAILS for order %s", order.order_number)
+        return None
+
+    items_summary = "\n".join(
+        f"  - {item.product.name} x{item.quantity} @ ₦{item.price} ({item.vendor.business_name})"
+        for item in order_items
+    )
+
+    message = (
+        f"New paid order received.\n\n"
+        f"Order Number : {order.order_number}\n"
+        f"Customer     : {order.first_name} {order.last_name}\n"
+        f"Email        : {order.email}\n"
+        f"Phone        : {order.phone}\n"
+        f"Address      : {order.address}\n"
+        f"Room         : {order.room_number or 'N/A'}\n"
+        f"Vendor Nearby: {'Yes' if order.vendor_is_nearby else 'No'}\n\n"
+        f"Items:\n{items_summary}\n\n"
+        f"Subtotal     : ₦{order.subtotal}\n"
+        f"Shipping     : ₦{order.shipping_fee}\n"
+        f"Tax          : ₦{order.tax}\n"
+        f"Total        : ₦{order.total}\n"
+    )
+
+    return EmailMessage(
+        subject=f"[StuMart] New Order — {order.order_number}",
+        body=message,
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@stumart.com"),
+        to=admin_emails,
+        connection=connection,
+    )
+
+
 def send_admin_notifications(order, order_items) -> None:
     """
     Notify all admin users by email when a new order is paid.
     Admin emails are sourced from settings.ADMIN_EMAILS (env: ADMIN_EMAILS).
     """
     try:
-        admin_emails = getattr(settings, "ADMIN_EMAILS", [])
-
-        if not admin_emails:
-            logger.warning("No admin emails configured in settings.ADMIN_EMAILS for order %s", order.order_number)
+        email_msg = build_admin_order_email(order, order_items)
+        if email_msg is None:
             return
 
-        items_summary = "\n".join(
-            f"  - {item.product.name} x{item.quantity} @ ₦{item.price} ({item.vendor.business_name})"
-            for item in order_items
-        )
-
-        message = (
-            f"New paid order received.\n\n"
-            f"Order Number : {order.order_number}\n"
-            f"Customer     : {order.first_name} {order.last_name}\n"
-            f"Email        : {order.email}\n"
-            f"Phone        : {order.phone}\n"
-            f"Address      : {order.address}\n"
-            f"Room         : {order.room_number or 'N/A'}\n"
-            f"Vendor Nearby: {'Yes' if order.vendor_is_nearby else 'No'}\n\n"
-            f"Items:\n{items_summary}\n\n"
-            f"Subtotal     : ₦{order.subtotal}\n"
-            f"Shipping     : ₦{order.shipping_fee}\n"
-            f"Tax          : ₦{order.tax}\n"
-            f"Total        : ₦{order.total}\n"
-        )
-
-        send_mail(
-            subject=f"[StuMart] New Order — {order.order_number}",
-            message=message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@stumart.com"),
-            recipient_list=admin_emails,
-            fail_silently=True,
-        )
+        email_msg.send(fail_silently=True)
 
         logger.info(
             "Admin notification sent for order %s to %d admin(s)",
-            order.order_number, len(admin_emails),
+            order.order_number, len(email_msg.to),
         )
 
     except Exception:
@@ -856,7 +854,7 @@ def calculate_vendor_payments(order) -> dict:
     """Returns {vendor_id: Decimal amount} for all vendors in the order."""
     totals = {}
     for item in order.order_items.all():
-        vid = item.vendor.id
+        vid = item.vendor_id
         amount = Decimal(str(item.quantity)) * Decimal(str(item.price))
         totals[vid] = totals.get(vid, Decimal("0")) + amount
     return totals
@@ -868,9 +866,21 @@ def process_automated_transfers(order, opportunity) -> dict:
     Processes Paystack transfers to vendors and picker/rider,
     credits wallets as fallback, and records all wallet transactions.
     Returns a transfer_results dict for the API response.
+
+    Vendors are loaded in one query and every transfer (vendors and the
+    picker) is issued concurrently (order.util.payouts), so a multi-vendor
+    order confirms in about the time of its slowest transfer. Ledger rows
+    are written with a single bulk_create at the end; platform and company
+    wallet credits are then applied through wallet.ledger against them.
+
+    Transfer references are fixed per order and payee, so Paystack rejects
+    a repeated payout instead of sending it twice. If recording fails once
+    transfers have gone out, TransfersDispatched is raised so callers don't
+    retry.
     """
     from user.paystack_register import PaystackTransferService
     from user.models import Vendor
+    from order.util.payouts import TransfersDispatched, initiate_transfers
 
     transfer_service = PaystackTransferService()
     results = {
@@ -879,6 +889,8 @@ def process_automated_transfers(order, opportunity) -> dict:
         "company_rider_transfer": None,
         "stumart_earnings": 0,
     }
+    ledger = []
+    postings = []   # balance movements, journaled against their ledger rows once saved
 
     shipping_fee        = Decimal(str(order.shipping_fee))
     tax_amount          = Decimal(str(order.tax))
@@ -895,20 +907,20 @@ def process_automated_transfers(order, opportunity) -> dict:
     stumart_user = getattr(stumart_wallet, "user", None) or User.objects.filter(is_superuser=True).first()
 
     if stumart_user:
-        stumart_wallet.add_tax(tax_amount)
-        stumart_wallet.add_commission(company_commission if is_company else picker_platform_fee)
-
-        WalletTransactionAccount.objects.create(
+        tax_row = WalletTransactionAccount(
             transaction_type="tax", amount=tax_amount,
             order=order, user=stumart_user,
             description=f"Tax from order #{order.order_number}",
         )
-        WalletTransactionAccount.objects.create(
+        commission_row = WalletTransactionAccount(
             transaction_type="commission",
             amount=company_commission if is_company else picker_platform_fee,
             order=order, user=stumart_user,
             description=f"Commission from order #{order.order_number}",
         )
+        ledger += [tax_row, commission_row]
+        postings.append(lambda: stumart_wallet.add_tax(tax_row.amount, transaction=tax_row))
+        postings.append(lambda: stumart_wallet.add_commission(commission_row.amount, transaction=commission_row))
 
     results["stumart_earnings"] = float(stumart_earnings)
 
@@ -919,48 +931,35 @@ def process_automated_transfers(order, opportunity) -> dict:
     results["stumart_earnings"] = float(stumart_earnings)
 
     if stumart_user and vendor_payments:
-        WalletTransactionAccount.objects.create(
+        ledger.append(WalletTransactionAccount(
             transaction_type="commission", amount=total_vendor_fees,
             order=order, user=stumart_user,
             description=f"Vendor platform fees ({len(vendor_payments)} vendors) — order #{order.order_number}",
-        )
+        ))
 
-    for vendor_id, gross in vendor_payments.items():
-        try:
-            vendor      = Vendor.objects.get(id=vendor_id)
-            net         = max(gross - vendor_platform_fee, Decimal("0"))
-            timestamp   = int(now().timestamp() * 1000)
-            reference   = f"vendor_{vendor_id}_order_{order.order_number}_{timestamp}"
-
-            if not vendor.paystack_recipient_code:
-                _credit_vendor_wallet(vendor, net, order, f"No recipient code — order #{order.order_number}")
-                results["vendor_transfers"].append(_vendor_result(vendor, gross, vendor_platform_fee, net, False, error="No recipient code configured"))
-                continue
+    vendors = Vendor.objects.select_related("user").in_bulk(list(vendor_payments))
+    vendor_results = {}
+    pending = []    # (kind, context, transfer kwargs) — dispatched together below
 
-            success, transfer_data, error = transfer_service.initiate_transfer(
-                amount=int(net * 100),
-                recipient_code=vendor.paystack_recipient_code,
-                reason=f"Order #{order.order_number} payment (less ₦{vendor_platform_fee} fee)",
-                reference=reference,
-            )
-
-            if success:
-                transfer_code = (transfer_data or {}).get("transfer_code")
-                WalletTransactionAccount.objects.create(
-                    transaction_type="vendor_payment", amount=net,
-                    order=order, user=vendor.user,
-                    description=f"Transfer {reference} | Code: {transfer_code}",
-                )
-                results["vendor_transfers"].append(
-                    _vendor_result(vendor, gross, vendor_platform_fee, net, True, reference=reference, transfer_code=transfer_code)
-                )
-            else:
-                _credit_vendor_wallet(vendor, net, order, f"Transfer failed: {error}")
-                results["vendor_transfers"].append(_vendor_result(vendor, gross, vendor_platform_fee, net, False, error=error))
-
-        except Exception:
-            logger.exception("Error processing transfer for vendor %s", vendor_id)
-            results["vendor_transfers"].append({"vendor_id": vendor_id, "success": False, "error": "Internal error"})
+    for vendor_id, gross in vendor_payments.items():
+        vendor = vendors.get(vendor_id)
+        if vendor is None:
+            logger.error("Vendor %s on order %s no longer exists", vendor_id, order.order_number)
+            vendor_results[vendor_id] = {"vendor_id": vendor_id, "success": False, "error": "Internal error"}
+            continue
+
+        net = max(gross - vendor_platform_fee, Decimal("0"))
+        if not vendor.paystack_recipient_code:
+            _credit_vendor_wallet(vendor, net, order, f"No recipient code — order #{order.order_number}")
+            vendor_results[vendor_id] = _vendor_result(vendor, gross, vendor_platform_fee, net, False, error="No recipient code configured")
+            continue
+
+        pending.append(("vendor", (vendor, gross, net), {
+            "amount": int(net * 100),
+            "recipient_code": vendor.paystack_recipient_code,
+            "reason": f"Order #{order.order_number} payment (less ₦{vendor_platform_fee} fee)",
+            "reference": f"vendor_{vendor_id}_order_{order.order_number}",
+        }))
 
     # ── Picker / Rider payouts ──────────────────────────────
     if is_company and opportunity.company_rider:
@@ -973,14 +972,13 @@ def process_automated_transfers(order, opportunity) -> dict:
         rider.save()
 
         wallet, _ = CompanyWallet.objects.get_or_create(company=company, defaults={"balance": Decimal("0")})
-        wallet.balance += net
-        wallet.save()
-
-        WalletTransactionAccount.objects.create(
+        rider_row = WalletTransactionAccount(
             transaction_type="rider_earnings", amount=net,
             order=order, user=company.user,
             description=f"Rider earnings for order #{order.order_number}",
         )
+        ledger.append(rider_row)
+        postings.append(lambda wallet=wallet, net=net, row=rider_row: wallet_ledger.credit(wallet, net, transaction=row))
         results["company_rider_transfer"] = {
             "rider_name": rider.name, "company_name": company.user.email,
             "gross_amount": float(shipping_fee), "commission": float(company_commission),
@@ -1009,29 +1007,63 @@ def process_automated_transfers(order, opportunity) -> dict:
             _credit_picker_wallet(picker, profile, net, order, "No recipient code")
             results["picker_transfer"] = _picker_result(picker, shipping_fee, picker_platform_fee, net, False, error="No recipient code (wallet credited)")
         else:
-            timestamp = int(now().timestamp() * 1000)
-            reference = f"picker_{picker.id}_order_{order.order_number}_{timestamp}"
-            success, transfer_data, error = transfer_service.initiate_transfer(
-                amount=int(net * 100),
-                recipient_code=recip_code,
-                reason=f"Delivery for order #{order.order_number}",
-                reference=reference,
-            )
-            if success:
-                transfer_code = (transfer_data or {}).get("transfer_code")
-                WalletTransactionAccount.objects.create(
-                    transaction_type="delivery_payment", amount=net,
-                    order=order, user=picker,
-                    description=f"Transfer {reference} | Code: {transfer_code}",
-                )
-                results["picker_transfer"] = _picker_result(
-                    picker, shipping_fee, picker_platform_fee, net, True,
-                    reference=reference, transfer_code=transfer_code,
-                )
-            else:
-                _credit_picker_wallet(picker, profile, net, order, f"Transfer failed: {error}")
-                results["picker_transfer"] = _picker_result(picker, shipping_fee, picker_platform_fee, net, False, error=error)
+            pending.append(("picker", (picker, profile, net), {
+                "amount": int(net * 100),
+                "recipient_code": recip_code,
+                "reason": f"Delivery for order #{order.order_number}",
+                "reference": f"picker_{picker.id}_order_{order.order_number}",
+            }))
 
+    # ── Dispatch all transfers at once, then record ─────────
+    outcomes = initiate_transfers(transfer_service, [transfer for _, _, transfer in pending])
+
+    try:
+        for (kind, context, transfer), (success, transfer_data, error) in zip(pending, outcomes):
+            reference = transfer["reference"]
+            transfer_code = (transfer_data or {}).get("transfer_code") if success else None
+
+            if kind == "vendor":
+                vendor, gross, net = context
+                if success:
+                    ledger.append(WalletTransactionAccount(
+                        transaction_type="vendor_payment", amount=net,
+                        order=order, user=vendor.user,
+                        description=f"Transfer {reference} | Code: {transfer_code}",
+                    ))
+                    vendor_results[vendor.id] = _vendor_result(
+                        vendor, gross, vendor_platform_fee, net, True, reference=reference, transfer_code=transfer_code,
+                    )
+                else:
+                    _credit_vendor_wallet(vendor, net, order, f"Transfer failed: {error}")
+                    vendor_results[vendor.id] = _vendor_result(vendor, gross, vendor_platform_fee, net, False, error=error)
+            else:
+                picker, profile, net = context
+                if success:
+                    ledger.append(WalletTransactionAccount(
+                        transaction_type="delivery_payment", amount=net,
+                        order=order, user=picker,
+                        description=f"Transfer {reference} | Code: {transfer_code}",
+                    ))
+                    results["picker_transfer"] = _picker_result(
+                        picker, shipping_fee, picker_platform_fee, net, True,
+                        reference=reference, transfer_code=transfer_code,
+                    )
+                else:
+                    _credit_picker_wallet(picker, profile, net, order, f"Transfer failed: {error}")
+                    results["picker_transfer"] = _picker_result(picker, shipping_fee, picker_platform_fee, net, False, error=error)
+
+        # Keep the order vendors appeared in on the order
+        results["vendor_transfers"] = [vendor_results[vid] for vid in vendor_payments if vid in vendor_results]
+
+        WalletTransactionAccount.objects.bulk_create(ledger)
+        for post in postings:
+            post()
+    except Exception as exc:
+        if pending:
+            raise TransfersDispatched(
+                f"{len(pending)} transfer(s) for order #{order.order_number} were sent but not recorded"
+            ) from exc
+        raise
     return results
 
 
@@ -1039,27 +1071,23 @@ def process_automated_transfers(order, opportunity) -> dict:
 
 def _credit_vendor_wallet(vendor, amount, order, description):
     wallet, _ = VendorWallets.objects.get_or_create(vendor=vendor, defaults={"balance": Decimal("0")})
-    wallet.balance += amount
-    wallet.save()
-    WalletTransactionAccount.objects.create(
+    row = WalletTransactionAccount.objects.create(
         transaction_type="vendor_payment", amount=amount,
         order=order, user=vendor.user, description=description,
     )
+    wallet_ledger.credit(wallet, amount, transaction=row)
 
 
 def _credit_picker_wallet(picker, profile, amount, order, description):
     if picker.user_type == "picker":
         wallet, _ = PickerWalletAccount.objects.get_or_create(picker=profile, defaults={"amount": Decimal("0")})
-        wallet.amount += amount
-        wallet.save()
     else:
         wallet, _ = StudentPickerWalletAccount.objects.get_or_create(student_picker=profile, defaults={"amount": Decimal("0")})
-        wallet.amount += amount
-        wallet.save()
-    WalletTransactionAccount.objects.create(
+    row = WalletTransactionAccount.objects.create(
         transaction_type="delivery_payment", amount=amount,
         order=order, user=picker, description=description,
     )
+    wallet_ledger.credit(wallet, amount, transaction=row)
 
 
 def _vendor_result(vendor, gross, fee, net, success, **kwargs):
@@ -1080,7 +1108,7 @@ def _picker_result(picker, gross, fee, net, success, **kwargs):
         "success": success, **kwargs,
     }
 
-def send_admin_split_dispatch_email(order, covered_vendors: list, uncovered_vendors: list) -> None:
+def send_admin_split_dispatch_email(order, covered_vendors: list, uncovered_vendors: list, connection=None) -> None:
     """
     Notify admin that a multi-vendor order was split between student pickers
     (for some vendors) and regular/company pickers (for the rest).
@@ -1119,6 +1147,7 @@ def send_admin_split_dispatch_email(order, covered_vendors: list, uncovered_vend
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=admin_emails,  # ✅ fixed
             fail_silently=False,          # ✅ surface failures in logs
+            connection=connection,
         )
         logger.info(
             "Sent split-dispatch admin email for order %s to %d admin(s)",
@@ -4,7 +4,6 @@ import uuid
 from datetime import timedelta
 from decimal import Decimal
 
-import requests
 from django.conf import settings
 from django.db import transaction
 from django.utils.timezone import now
@@ -13,11 +12,19 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from cart.utils import calculate_shipping_fee
+from cart.pricing import CartPricing, priced_items, product_price
+from stumart import gateways
 from stumart.models import Cart, CartItem, Order, OrderItem, Transaction
-from user.models import User, Vendor
+from user.models import Vendor
 
 from wallet.models import DeliveryOpportunity
+from .disbursements import record_disbursed
+from .outbox import enqueue_order_paid
+from .util.picker_matching import (
+    load_fallback_pickers,
+    load_student_picker_coverage,
+    match_student_pickers,
+)
 from .serializers import (
     AcceptDeliveryGetResponseSerializer,
     AcceptDeliveryPostResponseSerializer,
@@ -47,7 +54,6 @@ from .utils import (
     process_automated_transfers,
     restore_inventory,
     send_admin_delivery_completed_email,
-    send_admin_notifications,               # ← was imported but never used
     send_admin_transfer_summary_email,
     send_cancellation_emails,
     send_cancelled_riders_emails,
@@ -55,13 +61,10 @@ from .utils import (
     send_customer_delivery_accepted_email,
     send_customer_delivery_completed_email,
     send_customer_order_completed_email,
-    send_customer_receipt_email,
-    send_out_of_stock_emails,
     send_packing_status_email,
     send_picker_payout_email,
     send_regular_picker_opportunity_emails,
     send_rider_confirmation_link_email,
-    send_vendor_order_emails,
     send_vendor_payout_email,
 )
 
@@ -102,15 +105,15 @@ def _remove_order_items_from_user_cart(user, order, reference):
 # SHARED PICKER ROUTING UTILITY
 # ─────────────────────────────────────────────────────────────
 
-def _dispatch_delivery_opportunities(order: Order, vendor: Vendor) -> None:
+def _dispatch_delivery_opportunities(order: Order, vendor: Vendor, connection=None) -> None:
     """
     Replaced with multi-vendor aware dispatch.
     'vendor' param kept for signature compatibility but we now fetch ALL vendors on the order.
     """
-    _dispatch_multi_vendor(order)
+    _dispatch_multi_vendor(order, connection=connection)
 
 
-def _dispatch_multi_vendor(order: Order) -> None:
+def _dispatch_multi_vendor(order: Order, connection=None) -> None:
     """
     For each vendor in the order, determine the best picker.
 
@@ -138,30 +141,24 @@ def _dispatch_multi_vendor(order: Order) -> None:
 
     if not order.vendor_is_nearby:
         # ── Non-nearby: company riders → regular pickers (whole order) ────────
-        _dispatch_fallback_pickers(order, order_vendors[0], institution, expires_at)
+        _dispatch_fallback_pickers(order, order_vendors[0], institution, expires_at, connection)
         return
 
     # ── Nearby: student picker path ───────────────────────────────────────────
+    # One pass over the M2M table gives every available picker's vendor set;
+    # full coverage and the per-vendor split are then set operations.
     vendor_ids = [v.id for v in order_vendors]
+    vendors_by_id = {v.id: v for v in order_vendors}
 
-    # 1. Find student pickers who cover ALL vendors in this order
-    full_coverage_pickers = User.objects.filter(
-        user_type="student_picker",
-        institution=institution,
-        is_active=True,
-        student_picker_profile__is_available=True,
-    )
-    for vid in vendor_ids:
-        full_coverage_pickers = full_coverage_pickers.filter(
-            student_picker_profile__preferred_vendors__id=vid
-        )
-    full_coverage_pickers = full_coverage_pickers.distinct()
+    coverage = load_student_picker_coverage(institution, vendor_ids)
+    full_coverage_pickers, covered, uncovered = match_student_pickers(coverage, vendor_ids)
 
-    if full_coverage_pickers.exists():
+    # 1. Student pickers who cover ALL vendors in this order
+    if full_coverage_pickers:
         # Perfect — one group of pickers handles everything
         logger.info(
             "Found %d student picker(s) covering all %d vendors for order %s",
-            full_coverage_pickers.count(), len(order_vendors), order.order_number,
+            len(full_coverage_pickers), len(order_vendors), order.order_number,
         )
         _bulk_create_and_notify(
             order=order,
@@ -170,6 +167,7 @@ def _dispatch_multi_vendor(order: Order) -> None:
             expires_at=expires_at,
             rider_type="regular",
             vendor=order_vendors[0],
+            connection=connection,
         )
         return
 
@@ -179,37 +177,27 @@ def _dispatch_multi_vendor(order: Order) -> None:
         order.order_number,
     )
 
-    covered_vendors   = {}   # vendor → queryset of student pickers
-    uncovered_vendors = []   # vendors with no student picker
-
-    for vendor in order_vendors:
-        pickers = User.objects.filter(
-            user_type="student_picker",
-            institution=institution,
-            is_active=True,
-            student_picker_profile__is_available=True,
-            student_picker_profile__preferred_vendors__id=vendor.id,
-        ).distinct()
-
-        if pickers.exists():
-            covered_vendors[vendor] = pickers
-        else:
-            uncovered_vendors.append(vendor)
+    covered_vendors   = [vendors_by_id[vid] for vid in covered]    # have student pickers
+    uncovered_vendors = [vendors_by_id[vid] for vid in uncovered]  # no student picker
 
     # Notify student pickers for vendors they cover
-    for vendor, pickers in covered_vendors.items():
+    for vendor in covered_vendors:
         _bulk_create_and_notify(
             order=order,
-            pickers=pickers,
+            pickers=covered[vendor.id],
             picker_type="student_picker",
             expires_at=expires_at,
             rider_type="regular",
             vendor=vendor,
+            connection=connection,
         )
 
-    # Fall back to regular/company pickers for uncovered vendors
-    for vendor in uncovered_vendors:
-        _dispatch_fallback_pickers(order, vendor, institution, expires_at)
+    # Fall back to regular/company pickers for uncovered vendors — the
+    # fallback tier is the same for every vendor, so load it once
+    if uncovered_vendors:
+        fallback = load_fallback_pickers(institution)
+        for vendor in uncovered_vendors:
+            _dispatch_fallback_pickers(order, vendor, institution, expires_at, connection, fallback=fallback)
 
     # Notify admin of the split if there's a mix
     if covered_vendors and uncovered_vendors:
@@ -217,8 +205,9 @@ def _dispatch_multi_vendor(order: Order) -> None:
         try:
             send_admin_split_dispatch_email(
                 order=order,
-                covered_vendors=list(covered_vendors.keys()),
+                covered_vendors=covered_vendors,
                 uncovered_vendors=uncovered_vendors,
+                connection=connection,
             )
         except Exception:
             logger.exception("Failed to send admin split-dispatch email for order %s", order.order_number)
@@ -231,54 +220,38 @@ def _dispatch_multi_vendor(order: Order) -> None:
         )
 
 
-def _dispatch_fallback_pickers(order: Order, vendor: Vendor, institution: str, expires_at) -> None:
-    """Try company riders first, then regular pickers for a given vendor/institution."""
-    company_users = User.objects.filter(
-        user_type="company",
-        institution=institution,
-        is_active=True,
-    )
+_UNLOADED = object()
 
-    company_riders = []
-    for cu in company_users:
-        try:
-            company_riders.extend(cu.company_profile.riders.filter(status="active"))
-        except AttributeError:
-            pass
 
-    if company_riders:
-        _bulk_create_and_notify(
-            order=order,
-            pickers=company_riders,
-            picker_type="company_rider",
-            expires_at=expires_at,
-            rider_type="company",
-            vendor=vendor,
-        )
-        return
+def _dispatch_fallback_pickers(order: Order, vendor: Vendor, institution: str, expires_at, connection=None,
+                               fallback=_UNLOADED) -> None:
+    """
+    Try company riders first, then regular pickers for a given vendor/institution.
+    Pass ``fallback`` (from load_fallback_pickers) to reuse one lookup across vendors.
+    """
+    if fallback is _UNLOADED:
+        fallback = load_fallback_pickers(institution)
 
-    regular_pickers = User.objects.filter(
-        user_type="picker",
-        institution=institution,
-        is_active=True,
-    )
-    if regular_pickers.exists():
-        _bulk_create_and_notify(
-            order=order,
-            pickers=regular_pickers,
-            picker_type="regular_picker",
-            expires_at=expires_at,
-            rider_type="regular",
-            vendor=vendor,
-        )
-    else:
+    if fallback is None:
         logger.warning(
             "No fallback pickers found for vendor %s in institution %s for order %s",
             vendor.business_name, institution, order.order_number,
         )
+        return
+
+    picker_type, rider_type, pickers = fallback
+    _bulk_create_and_notify(
+        order=order,
+        pickers=pickers,
+        picker_type=picker_type,
+        expires_at=expires_at,
+        rider_type=rider_type,
+        vendor=vendor,
+        connection=connection,
+    )
 
 
-def _bulk_create_and_notify(order, pickers, picker_type, expires_at, rider_type, vendor):
+def _bulk_create_and_notify(order, pickers, picker_type, expires_at, rider_type, vendor, connection=None):
     """Create DeliveryOpportunity rows in bulk then send emails."""
     opportunities    = []
     notification_data = []
@@ -308,9 +281,9 @@ def _bulk_create_and_notify(order, pickers, picker_type, expires_at, rider_type,
     DeliveryOpportunity.objects.bulk_create(opportunities)
 
     if rider_type == "company":
-        send_company_rider_opportunity_emails(order, vendor, notification_data)
+        send_company_rider_opportunity_emails(order, vendor, notification_data, connection=connection)
     else:
-        send_regular_picker_opportunity_emails(order, vendor, notification_data)
+        send_regular_picker_opportunity_emails(order, vendor, notification_data, connection=connection)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -337,24 +310,20 @@ class CreateOrderView(APIView):
         cart_items = CartItem.objects.filter(
             id__in=data["cart_items"],
             cart__user=request.user
-        ).select_related("product", "product__vendor", "product__vendor__vendor_profile")
+        )
 
         selected_vendor_id = data.get("selected_vendor_id")
         if selected_vendor_id:
-            selected_vendor_user_id = (
-                Vendor.objects
-                .filter(id=selected_vendor_id)
-                .values_list("user_id", flat=True)
-                .first()
-            )
-            cart_items = cart_items.filter(product__vendor_id=selected_vendor_user_id)
+            cart_items = cart_items.filter(product__vendor__vendor_profile__id=selected_vendor_id)
+
+        # One query for the items; every check and total below works from memory
+        pricing = CartPricing(priced_items(cart_items))
 
-        if not cart_items.exists():
+        if not pricing.items:
             return Response({"error": "No cart items found."}, status=status.HTTP_400_BAD_REQUEST)
 
         # ── validate: orders must contain at least one actual product (not just gifts) ──
-        has_product = cart_items.filter(product__isnull=False).exists()
-        if not has_product:
+        if not pricing.product_items:
             return Response(
                 {
                     "error": "Your cart contains only gift items. Please add at least one product to create an order.",
@@ -362,7 +331,7 @@ class CreateOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        selected_vendor_profiles = self._get_cart_vendor_profiles(cart_items)
+        selected_vendor_profiles = pricing.vendor_profiles
         if len(selected_vendor_profiles) > 1:
             return Response(
                 {
@@ -378,7 +347,7 @@ class CreateOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        validation_error = self._validate_cart_categories(cart_items)
+        validation_error = self._validate_cart_categories(pricing)
         if validation_error:
             return Response({"error": validation_error}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -386,21 +355,12 @@ class CreateOrderView(APIView):
         vendor_is_nearby = data.get("vendor_is_nearby", False)
 
         # ✅ CRITICAL: Compute all financials from DB — never trust client-sent values
-        product_items = cart_items.filter(product__isnull=False)
-
-        subtotal = sum(
-            self._get_product_order_price(item.product) * item.quantity
-            for item in product_items
-        )
-        shipping_fee = (
-            Decimal("0.00")
-            if vendor_is_nearby
-            else calculate_shipping_fee(len(selected_vendor_profiles), product_items)
-        )
+        subtotal = pricing.subtotal
+        shipping_fee = pricing.shipping_fee(vendor_is_nearby=vendor_is_nearby)
         tax = Decimal("0.00")  # adjust to your tax rate/logic
         takeaway = sum(
             (item.product.takeaway_fee or Decimal("0.00")) * item.quantity
-            for item in product_items
+            for item in pricing.product_items
             if hasattr(item.product, "takeaway_fee")
         )
         total = subtotal + shipping_fee + tax + takeaway
@@ -426,14 +386,8 @@ class CreateOrderView(APIView):
                     vendor_is_nearby=vendor_is_nearby,
                 )
 
-                for cart_item in cart_items:
-                    # Skip gift items - only create OrderItems for actual products
-                    if not cart_item.product:
-                        continue
-
+                for cart_item in pricing.product_items:
                     vendor_instance = getattr(cart_item.product.vendor, "vendor_profile", None)
-                    if not vendor_instance:
-                        vendor_instance = Vendor.objects.filter(user=cart_item.product.vendor).first()
                     if not vendor_instance:
                         return Response(
                             {"error": f"No vendor profile for {cart_item.product.vendor.email}"},
@@ -443,7 +397,7 @@ class CreateOrderView(APIView):
                         order=order,
                         product=cart_item.product,
                         quantity=cart_item.quantity,
-                        price=self._get_product_order_price(cart_item.product),
+                        price=product_price(cart_item.product),
                         vendor=vendor_instance,
                         color=cart_item.color,
                         size=cart_item.size,
@@ -465,41 +419,8 @@ class CreateOrderView(APIView):
             return Response({"error": "An error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @staticmethod
-    def _get_product_order_price(product):
-        promotion_price = getattr(product, "promotion_price", None)
-        if promotion_price and promotion_price > Decimal("0.00") and promotion_price < product.price:
-            return promotion_price
-        return product.price
-
-    @staticmethod
-    def _get_cart_vendor_profiles(cart_items):
-        vendors_by_id = {}
-        for item in cart_items:
-            if not item.product:
-                continue
-            vendor = getattr(item.product.vendor, "vendor_profile", None)
-            if not vendor:
-                vendor = Vendor.objects.filter(user=item.product.vendor).first()
-            if vendor:
-                vendors_by_id[vendor.id] = vendor
-        return list(vendors_by_id.values())
-
-    @staticmethod
-    def _validate_cart_categories(cart_items):
-        has_food = has_non_food = False
-        for item in cart_items:
-            # Skip gift items - only validate product categories
-            if not item.product:
-                continue
-
-            vendor = Vendor.objects.filter(user=item.product.vendor).first()
-            if not vendor:
-                continue
-            if vendor.business_category == "food":
-                has_food = True
-            else:
-                has_non_food = True
-        if has_food and has_non_food:
+    def _validate_cart_categories(pricing):
+        if pricing.has_food and pricing.has_non_food:
             return "Food items cannot be ordered together with other categories. Please place separate orders."
         return None
 
@@ -595,11 +516,10 @@ class PaystackPaymentInitializeView(APIView):
         }
 
         try:
-            ps_response = requests.post(
-                "https://api.paystack.co/transaction/initialize",
+            ps_response = gateways.paystack().post(
+                "/transaction/initialize",
                 headers=headers,
                 data=json.dumps(payload),
-                timeout=30,
             ).json()
         except Exception:
             logger.exception("Paystack API call failed")
@@ -698,10 +618,9 @@ class PaystackPaymentVerifyView(APIView):
 
         # ── Call Paystack ──────────────────────────────────────────────────────
         try:
-            ps_response = requests.get(
-                f"https://api.paystack.co/transaction/verify/{reference}",
+            ps_response = gateways.paystack().get(
+                f"/transaction/verify/{reference}",
                 headers={"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"},
-                timeout=30,
             ).json()
         except Exception:
             logger.exception("Paystack verify API call failed")
@@ -780,31 +699,15 @@ class PaystackPaymentVerifyView(APIView):
                 )
             )
 
-            # 1. Deduct inventory and notify vendors of out-of-stock items
+            # 1. Deduct inventory
             vendors_oos = deduct_inventory(order_items)
-            transaction.on_commit(lambda: send_out_of_stock_emails(vendors_oos))
-
-            # 2. Notify each vendor of their new order
-            transaction.on_commit(lambda: send_vendor_order_emails(order, order_items))
-
-            # 3. Send receipt to the customer
-            transaction.on_commit(lambda: send_customer_receipt_email(order, order_items))
 
-            # 4. Notify all admin users
-            transaction.on_commit(lambda: send_admin_notifications(order, order_items))
+            # 2. Queue vendor / customer / admin emails, SMS and picker dispatch.
+            #    Rows commit with the payment and are sent by
+            #    `manage.py process_notification_outbox`, never in this request.
+            enqueue_order_paid(order, order_items, vendors_oos)
 
-            # 5. Send push / in-app notifications
-            from order.util.notifications_utils import send_order_notifications
-            transaction.on_commit(lambda: _safe_call(send_order_notifications, order, order_items))
-
-            # 6. Dispatch delivery opportunities to pickers / riders
-            first_vendor = order_items[0].vendor if order_items else None
-            if first_vendor:
-                transaction.on_commit(
-                    lambda o=order, v=first_vendor: _safe_call(_dispatch_delivery_opportunities, o, v)
-                )
-
-            # 7. Remove only the paid items from the user's cart.
+            # 3. Remove only the paid items from the user's cart.
             try:
                 _remove_order_items_from_user_cart(request.user, order, reference)
             except Exception:
@@ -859,11 +762,13 @@ class CancelOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        order.order_status = "CANCELLED"
-        order.save()
+        order_items = list(OrderItem.objects.filter(order=order).select_related("vendor", "vendor__user"))
+
+        with transaction.atomic():
+            order.order_status = "CANCELLED"
+            order.save()
+            restore_inventory(order_items)
 
-        order_items = OrderItem.objects.filter(order=order)
-        restore_inventory(order_items)
         send_cancellation_emails(order, order_items)
 
         return Response(
@@ -1473,6 +1378,7 @@ class CustomerConfirmationView(APIView):
             order.save()
 
             transfer_results = process_automated_transfers(order, opp)
+            record_disbursed(order)
 
             transaction.on_commit(lambda: send_customer_order_completed_email(order, opp))
             transaction.on_commit(lambda: self._send_payout_notifications(order, opp, transfer_results))
@@ -1577,8 +1483,7 @@ class WalletPaymentView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # ── Sync earnings from completed orders before checking balance ───────
-        referral.update_stats()
+        # ── Earnings are kept current as referred orders complete ────────────
         referral.refresh_from_db()
 
         wallet_balance = referral.total_earnings
@@ -1664,21 +1569,7 @@ class WalletPaymentView(APIView):
 
             # ── Post-payment pipeline (same as Paystack verify) ───────────────
             vendors_oos = deduct_inventory(order_items)
-            transaction.on_commit(lambda: send_out_of_stock_emails(vendors_oos))
-            transaction.on_commit(lambda: send_vendor_order_emails(order, order_items))
-            transaction.on_commit(lambda: send_customer_receipt_email(order, order_items))
-            transaction.on_commit(lambda: send_admin_notifications(order, order_items))
-
-            from order.util.notifications_utils import send_order_notifications
-            transaction.on_commit(
-                lambda: _safe_call(send_order_notifications, order, order_items)
-            )
-
-            first_vendor = order_items[0].vendor if order_items else None
-            if first_vendor:
-                transaction.on_commit(
-                    lambda o=order, v=first_vendor: _safe_call(_dispatch_delivery_opportunities, o, v)
-                )
+            enqueue_order_paid(order, order_items, vendors_oos)
 
             # ── Clear cart ────────────────────────────────────────────────────
             try:
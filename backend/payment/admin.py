@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import WithdrawalRequest, WithdrawalFee, BankAccount, WithdrawalLimit
+from .models import WithdrawalRequest, WithdrawalFee, BankAccount, WithdrawalLimit, WithdrawalUsage
 
 
 # @admin.register(WithdrawalRequest)
@@ -46,3 +46,15 @@ class WithdrawalLimitAdmin(admin.ModelAdmin):
     list_filter = ("user_type", "limit_type", "is_active")
     search_fields = ("user_type", "limit_type")
     ordering = ("user_type", "limit_type")
+
+
+@admin.register(WithdrawalUsage)
+class WithdrawalUsageAdmin(admin.ModelAdmin):
+    list_display = (
+        "user", "period", "period_start", "used_amount",
+        "completed_amount", "total_count", "open_count"
+    )
+    list_filter = ("period",)
+    search_fields = ("user__email",)
+    raw_id_fields = ("user",)
+    ordering = ("-period_start",)
@@ -1,101 +1,72 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from payment.models import WithdrawalRequest
-from payment.views import PaystackTransferService
+from payment import reconciliation
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = 'Check status of processing automated payouts'
-    
+    help = (
+        'Poll Paystack for automated payouts stuck in processing. Webhooks settle '
+        'payouts first; this only checks rows that have been stale for a while.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=reconciliation.STALE_AFTER_MINUTES,
+            help='Only check payouts not settled or checked in this many minutes'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=reconciliation.BATCH_SIZE,
+            help='Payouts claimed and written back per batch'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent verification requests (default: PAYOUT_RECONCILE_WORKERS)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help='Maximum verification requests per second, 0 for no limit (default: PAYOUT_RECONCILE_RATE)'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches'
+        )
+
     def handle(self, *args, **options):
-        # Get processing automated payouts
-        processing_payouts = WithdrawalRequest.objects.filter(
-            is_automated=True,
-            status='processing'
-        ).select_related('user', 'related_order')
-        
+        pending = reconciliation.stale_payouts(options['stale_minutes']).count()
         self.stdout.write(
             self.style.SUCCESS(
-                f"\nChecking {processing_payouts.count()} processing automated payouts\n"
+                f"\nChecking {pending} stale automated payouts\n"
             )
         )
-        
-        paystack = PaystackTransferService()
-        completed_count = 0
-        failed_count = 0
-        still_processing_count = 0
-        
-        for payout in processing_payouts:
-            try:
-                self.stdout.write(f"\nChecking: {payout.user.email} - {payout.paystack_reference}")
-                
-                # Verify transfer status
-                verification_result = paystack.verify_transfer(payout.paystack_reference)
-                
-                if verification_result['success']:
-                    paystack_status = verification_result['status']
-                    
-                    if paystack_status == 'success':
-                        payout.status = 'completed'
-                        payout.completed_at = timezone.now()
-                        payout.save()
-                        completed_count += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"✓ Completed - ₦{verification_result['amount']}"
-                            )
-                        )
-                    
-                    elif paystack_status == 'failed':
-                        payout.status = 'failed'
-                        payout.failure_reason = verification_result.get('reason', 'Transfer failed')
-                        payout.save()
-                        failed_count += 1
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"✗ Failed - {payout.failure_reason}"
-                            )
-                        )
-                    
-                    else:
-                        still_processing_count += 1
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f"⏳ Still processing - Status: {paystack_status}"
-                            )
-                        )
-                else:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"✗ Verification failed: {verification_result['message']}"
-                        )
-                    )
-            
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"✗ Error checking payout: {str(e)}"
-                    )
-                )
-                logger.error(f"Error checking payout {payout.id}: {str(e)}", exc_info=True)
-        
+
+        metrics = reconciliation.reconcile(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            rate=options['rate'],
+            stale_after=options['stale_minutes'],
+            max_batches=options['max_batches'],
+        )
+
         # Summary
         self.stdout.write("\n" + "="*50)
+        self.stdout.write(self.style.SUCCESS(f"\n✓ Completed: {metrics['completed']}"))
+        self.stdout.write(self.style.ERROR(f"✗ Failed: {metrics['failed']}"))
+        self.stdout.write(self.style.ERROR(f"↺ Reversed: {metrics['cancelled']}"))
+        self.stdout.write(self.style.WARNING(f"⏳ Still processing: {metrics['processing']}"))
+        self.stdout.write(self.style.WARNING(f"? Verification errors: {metrics['errors']}"))
         self.stdout.write(
-            self.style.SUCCESS(
-                f"\n✓ Completed: {completed_count}"
-            )
-        )
-        self.stdout.write(
-            self.style.ERROR(
-                f"✗ Failed: {failed_count}"
-            )
-        )
-        self.stdout.write(
-            self.style.WARNING(
-                f"⏳ Still processing: {still_processing_count}"
-            )
+            f"\nChecked {metrics['checked']} in {metrics['batches']} batches, "
+            f"{metrics['seconds']}s ({metrics['per_second']}/s)"
         )
-        self.stdout.write("="*50 + "\n")
\ No newline at end of file
+        self.stdout.write("="*50 + "\n")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from payment.usage import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily/monthly withdrawal usage counters from WithdrawalRequest'
+
+    def handle(self, *args, **options):
+        buckets = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} withdrawal usage bucket(s)"))
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_initial'),
+        ('stumart', '0005_product_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='withdrawalrequest',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, help_text='When the transfer status was last settled by webhook or polled from Paystack', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='withdrawalrequest',
+            index=models.Index(fields=['status', 'last_checked_at'], name='payment_wit_status_1b8af3_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_withdrawal_last_checked_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WithdrawalUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('used_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('completed_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_count', models.IntegerField(default=0)),
+                ('open_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='withdrawal_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'withdrawal_usage',
+                'constraints': [models.UniqueConstraint(fields=('user', 'period', 'period_start'), name='withdrawal_usage_bucket')],
+            },
+        ),
+    ]
@@ -42,6 +42,11 @@ class WithdrawalRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    last_checked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the transfer status was last settled by webhook or polled from Paystack"
+    )
     
     # Failure tracking
     failure_reason = models.TextField(blank=True, null=True)
@@ -80,6 +85,7 @@ class WithdrawalRequest(models.Model):
             models.Index(fields=['paystack_reference']),
             models.Index(fields=['is_automated', 'created_at']),
             models.Index(fields=['related_order']),
+            models.Index(fields=['status', 'last_checked_at']),
         ]
     
     def __str__(self):
@@ -233,4 +239,40 @@ class WithdrawalLimit(models.Model):
         unique_together = ['user_type', 'limit_type']
     
     def __str__(self):
-        return f"{self.user_type} - {self.limit_type} - ₦{self.min_amount}-₦{self.max_amount}"
\ No newline at end of file
+        return f"{self.user_type} - {self.limit_type} - ₦{self.min_amount}-₦{self.max_amount}"
+
+class WithdrawalUsage(models.Model):
+    """
+    Per-user withdrawal counters for one day or one calendar month, keyed by
+    when the withdrawals were requested. Maintained by payment/usage.py as
+    withdrawal statuses change, so limit checks and stats read a couple of
+    rows instead of summing WithdrawalRequest.
+    """
+    PERIOD_DAY = 'day'
+    PERIOD_MONTH = 'month'
+
+    PERIOD_CHOICES = [
+        (PERIOD_DAY, 'Day'),
+        (PERIOD_MONTH, 'Month'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='withdrawal_usage')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+
+    # processing + completed: what counts against the daily/monthly limits
+    used_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    completed_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_count = models.IntegerField(default=0)
+    open_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'withdrawal_usage'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'period_start'], name='withdrawal_usage_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.period} {self.period_start}: ₦{self.used_amount}"
@@ -0,0 +1,254 @@
+# reconciliation.py
+"""
+Payout status reconciliation.
+
+Paystack's transfer webhooks (``PaystackWebhookView``) are the source of
+truth for how an automated payout ended. The webhook, the poller and the
+user-facing status check all settle payouts through ``settle`` on a row
+they hold under ``select_for_update``: ``apply_outcome`` decides the
+transition, and a payout that ends failed or reversed is refunded to the
+wallet in the same transaction. A late or duplicated event never flips a
+payout that is already settled, so every refund happens exactly once,
+whichever path gets there first.
+
+``check_payout_status`` is the safety net for webhooks that never arrive.
+It only looks at payouts that are still ``processing`` and have gone
+``STALE_AFTER_MINUTES`` without being settled or checked, claims them in
+batches with ``SKIP LOCKED`` (overlapping cron runs split the work instead
+of doubling it), verifies each batch concurrently under a requests-per-
+second ceiling, and writes the settled rows back with one ``bulk_update``
+per batch.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from wallet import ledger as wallet_ledger
+from wallet.models import WalletTransactionAccount
+from . import usage
+from .models import WithdrawalRequest
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER_MINUTES = 15
+BATCH_SIZE = 200
+WORKERS = 8
+RATE_PER_SECOND = 10
+
+# Paystack transfer status -> (WithdrawalRequest.status, default failure reason)
+OUTCOMES = {
+    'success': ('completed', None),
+    'failed': ('failed', 'Transfer failed'),
+    'reversed': ('cancelled', 'Transfer was reversed'),
+}
+OPEN_STATUSES = ('pending', 'processing')
+REFUNDED_STATUSES = ('failed', 'cancelled')
+UPDATE_FIELDS = ['status', 'completed_at', 'failure_reason', 'last_checked_at']
+
+
+def apply_outcome(withdrawal, paystack_status, reason=None, now=None):
+    """
+    Move ``withdrawal`` to the status matching ``paystack_status`` in memory.
+    Returns True if it changed; settled payouts and non-final Paystack
+    statuses (``pending``, ``otp``, ...) are left alone.
+    """
+    if withdrawal.status not in OPEN_STATUSES or paystack_status not in OUTCOMES:
+        return False
+
+    now = now or timezone.now()
+    new_status, default_reason = OUTCOMES[paystack_status]
+    withdrawal.status = new_status
+    withdrawal.last_checked_at = now
+    if new_status == 'completed':
+        withdrawal.completed_at = now
+    else:
+        withdrawal.failure_reason = reason or default_reason
+    return True
+
+
+def refund(withdrawal):
+    """Credit a failed or reversed payout back to its user's wallet, journaled."""
+    record = WalletTransactionAccount.objects.create(
+        transaction_type='refund',
+        amount=withdrawal.amount,
+        user=withdrawal.user,
+        description=f"Refund for failed withdrawal - {withdrawal.paystack_reference}",
+    )
+    wallet = wallet_ledger.wallet_for_user(withdrawal.user)
+    if wallet is not None:
+        wallet_ledger.credit(wallet, withdrawal.amount, transaction=record)
+
+
+def settle(withdrawal, paystack_status, reason=None, now=None):
+    """
+    ``apply_outcome`` plus the refund for payouts that end failed or
+    reversed. The caller must hold ``withdrawal`` under select_for_update
+    inside a transaction and persist it when this returns True.
+    """
+    if not apply_outcome(withdrawal, paystack_status, reason, now):
+        return False
+    if withdrawal.status in REFUNDED_STATUSES:
+        refund(withdrawal)
+    return True
+
+
+def settle_one(paystack_status, reason=None, **lookup):
+    """
+    Lock the payout matching ``lookup``, settle it and save it. Returns
+    ``(withdrawal, changed)``; raises WithdrawalRequest.DoesNotExist.
+    """
+    with transaction.atomic():
+        withdrawal = WithdrawalRequest.objects.select_for_update().get(**lookup)
+        changed = settle(withdrawal, paystack_status, reason)
+        if changed:
+            withdrawal.save(update_fields=UPDATE_FIELDS)
+    return withdrawal, changed
+
+
+# ── Polling ───────────────────────────────────────────────────────────────────
+
+class RateLimiter:
+    """Spaces calls at least ``1 / per_second`` apart across threads."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def stale_payouts(stale_after=None, now=None):
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=stale_after or STALE_AFTER_MINUTES)
+    return (
+        WithdrawalRequest.objects
+        .filter(is_automated=True, status='processing', paystack_reference__isnull=False)
+        .filter(Q(processed_at__lt=cutoff) | Q(processed_at__isnull=True, created_at__lt=cutoff))
+        .filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lt=cutoff))
+    )
+
+
+def claim_batch(batch_size, stale_after=None):
+    """
+    Lock up to ``batch_size`` stale payouts, stamp ``last_checked_at`` so no
+    other run picks them up for another ``stale_after`` minutes, and return them.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            stale_payouts(stale_after, now)
+            .select_for_update(skip_locked=True)
+            .order_by('processed_at', 'id')[:batch_size]
+        )
+        if batch:
+            WithdrawalRequest.objects.filter(pk__in=[w.pk for w in batch]).update(last_checked_at=now)
+    for withdrawal in batch:
+        withdrawal.last_checked_at = now
+    return batch
+
+
+def verify_batch(service, batch, workers=WORKERS, limiter=None):
+    """``service.verify_transfer`` for every payout concurrently; results in order, never raises."""
+    def verify(withdrawal):
+        if limiter:
+            limiter.wait()
+        try:
+            return service.verify_transfer(withdrawal.paystack_reference)
+        except Exception as exc:
+            logger.exception("Verifying transfer %s raised", withdrawal.paystack_reference)
+            return {'success': False, 'message': str(exc)}
+
+    if len(batch) <= 1 or workers <= 1:
+        return [verify(withdrawal) for withdrawal in batch]
+    with ThreadPoolExecutor(max_workers=min(workers, len(batch)), thread_name_prefix='payout-verify') as pool:
+        return list(pool.map(verify, batch))
+
+
+def settle_batch(batch, results):
+    """
+    Settle (and refund) from verification results and persist the changed
+    rows with one ``bulk_update``. The rows are re-read under lock so a
+    webhook that settled a payout mid-batch wins. Returns ``{outcome: count}``.
+    """
+    counts = {'completed': 0, 'failed': 0, 'cancelled': 0, 'processing': 0, 'errors': 0}
+    verified = {}
+    for withdrawal, result in zip(batch, results):
+        if result.get('success'):
+            verified[withdrawal.pk] = result
+        else:
+            counts['errors'] += 1
+            logger.warning("Could not verify payout %s: %s", withdrawal.paystack_reference, result.get('message'))
+
+    with transaction.atomic():
+        changed = []
+        rows = WithdrawalRequest.objects.select_for_update().filter(pk__in=list(verified))
+        for withdrawal in rows:
+            result = verified[withdrawal.pk]
+            try:
+                # Savepoint per row: a refund that fails leaves just that payout
+                # processing for the next run instead of losing the whole batch
+                with transaction.atomic():
+                    settled = settle(withdrawal, result['status'], result.get('reason'))
+            except Exception:
+                logger.exception("Settling payout %s failed", withdrawal.paystack_reference)
+                counts['errors'] += 1
+                continue
+            if settled:
+                changed.append(withdrawal)
+                counts[withdrawal.status] += 1
+            elif withdrawal.status == 'processing':
+                counts['processing'] += 1
+        WithdrawalRequest.objects.bulk_update(changed, UPDATE_FIELDS)
+        for withdrawal in changed:
+            # bulk_update sends no post_save; keep the usage counters in step here
+            usage.track(withdrawal)
+    return counts
+
+
+def reconcile(service=None, batch_size=BATCH_SIZE, workers=None, rate=None, stale_after=None, max_batches=None):
+    """
+    Poll stale processing payouts until none are left (or ``max_batches``).
+    Returns run metrics: counts per outcome, batches, elapsed seconds and
+    verifications per second.
+    """
+    if service is None:
+        from .views import PaystackTransferService
+        service = PaystackTransferService()
+    workers = workers or getattr(settings, 'PAYOUT_RECONCILE_WORKERS', WORKERS)
+    rate = rate if rate is not None else getattr(settings, 'PAYOUT_RECONCILE_RATE', RATE_PER_SECOND)
+    limiter = RateLimiter(rate)
+
+    metrics = {'checked': 0, 'completed': 0, 'failed': 0, 'cancelled': 0,
+               'processing': 0, 'errors': 0, 'batches': 0}
+    started = time.monotonic()
+
+    while max_batches is None or metrics['batches'] < max_batches:
+        batch = claim_batch(batch_size, stale_after)
+        if not batch:
+            break
+        counts = settle_batch(batch, verify_batch(service, batch, workers, limiter))
+        metrics['batches'] += 1
+        metrics['checked'] += len(batch)
+        for outcome, count in counts.items():
+            metrics[outcome] += count
+
+    metrics['seconds'] = round(time.monotonic() - started, 3)
+    metrics['per_second'] = round(metrics['checked'] / metrics['seconds'], 2) if metrics['seconds'] else 0.0
+    logger.info("Payout reconciliation: %s", metrics)
+    return metrics
@@ -0,0 +1,18 @@
+# signals.py
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from . import usage
+from .models import WithdrawalRequest
+
+
+@receiver(post_init, sender=WithdrawalRequest)
+def remember_withdrawal_status(sender, instance, **kwargs):
+    # None for unsaved instances, so the first save counts as creation
+    instance._usage_status = instance.__dict__.get('status') if instance.pk else None
+
+
+@receiver(post_save, sender=WithdrawalRequest)
+def update_withdrawal_usage(sender, instance, **kwargs):
+    """Keep the user's daily/monthly WithdrawalUsage buckets in step with the status."""
+    usage.track(instance)
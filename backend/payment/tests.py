@@ -1,3 +1,101 @@
-from django.test import TestCase
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from payment.models import WithdrawalRequest
+from payment.reconciliation import RateLimiter, apply_outcome, settle, verify_batch
+from payment.usage import DAILY_LIMIT, contribution, limit_error
+
+
+class ApplyOutcomeTest(SimpleTestCase):
+    def test_final_statuses_settle_open_payouts(self):
+        for paystack_status, expected in (('success', 'completed'), ('failed', 'failed'), ('reversed', 'cancelled')):
+            withdrawal = WithdrawalRequest(status='processing')
+            self.assertTrue(apply_outcome(withdrawal, paystack_status))
+            self.assertEqual(withdrawal.status, expected)
+            self.assertIsNotNone(withdrawal.last_checked_at)
+
+    def test_settled_payouts_and_interim_statuses_are_ignored(self):
+        settled = WithdrawalRequest(status='completed')
+        self.assertFalse(apply_outcome(settled, 'reversed'))
+        self.assertEqual(settled.status, 'completed')
+
+        in_flight = WithdrawalRequest(status='processing')
+        self.assertFalse(apply_outcome(in_flight, 'pending'))
+        self.assertEqual(in_flight.status, 'processing')
+
+
+class SettleTest(SimpleTestCase):
+    @mock.patch('payment.reconciliation.refund')
+    def test_failed_and_reversed_payouts_are_refunded_once(self, refund):
+        for paystack_status in ('failed', 'reversed'):
+            withdrawal = WithdrawalRequest(status='processing', amount=Decimal('500.00'))
+            self.assertTrue(settle(withdrawal, paystack_status))
+            # Redelivered event, or the webhook after the poller
+            self.assertFalse(settle(withdrawal, paystack_status))
+        self.assertEqual(refund.call_count, 2)
+
+    @mock.patch('payment.reconciliation.refund')
+    def test_completed_payouts_are_not_refunded(self, refund):
+        self.assertTrue(settle(WithdrawalRequest(status='processing'), 'success'))
+        refund.assert_not_called()
+
+
+class SlowVerifier:
+    delay = 0.2
+
+    def __init__(self):
+        self.in_flight = self.peak = 0
+        self.lock = threading.Lock()
+
+    def verify_transfer(self, reference):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if reference == 'boom':
+            raise ValueError('bad payload')
+        return {'success': True, 'status': 'success', 'reference': reference}
+
+
+class VerifyBatchTest(SimpleTestCase):
+    def batch(self, *references):
+        return [WithdrawalRequest(paystack_reference=reference) for reference in references]
+
+    def test_verifies_concurrently_in_order_without_raising(self):
+        verifier = SlowVerifier()
+        results = verify_batch(verifier, self.batch('a', 'boom', 'c', 'd'), workers=4)
+
+        self.assertEqual(verifier.peak, 4)
+        self.assertEqual([r.get('reference') for r in results], ['a', None, 'c', 'd'])
+        self.assertFalse(results[1]['success'])
+
+    def test_rate_limiter_spaces_requests(self):
+        limiter = RateLimiter(per_second=20)
+        started = time.monotonic()
+        verify_batch(SlowVerifier(), self.batch(*'abcde'), workers=5, limiter=limiter)
+        # Five calls at 20/s: the last may start no earlier than 4 x 50ms in
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+
+class WithdrawalUsageTest(SimpleTestCase):
+    def test_refund_releases_limit_usage(self):
+        amount = Decimal('2500.00')
+        processing, failed = contribution('processing', amount), contribution('failed', amount)
+
+        self.assertEqual(processing['used_amount'], amount)
+        self.assertEqual(failed['used_amount'] - processing['used_amount'], -amount)
+        self.assertEqual(failed['total_count'] - processing['total_count'], 0)
+        self.assertEqual(failed['failed_count'], 1)
+
+    def test_limit_error(self):
+        usage = {'daily_used': DAILY_LIMIT - Decimal('100'), 'monthly_used': Decimal('0')}
+
+        self.assertIsNone(limit_error(Decimal('100'), usage))
+        self.assertIn('Daily', limit_error(Decimal('100.01'), usage))
 
-# Create your tests here.
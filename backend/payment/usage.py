@@ -0,0 +1,210 @@
+# usage.py
+"""
+Rolling withdrawal usage counters.
+
+Every WithdrawalRequest contributes to two ``WithdrawalUsage`` buckets for
+its user: the day and the calendar month it was requested in. When a
+withdrawal is created or changes status, ``track`` applies the difference
+between its old and new contribution to both buckets with F() updates,
+inside the caller's transaction (payment/signals.py does this on save;
+bulk updates call ``track`` themselves).
+
+    limit checks    ``usage_for`` reads today's and this month's bucket in
+                    one query; ``lock_usage`` does the same under
+                    SELECT ... FOR UPDATE so concurrent withdrawals by one
+                    user are checked one after another
+    stats           ``stats`` reads the day buckets for the requested
+                    window plus six month buckets in one query
+
+``python manage.py rebuild_withdrawal_usage`` recomputes every bucket from
+the WithdrawalRequest table (first deploy, or after manual data fixes).
+"""
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import WithdrawalRequest, WithdrawalUsage
+
+logger = logging.getLogger(__name__)
+
+MIN_WITHDRAWAL = Decimal('100.00')
+MAX_WITHDRAWAL = Decimal('500000.00')
+DAILY_LIMIT = Decimal('1000000.00')      # 1M per day
+MONTHLY_LIMIT = Decimal('10000000.00')   # 10M per month
+BREAKDOWN_MONTHS = 6
+
+USED_STATUSES = ('completed', 'processing')
+OPEN_STATUSES = ('pending', 'processing')
+COUNTERS = ('used_amount', 'completed_amount', 'total_count', 'open_count', 'completed_count', 'failed_count')
+
+
+def contribution(status, amount):
+    """What one withdrawal in ``status`` adds to its buckets. ``status=None`` means it doesn't exist."""
+    if status is None:
+        return dict.fromkeys(COUNTERS, 0)
+    return {
+        'used_amount': amount if status in USED_STATUSES else 0,
+        'completed_amount': amount if status == 'completed' else 0,
+        'total_count': 1,
+        'open_count': int(status in OPEN_STATUSES),
+        'completed_count': int(status == 'completed'),
+        'failed_count': int(status == 'failed'),
+    }
+
+
+def bucket_starts(moment):
+    day = timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+    return {WithdrawalUsage.PERIOD_DAY: day, WithdrawalUsage.PERIOD_MONTH: day.replace(day=1)}
+
+
+def _ensure_buckets(user_id, starts):
+    WithdrawalUsage.objects.bulk_create(
+        [WithdrawalUsage(user_id=user_id, period=period, period_start=start) for period, start in starts.items()],
+        ignore_conflicts=True,
+    )
+
+
+def _bucket_filter(starts):
+    q = Q()
+    for period, start in starts.items():
+        q |= Q(period=period, period_start=start)
+    return q
+
+
+# ── Maintenance ───────────────────────────────────────────────────────────────
+
+def track(withdrawal):
+    """
+    Apply ``withdrawal``'s status change since it was loaded (or its creation)
+    to its usage buckets. Relies on ``_usage_status`` set by the post_init
+    receiver; resets it so a second call is a no-op.
+    """
+    previous = getattr(withdrawal, '_usage_status', None)
+    if previous == withdrawal.status or withdrawal.created_at is None:
+        return
+
+    amount = withdrawal.amount or Decimal('0')
+    before, after = contribution(previous, amount), contribution(withdrawal.status, amount)
+    deltas = {field: after[field] - before[field] for field in COUNTERS if after[field] != before[field]}
+    withdrawal._usage_status = withdrawal.status
+    if not deltas:
+        return
+
+    starts = bucket_starts(withdrawal.created_at)
+    with transaction.atomic():
+        _ensure_buckets(withdrawal.user_id, starts)
+        WithdrawalUsage.objects.filter(_bucket_filter(starts), user_id=withdrawal.user_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+
+
+def rebuild(user=None):
+    """Recompute all buckets (or one user's) from WithdrawalRequest with two GROUP BYs."""
+    withdrawals = WithdrawalRequest.objects.all()
+    existing = WithdrawalUsage.objects.all()
+    if user is not None:
+        withdrawals = withdrawals.filter(user=user)
+        existing = existing.filter(user=user)
+
+    aggregates = dict(
+        used_amount=Sum('amount', filter=Q(status__in=USED_STATUSES)),
+        completed_amount=Sum('amount', filter=Q(status='completed')),
+        total_count=Count('id'),
+        open_count=Count('id', filter=Q(status__in=OPEN_STATUSES)),
+        completed_count=Count('id', filter=Q(status='completed')),
+        failed_count=Count('id', filter=Q(status='failed')),
+    )
+    buckets = []
+    truncations = (
+        (WithdrawalUsage.PERIOD_DAY, TruncDate('created_at')),
+        (WithdrawalUsage.PERIOD_MONTH, TruncMonth('created_at', output_field=DateField())),
+    )
+    for period, start in truncations:
+        rows = withdrawals.annotate(start=start).values('user_id', 'start').annotate(**aggregates).order_by()
+        for row in rows:
+            buckets.append(WithdrawalUsage(
+                user_id=row['user_id'], period=period, period_start=row['start'],
+                **{field: row[field] or 0 for field in COUNTERS},
+            ))
+
+    with transaction.atomic():
+        existing.delete()
+        WithdrawalUsage.objects.bulk_create(buckets, batch_size=1000)
+    return len(buckets)
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def usage_for(user, lock=False):
+    """``{'daily_used', 'monthly_used'}`` for right now. One query (two rows)."""
+    starts = bucket_starts(timezone.now())
+    rows = WithdrawalUsage.objects.filter(_bucket_filter(starts), user=user)
+    if lock:
+        _ensure_buckets(user.id, starts)
+        rows = rows.select_for_update()
+    used = {row.period: row.used_amount for row in rows}
+    return {
+        'daily_used': used.get(WithdrawalUsage.PERIOD_DAY, Decimal('0.00')),
+        'monthly_used': used.get(WithdrawalUsage.PERIOD_MONTH, Decimal('0.00')),
+    }
+
+
+def lock_usage(user):
+    """``usage_for`` under a row lock; call inside the transaction that creates the withdrawal."""
+    return usage_for(user, lock=True)
+
+
+def limit_error(amount, usage):
+    """Error message if ``amount`` would exceed today's or this month's limit, else None."""
+    if usage['daily_used'] + amount > DAILY_LIMIT:
+        return f"Daily withdrawal limit of ₦{DAILY_LIMIT:,.2f} reached. Remaining today: ₦{max(DAILY_LIMIT - usage['daily_used'], 0):,.2f}"
+    if usage['monthly_used'] + amount > MONTHLY_LIMIT:
+        return f"Monthly withdrawal limit of ₦{MONTHLY_LIMIT:,.2f} reached. Remaining this month: ₦{max(MONTHLY_LIMIT - usage['monthly_used'], 0):,.2f}"
+    return None
+
+
+def _months_back(start, count):
+    year, month = start.year, start.month - count
+    while month <= 0:
+        month += 12
+        year -= 1
+    return date(year, month, 1)
+
+
+def stats(user, days):
+    """Totals over the last ``days`` days and a completed-withdrawals breakdown for the last six months."""
+    today = timezone.localdate()
+    since = today - timedelta(days=days)
+    first_month = _months_back(today.replace(day=1), BREAKDOWN_MONTHS - 1)
+
+    rows = WithdrawalUsage.objects.filter(
+        Q(period=WithdrawalUsage.PERIOD_DAY, period_start__gte=since)
+        | Q(period=WithdrawalUsage.PERIOD_MONTH, period_start__gte=first_month),
+        user=user,
+    )
+
+    totals = defaultdict(int)
+    months = {}
+    for row in rows:
+        if row.period == WithdrawalUsage.PERIOD_DAY:
+            for field in COUNTERS:
+                totals[field] += getattr(row, field)
+        else:
+            months[row.period_start] = row
+
+    breakdown = []
+    for offset in range(BREAKDOWN_MONTHS - 1, -1, -1):
+        month = _months_back(today.replace(day=1), offset)
+        row = months.get(month)
+        breakdown.append({
+            'month': month.strftime('%B %Y'),
+            'total_amount': float(row.completed_amount) if row else 0.0,
+            'total_count': row.completed_count if row else 0,
+        })
+    return {field: totals[field] for field in COUNTERS}, breakdown
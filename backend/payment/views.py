@@ -3,34 +3,40 @@ import requests
 import logging
 from decimal import Decimal
 from django.conf import settings
-from django.db import models, transaction
+from django.db import transaction
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.core.cache import cache
 import hashlib
 import hmac
 
 logger = logging.getLogger(__name__)
 from .models import WithdrawalRequest
+from .reconciliation import settle_one
+from . import usage as withdrawal_usage
+from wallet import ledger as wallet_ledger
 from wallet.models import WalletTransactionAccount
 from user.models import User
+from stumart import caching, gateways
 
-from django.core.cache import cache
 from django.conf import settings
 import requests
 import logging
 
 logger = logging.getLogger(__name__)
 
+BANKS_CACHE_SECONDS = 60 * 60 * 24
+BANKS_STALE_SECONDS = 60 * 60 * 24 * 7
+
 class PaystackTransferService:
     """Service class to handle Paystack transfers"""
     
     def __init__(self):
+        self.http = gateways.paystack()
         self.secret_key = settings.PAYSTACK_SECRET_KEY
-        self.base_url = "https://api.paystack.co"
+        self.base_url = self.http.base_url
         self.headers = {
             'Authorization': f'Bearer {self.secret_key}',
             'Content-Type': 'application/json'
@@ -41,39 +47,32 @@ class PaystackTransferService:
         Get cached list of banks or fetch from API
         Returns list of banks with their codes
         """
-        cache_key = 'paystack_banks_list'
-        
-        # Try to get from cache first
-        if not force_refresh:
-            cached_banks = cache.get(cache_key)
-            if cached_banks:
-                return cached_banks
-        
-        # Fetch from API
+        cache_key = caching.make_key('paystack', 'banks')
+        if force_refresh:
+            caching.invalidate(cache_key)
+
         try:
-            response = requests.get(
-                f"{self.base_url}/bank",
-                headers=self.headers,
-                timeout=30
-            )
-            response_data = response.json()
-            
-            if response.status_code == 200 and response_data.get('status'):
-                banks = response_data['data']
-                # Cache for 24 hours (86400 seconds)
-                cache.set(cache_key, banks, 86400)
-                logger.info(f"Cached {len(banks)} banks from Paystack")
-                return banks
-            else:
-                logger.error(f"Failed to fetch banks: {response_data.get('message')}")
-                return []
-                
+            # Fresh for 24 hours; served stale for up to a week while Paystack is unreachable
+            return caching.get_or_set(cache_key, self._fetch_banks, BANKS_CACHE_SECONDS, BANKS_STALE_SECONDS)
         except requests.RequestException as e:
             logger.error(f"Network error fetching banks: {str(e)}")
             return []
         except Exception as e:
             logger.error(f"Error fetching banks: {str(e)}")
             return []
+
+    def _fetch_banks(self):
+        response = self.http.get(
+            f"{self.base_url}/bank",
+            headers=self.headers,
+        )
+        response_data = response.json()
+
+        if response.status_code == 200 and response_data.get('status'):
+            banks = response_data['data']
+            logger.info(f"Cached {len(banks)} banks from Paystack")
+            return banks
+        raise ValueError(f"Failed to fetch banks: {response_data.get('message')}")
     
     def get_bank_code(self, bank_name):
         """
@@ -137,7 +136,7 @@ class PaystackTransferService:
         }
         
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
+            response = self.http.get(url, headers=self.headers, params=params)
             data = response.json()
             
             if response.status_code == 200 and data.get('status'):
@@ -190,7 +189,7 @@ class PaystackTransferService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
+            response = self.http.post(url, headers=self.headers, json=data)
             response_data = response.json()
             
             if response.status_code == 201 and response_data.get('status'):
@@ -245,7 +244,7 @@ class PaystackTransferService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
+            response = self.http.post(url, headers=self.headers, json=data)
             response_data = response.json()
             
             if response.status_code == 200 and response_data.get('status'):
@@ -279,7 +278,7 @@ class PaystackTransferService:
         url = f"{self.base_url}/transfer/verify/{reference}"
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.http.get(url, headers=self.headers)
             response_data = response.json()
             
             if response.status_code == 200 and response_data.get('status'):
@@ -635,14 +634,14 @@ class WithdrawalView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Check minimum withdrawal amount
-            min_withdrawal = Decimal('100.00')
+            min_withdrawal = withdrawal_usage.MIN_WITHDRAWAL
             if amount < min_withdrawal:
                 return Response({
                     'error': f'Minimum withdrawal amount is ₦{min_withdrawal}'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Check maximum withdrawal amount
-            max_withdrawal = Decimal('500000.00')  # 500k limit
+            max_withdrawal = withdrawal_usage.MAX_WITHDRAWAL  # 500k limit
             if amount > max_withdrawal:
                 return Response({
                     'error': f'Maximum withdrawal amount is ₦{max_withdrawal}'
@@ -685,24 +684,42 @@ class WithdrawalView(APIView):
             account_name = account_resolution['account_name']
             
             with transaction.atomic():
-                # Create withdrawal request
-                withdrawal_request = WithdrawalRequest.objects.create(
-                    user=user,
-                    user_type=user.user_type,
-                    amount=amount,
-                    bank_name=self.get_bank_name(bank_code),
-                    bank_code=bank_code,
-                    account_number=account_number,
-                    account_name=account_name,
-                    final_amount=amount,
-                    status='pending'
-                )
+                # Daily/monthly limits; the lock makes a user's concurrent requests queue here
+                limit_error = withdrawal_usage.limit_error(amount, withdrawal_usage.lock_usage(user))
+                if limit_error:
+                    return Response({
+                        'error': limit_error
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                try:
+                    with transaction.atomic():
+                        # Create withdrawal request
+                        withdrawal_request = WithdrawalRequest.objects.create(
+                            user=user,
+                            user_type=user.user_type,
+                            amount=amount,
+                            bank_name=self.get_bank_name(bank_code),
+                            bank_code=bank_code,
+                            account_number=account_number,
+                            account_name=account_name,
+                            final_amount=amount,
+                            status='pending'
+                        )
+                        
+                        # Take the money before any transfer starts; the guarded debit
+                        # refuses to overdraw even if a concurrent request passed the check above
+                        self.deduct_from_wallet(user, amount, withdrawal_request.id)
+                except wallet_ledger.InsufficientFunds:
+                    return Response({
+                        'error': f'Insufficient balance. Available: ₦{self.get_user_wallet_balance(user):.2f}'
+                    }, status=status.HTTP_400_BAD_REQUEST)
                 
                 # Create or get existing recipient
                 recipient_code = self.get_or_create_recipient(
                     user, paystack, account_name, account_number, bank_code
                 )
                 if not recipient_code:
+                    self.restore_to_wallet(user, amount, withdrawal_request.id)
                     withdrawal_request.status = 'failed'
                     withdrawal_request.failure_reason = 'Failed to create payment recipient'
                     withdrawal_request.save()
@@ -728,9 +745,6 @@ class WithdrawalView(APIView):
                     withdrawal_request.processed_at = timezone.now()
                     withdrawal_request.save()
                     
-                    # Deduct from user wallet
-                    self.deduct_from_wallet(user, amount, withdrawal_request.id)
-                    
                     return Response({
                         'success': True,
                         'message': 'Withdrawal request processed successfully',
@@ -742,6 +756,7 @@ class WithdrawalView(APIView):
                         'bank_name': withdrawal_request.bank_name
                     }, status=status.HTTP_200_OK)
                 else:
+                    self.restore_to_wallet(user, amount, withdrawal_request.id)
                     withdrawal_request.status = 'failed'
                     withdrawal_request.failure_reason = transfer_result['message']
                     withdrawal_request.save()
@@ -843,36 +858,31 @@ class WithdrawalView(APIView):
             return Decimal('0.00')
     
     def deduct_from_wallet(self, user, amount, withdrawal_id):
-        """Deduct amount from user wallet"""
-        try:
-            if user.user_type == 'vendor':
-                wallet = user.vendor_profile.wallet
-                wallet.balance -= amount
-                wallet.save()
-            elif user.user_type == 'picker':
-                wallet = user.picker_profile.wallet
-                wallet.amount -= amount
-                wallet.save()
-            elif user.user_type == 'student_picker':
-                wallet = user.student_picker_profile.wallet
-                wallet.amount -= amount
-                wallet.save()
-            elif user.user_type == 'company':
-                wallet = user.company_profile.wallet
-                wallet.balance -= amount
-                wallet.save()
-                
-            # Create transaction record
-            WalletTransactionAccount.objects.create(
-                transaction_type='withdrawal',
-                amount=-amount,  # Negative for deduction
-                user=user,
-                description=f"Withdrawal to bank account (Withdrawal ID: {withdrawal_id})",
-            )
-                
-        except Exception as e:
-            logger.error(f"Error deducting from wallet: {str(e)}")
-            raise
+        """Deduct amount from user wallet; raises wallet_ledger.InsufficientFunds"""
+        wallet = wallet_ledger.wallet_for_user(user)
+        
+        # Create transaction record
+        record = WalletTransactionAccount.objects.create(
+            transaction_type='withdrawal',
+            amount=-amount,  # Negative for deduction
+            user=user,
+            description=f"Withdrawal to bank account (Withdrawal ID: {withdrawal_id})",
+        )
+        if wallet is not None:
+            wallet_ledger.debit(wallet, amount, transaction=record)
+    
+    def restore_to_wallet(self, user, amount, withdrawal_id):
+        """Credit back a withdrawal whose transfer never started"""
+        wallet = wallet_ledger.wallet_for_user(user)
+        
+        record = WalletTransactionAccount.objects.create(
+            transaction_type='refund',
+            amount=amount,
+            user=user,
+            description=f"Withdrawal not sent, funds returned (Withdrawal ID: {withdrawal_id})",
+        )
+        if wallet is not None:
+            wallet_ledger.credit(wallet, amount, transaction=record)
     
     def get_or_create_recipient(self, user, paystack, account_name, account_number, bank_code):
         """Get existing recipient code or create new one"""
@@ -935,18 +945,10 @@ class WithdrawalStatusView(APIView):
                 verification_result = paystack.verify_transfer(withdrawal.paystack_reference)
                 
                 if verification_result['success']:
-                    # Update status based on Paystack response
-                    paystack_status = verification_result['status']
-                    if paystack_status == 'success' and withdrawal.status != 'completed':
-                        withdrawal.status = 'completed'
-                        withdrawal.completed_at = timezone.now()
-                        withdrawal.save()
-                    elif paystack_status == 'failed' and withdrawal.status != 'failed':
-                        withdrawal.status = 'failed'
-                        withdrawal.failure_reason = 'Transfer failed at Paystack'
-                        withdrawal.save()
-                        # Refund wallet
-                        self.refund_wallet(withdrawal)
+                    # Same locked transition (and refund) as the webhook and the poller
+                    withdrawal, _ = settle_one(
+                        verification_result['status'], verification_result.get('reason'), pk=withdrawal.pk
+                    )
             
             return Response({
                 'success': True,
@@ -972,40 +974,6 @@ class WithdrawalStatusView(APIView):
             return Response({
                 'error': 'Failed to check withdrawal status'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    def refund_wallet(self, withdrawal):
-        """Refund amount back to user wallet"""
-        try:
-            user = withdrawal.user
-            amount = withdrawal.amount
-            
-            if user.user_type == 'vendor':
-                wallet = user.vendor_profile.wallet
-                wallet.balance += amount
-                wallet.save()
-            elif user.user_type == 'picker':
-                wallet = user.picker_profile.wallet
-                wallet.amount += amount
-                wallet.save()
-            elif user.user_type == 'student_picker':
-                wallet = user.student_picker_profile.wallet
-                wallet.amount += amount
-                wallet.save()
-            elif user.user_type == 'company':
-                wallet = user.company_profile.wallet
-                wallet.balance += amount
-                wallet.save()
-            
-            # Create refund transaction record
-            WalletTransactionAccount.objects.create(
-                transaction_type='refund',
-                amount=amount,
-                user=user,
-                description=f"Refund for failed withdrawal - {withdrawal.paystack_reference}",
-            )
-            
-        except Exception as e:
-            logger.error(f"Error refunding wallet: {str(e)}")
 
 class WithdrawalLimitsView(APIView):
     """Get withdrawal limits and user info"""
@@ -1018,28 +986,17 @@ class WithdrawalLimitsView(APIView):
             # Get wallet balance
             wallet_balance = self.get_user_wallet_balance(user)
             
-            # Get daily/monthly withdrawal totals
-            today = timezone.now().date()
-            current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            daily_total = WithdrawalRequest.objects.filter(
-                user=user,
-                status__in=['completed', 'processing'],
-                created_at__date=today
-            ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-            
-            monthly_total = WithdrawalRequest.objects.filter(
-                user=user,
-                status__in=['completed', 'processing'],
-                created_at__gte=current_month
-            ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+            # Get daily/monthly withdrawal totals (precomputed buckets, one query)
+            current_usage = withdrawal_usage.usage_for(user)
+            daily_total = current_usage['daily_used']
+            monthly_total = current_usage['monthly_used']
             
             # Define limits
             limits = {
-                'min_withdrawal': Decimal('100.00'),
-                'max_withdrawal': Decimal('500000.00'),
-                'daily_limit': Decimal('1000000.00'),  # 1M per day
-                'monthly_limit': Decimal('10000000.00'),  # 10M per month
+                'min_withdrawal': withdrawal_usage.MIN_WITHDRAWAL,
+                'max_withdrawal': withdrawal_usage.MAX_WITHDRAWAL,
+                'daily_limit': withdrawal_usage.DAILY_LIMIT,
+                'monthly_limit': withdrawal_usage.MONTHLY_LIMIT,
             }
             
             # Check if user has pending withdrawals
@@ -1109,48 +1066,15 @@ class WithdrawalStatsView(APIView):
             except ValueError:
                 days = 30
             
-            start_date = timezone.now() - timezone.timedelta(days=days)
-            
-            # Get withdrawal stats
-            withdrawals = WithdrawalRequest.objects.filter(
-                user=user,
-                created_at__gte=start_date
-            )
-            
-            total_withdrawals = withdrawals.count()
-            successful_withdrawals = withdrawals.filter(status='completed').count()
-            failed_withdrawals = withdrawals.filter(status='failed').count()
-            pending_withdrawals = withdrawals.filter(status__in=['pending', 'processing']).count()
-            
-            total_amount = withdrawals.filter(
-                status__in=['completed', 'processing']
-            ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+            # Day buckets for the window and month buckets for the breakdown, one query
+            totals, monthly_stats = withdrawal_usage.stats(user, days)
             
-            successful_amount = withdrawals.filter(
-                status='completed'
-            ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-            
-            # Get monthly breakdown
-            monthly_stats = []
-            for i in range(6):  # Last 6 months
-                month_start = (timezone.now() - timezone.timedelta(days=30*i)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                month_end = (month_start + timezone.timedelta(days=32)).replace(day=1) - timezone.timedelta(seconds=1)
-                
-                month_withdrawals = WithdrawalRequest.objects.filter(
-                    user=user,
-                    created_at__gte=month_start,
-                    created_at__lte=month_end,
-                    status='completed'
-                )
-                
-                month_total = month_withdrawals.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-                month_count = month_withdrawals.count()
-                
-                monthly_stats.append({
-                    'month': month_start.strftime('%B %Y'),
-                    'total_amount': float(month_total),
-                    'total_count': month_count
-                })
+            total_withdrawals = totals['total_count']
+            successful_withdrawals = totals['completed_count']
+            failed_withdrawals = totals['failed_count']
+            pending_withdrawals = totals['open_count']
+            total_amount = totals['used_amount']
+            successful_amount = totals['completed_amount']
             
             return Response({
                 'success': True,
@@ -1165,7 +1089,7 @@ class WithdrawalStatsView(APIView):
                     'successful_amount': float(successful_amount),
                     'average_withdrawal': float(successful_amount / successful_withdrawals) if successful_withdrawals > 0 else 0
                 },
-                'monthly_breakdown': monthly_stats[::-1]  # Reverse to show oldest first
+                'monthly_breakdown': monthly_stats  # Oldest first
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -1222,105 +1146,43 @@ class PaystackWebhookView(APIView):
     
     def handle_transfer_success(self, data):
         """Handle successful transfer"""
-        try:
-            reference = data.get('reference')
-            if not reference:
-                logger.error("No reference in transfer success webhook")
-                return
-            
-            withdrawal = WithdrawalRequest.objects.get(paystack_reference=reference)
-            withdrawal.status = 'completed'
-            withdrawal.completed_at = timezone.now()
-            withdrawal.save()
-            
-            logger.info(f"Transfer completed successfully: {reference}")
-            
-        except WithdrawalRequest.DoesNotExist:
-            logger.error(f"Withdrawal request not found for reference: {reference}")
-        except Exception as e:
-            logger.error(f"Error handling transfer success: {str(e)}")
+        self.settle_transfer(data, 'success')
     
     def handle_transfer_failed(self, data):
-        """Handle failed transfer"""
-        try:
-            reference = data.get('reference')
-            if not reference:
-                logger.error("No reference in transfer failed webhook")
-                return
-                
-            withdrawal = WithdrawalRequest.objects.get(paystack_reference=reference)
-            withdrawal.status = 'failed'
-            withdrawal.failure_reason = data.get('reason', 'Transfer failed')
-            withdrawal.save()
-            
-            # Refund user wallet
-            self.refund_wallet(withdrawal)
-            
-            logger.info(f"Transfer failed: {reference} - {withdrawal.failure_reason}")
-            
-        except WithdrawalRequest.DoesNotExist:
-            logger.error(f"Withdrawal request not found for reference: {reference}")
-        except Exception as e:
-            logger.error(f"Error handling transfer failure: {str(e)}")
+        """Handle failed transfer (the wallet is refunded as part of settling)"""
+        self.settle_transfer(data, 'failed')
     
     def handle_transfer_reversed(self, data):
-        """Handle reversed transfer"""
+        """Handle reversed transfer (the wallet is refunded as part of settling)"""
+        self.settle_transfer(data, 'reversed')
+    
+    def settle_transfer(self, data, paystack_status):
+        """
+        Settle a withdrawal from a transfer event, refunding the wallet if it
+        failed or was reversed. Returns the withdrawal if it changed, None for
+        unknown references and for payouts that were already settled
+        (redelivered events, or the poller got there first), so refunds only
+        ever happen once.
+        """
+        reference = data.get('reference')
+        if not reference:
+            logger.error(f"No reference in transfer {paystack_status} webhook")
+            return None
+        
         try:
-            reference = data.get('reference')
-            if not reference:
-                logger.error("No reference in transfer reversed webhook")
-                return
-                
-            withdrawal = WithdrawalRequest.objects.get(paystack_reference=reference)
-            withdrawal.status = 'cancelled'
-            withdrawal.failure_reason = 'Transfer was reversed'
-            withdrawal.save()
-            
-            # Refund user wallet
-            self.refund_wallet(withdrawal)
+            withdrawal, changed = settle_one(paystack_status, data.get('reason'), paystack_reference=reference)
+            if not changed:
+                logger.info(f"Transfer {reference} already {withdrawal.status}; ignoring {paystack_status} webhook")
+                return None
             
-            logger.info(f"Transfer reversed: {reference}")
+            logger.info(f"Transfer {paystack_status}: {reference} -> {withdrawal.status}")
+            return withdrawal
             
         except WithdrawalRequest.DoesNotExist:
             logger.error(f"Withdrawal request not found for reference: {reference}")
         except Exception as e:
-            logger.error(f"Error handling transfer reversal: {str(e)}")
-    
-    def refund_wallet(self, withdrawal):
-        """Refund amount back to user wallet"""
-        try:
-            user = withdrawal.user
-            amount = withdrawal.amount
-            
-            if user.user_type == 'vendor':
-                wallet = user.vendor_profile.wallet
-                wallet.balance += amount
-                wallet.save()
-            elif user.user_type == 'picker':
-                wallet = user.picker_profile.wallet
-                wallet.amount += amount
-                wallet.save()
-            elif user.user_type == 'student_picker':
-                wallet = user.student_picker_profile.wallet
-                wallet.amount += amount
-                wallet.save()
-            elif user.user_type == 'company':
-                wallet = user.company_profile.wallet
-                wallet.balance += amount
-                wallet.save()
-            
-            # Create refund transaction record
-            WalletTransactionAccount.objects.create(
-                transaction_type='refund',
-                amount=amount,
-                user=user,
-                description=f"Refund for failed withdrawal - {withdrawal.paystack_reference}",
-            )
-            
-            logger.info(f"Wallet refunded for user {user.id}, amount: {amount}")
-            
-        except Exception as e:
-            logger.error(f"Error refunding wallet: {str(e)}")
+            logger.error(f"Error handling transfer {paystack_status}: {str(e)}")
+        return None
 
 class BankSearchView(APIView):
     """Search for banks by name"""
@@ -12,6 +12,7 @@ from stumart.models import Order, OrderItem, Transaction, PickerReview
 from user.models import User, Picker, StudentPicker, KYCVerification, Vendor, Company, CompanyRider
 from .serializers import OrderItemSerializer, OrderSerializer, OrderDetailSerializer
 from wallet.models import PickerWalletAccount, VendorWallets, CompanyWallet
+from wallet import ledger as wallet_ledger
 from django.conf import settings
 from django.core.mail import send_mail
 from decimal import Decimal
@@ -961,8 +962,7 @@ class ConfirmDeliveryView(APIView):
                             vendor=vendor,
                             defaults={'balance': 0}
                         )
-                        wallet.balance += amount
-                        wallet.save()
+                        wallet_ledger.credit(wallet, amount, memo=f"Order #{order.id} delivered")
                         logger.info(f"Updated wallet for vendor {vendor_id}, new balance: {wallet.balance}")
                         
                         # Send email notification to vendor
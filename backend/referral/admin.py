@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
+from . import earnings
 from .models import Referral, PayoutHistory
 from .email_utils import send_payout_notification_email
 
@@ -118,46 +119,16 @@ class ReferralAdmin(admin.ModelAdmin):
     
     def update_referral_stats(self, request, queryset):
         """Admin action to update stats for selected referrals"""
-        updated_count = 0
-        for referral in queryset:
-            referral.update_stats()
-            updated_count += 1
+        updated_count = earnings.rebuild(queryset)
         
         self.message_user(request, f'Successfully updated stats for {updated_count} referral(s).')
     update_referral_stats.short_description = "Update statistics for selected referrals"
     
     def reset_earnings_and_create_payout(self, request, queryset):
         """Admin action to reset earnings and create payout records"""
-        from django.db import transaction
-        
-        reset_count = 0
-        total_amount = 0
-        
-        for referral in queryset:
-            # Update stats first
-            referral.update_stats()
-            
-            if referral.total_earnings > 0:
-                payout_amount = referral.total_earnings
-                referral_count = referral.total_referrals
-                period_end = timezone.now()
-                period_start = referral.last_reset_date if referral.last_reset_date else referral.created_at
-                
-                with transaction.atomic():
-                    # Reset earnings
-                    referral.reset_earnings()
-                    
-                    # Create payout history
-                    PayoutHistory.objects.create(
-                        referral=referral,
-                        amount=payout_amount,
-                        referral_count=referral_count,
-                        period_start=period_start,
-                        period_end=period_end
-                    )
-                
-                reset_count += 1
-                total_amount += payout_amount
+        payouts = earnings.bulk_reset(queryset, active_only=False)
+        reset_count = len(payouts)
+        total_amount = sum(payout.amount for payout in payouts)
         
         self.message_user(
             request,
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReferralConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'referral'
+
+    def ready(self):
+        """Connect referral earnings counters"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,163 @@
+# earnings.py
+"""
+Referral earnings counters.
+
+A referral earns ``EARNING_PER_REFERRAL`` for every order carrying its code
+that reaches COMPLETED or DELIVERED. Instead of recounting orders on every
+read, ``track`` (wired to Order post_save in referral/signals.py) applies
++1 / -1 to the referral's current-period and lifetime counters with F()
+updates, inside the transaction that moves the order:
+
+    entering COMPLETED/DELIVERED    +1 referral, +EARNING_PER_REFERRAL
+    leaving them (e.g. cancelled)   -1, never below zero
+
+Moving between the two counted statuses changes nothing.
+
+    bulk_reset    the payout run: locks the referrals with earnings, writes
+                  their PayoutHistory rows with one bulk_create and zeroes
+                  the current period with one UPDATE (active referrals only,
+                  unless an admin picked them — see ``payable``)
+    rebuild       recomputes the counters from Order with grouped counts
+                  (first deploy, or after manual data fixes); wallet
+                  spends since the last reset stay deducted
+
+``python manage.py rebuild_referral_stats`` runs ``rebuild``.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from order.signals import UNKNOWN
+
+from .models import PayoutHistory, Referral
+
+logger = logging.getLogger(__name__)
+
+EARNING_PER_REFERRAL = Decimal('200.00')
+COUNTED_STATUSES = ('COMPLETED', 'DELIVERED')
+
+
+def _apply(referral_code, delta):
+    amount = EARNING_PER_REFERRAL * delta
+    if delta > 0:
+        changes = dict(
+            total_referrals=F('total_referrals') + delta,
+            total_earnings=F('total_earnings') + amount,
+            lifetime_referrals=F('lifetime_referrals') + delta,
+            lifetime_earnings=F('lifetime_earnings') + amount,
+        )
+    else:
+        zero = Value(Decimal('0.00'))
+        changes = dict(
+            total_referrals=Greatest(F('total_referrals') + delta, Value(0)),
+            total_earnings=Greatest(F('total_earnings') + amount, zero),
+            lifetime_referrals=Greatest(F('lifetime_referrals') + delta, Value(0)),
+            lifetime_earnings=Greatest(F('lifetime_earnings') + amount, zero),
+        )
+    return Referral.objects.filter(referral_code=referral_code).update(**changes)
+
+
+def track(order, previous):
+    """
+    Apply ``order``'s move from ``previous`` (None for a new order) to its
+    current status to its referral's counters. The signal receiver takes
+    ``previous`` from order.signals.status_change, which yields UNKNOWN when
+    the status was deferred — that change can't be counted and is skipped.
+    """
+    if not order.referral_code or previous is UNKNOWN:
+        return
+
+    was_counted = previous in COUNTED_STATUSES
+    is_counted = order.order_status in COUNTED_STATUSES
+    if was_counted != is_counted:
+        _apply(order.referral_code.upper(), 1 if is_counted else -1)
+
+
+# ── Payouts ───────────────────────────────────────────────────────────────────
+
+def payable(queryset=None, active_only=True):
+    """The referrals in ``queryset`` (all by default) with current-period earnings to pay out."""
+    referrals = Referral.objects.all() if queryset is None else queryset
+    referrals = referrals.filter(total_earnings__gt=0)
+    return referrals.filter(is_active=True) if active_only else referrals
+
+
+def bulk_reset(queryset=None, now=None, active_only=True):
+    """
+    Pay out the current period of every referral in ``queryset`` (all by
+    default) that has earnings. The payout run skips inactive referrals;
+    an admin paying out chosen referrals passes ``active_only=False``.
+    Returns the PayoutHistory rows created.
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        due = list(payable(queryset, active_only).select_for_update().order_by('pk'))
+        if not due:
+            return []
+
+        payouts = PayoutHistory.objects.bulk_create([
+            PayoutHistory(
+                referral=referral,
+                amount=referral.total_earnings,
+                referral_count=referral.total_referrals,
+                period_start=referral.last_reset_date or referral.created_at,
+                period_end=now,
+            )
+            for referral in due
+        ], batch_size=1000)
+
+        # Right-hand F() refs read the pre-update row, so this pays out and zeroes in one statement
+        Referral.objects.filter(pk__in=[referral.pk for referral in due]).update(
+            last_payout_amount=F('total_earnings'),
+            total_paid_out=F('total_paid_out') + F('total_earnings'),
+            last_payout_date=now,
+            last_reset_date=now,
+            total_referrals=0,
+            total_earnings=0,
+        )
+
+    logger.info("Referral payout run: %d referrals, ₦%s", len(payouts), sum(p.amount for p in payouts))
+    return payouts
+
+
+# ── Rebuild ───────────────────────────────────────────────────────────────────
+
+def rebuild(queryset=None):
+    """Recompute counters for ``queryset`` (all referrals by default). Returns the number updated."""
+    from stumart.models import Order
+
+    referrals = Referral.objects.all() if queryset is None else queryset
+    counted = Order.objects.filter(order_status__in=COUNTED_STATUSES)
+
+    lifetime = dict(counted.values('referral_code').annotate(n=Count('id')).values_list('referral_code', 'n'))
+    rows = referrals.annotate(period_start=Coalesce('last_reset_date', 'created_at')).annotate(
+        period_count=Coalesce(Subquery(
+            counted.filter(referral_code=OuterRef('referral_code'), created_at__gte=OuterRef('period_start'))
+            .values('referral_code').annotate(n=Count('id')).values('n')[:1]
+        ), 0),
+        # Wallet payments are the payouts whose period ends after the last reset
+        # (a reset's own payout ends exactly at last_reset_date)
+        spent=Coalesce(Subquery(
+            PayoutHistory.objects.filter(referral=OuterRef('pk'), period_end__gt=OuterRef('period_start'))
+            .values('referral').annotate(total=Sum('amount')).values('total')[:1]
+        ), Value(Decimal('0.00'))),
+    )
+
+    updated = []
+    for referral in rows:
+        lifetime_count = lifetime.get(referral.referral_code, 0)
+        referral.total_earnings = max(referral.period_count * EARNING_PER_REFERRAL - referral.spent, Decimal('0.00'))
+        referral.total_referrals = int(referral.total_earnings // EARNING_PER_REFERRAL)
+        referral.lifetime_referrals = lifetime_count
+        referral.lifetime_earnings = lifetime_count * EARNING_PER_REFERRAL
+        updated.append(referral)
+
+    Referral.objects.bulk_update(
+        updated, ['total_referrals', 'total_earnings', 'lifetime_referrals', 'lifetime_earnings'], batch_size=1000,
+    )
+    return len(updated)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from referral.earnings import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute referral counters and earnings from Order'
+
+    def handle(self, *args, **options):
+        updated = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {updated} referral(s)"))
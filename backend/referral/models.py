@@ -74,38 +74,15 @@ class Referral(models.Model):
 
     def update_stats(self):
         """
-        Update total referrals and earnings based on completed orders
-        This should be called after an order status changes to COMPLETED/DELIVERED
+        Recount this referral's stats from its orders.
+        The counters are kept current as orders complete (referral/earnings.py),
+        so this is only needed to repair them.
         """
-        from django.db.models import Count, Q
-        from stumart.models import Order  # Adjust import based on your app name
-        
-        # Get date range for current period (since last reset or beginning)
-        start_date = self.last_reset_date if self.last_reset_date else self.created_at
-        
-        # Count completed orders in current period
-        current_period_orders = Order.objects.filter(
-            referral_code=self.referral_code,
-            order_status__in=['COMPLETED', 'DELIVERED'],
-            created_at__gte=start_date
-        ).count()
-        
-        # Count all lifetime completed orders
-        lifetime_orders = Order.objects.filter(
-            referral_code=self.referral_code,
-            order_status__in=['COMPLETED', 'DELIVERED']
-        ).count()
-        
-        # Update current period stats
-        self.total_referrals = current_period_orders
-        self.total_earnings = current_period_orders * 200  # 200 per referral
-        
-        # Update lifetime stats
-        self.lifetime_referrals = lifetime_orders
-        self.lifetime_earnings = lifetime_orders * 200
-        
-        self.save(update_fields=[
-            'total_referrals', 
+        from .earnings import rebuild
+
+        rebuild(Referral.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=[
+            'total_referrals',
             'total_earnings',
             'lifetime_referrals',
             'lifetime_earnings'
@@ -180,29 +157,28 @@ class Referral(models.Model):
         """
         Get comprehensive statistics for this referral
         """
+        from django.db.models import Count, Q
         from stumart.models import Order  # Adjust import based on your app name
+        from .earnings import COUNTED_STATUSES, EARNING_PER_REFERRAL
         
-        # Current period stats
+        # Current period order counts in one query
         start_date = self.last_reset_date if self.last_reset_date else self.created_at
-        current_period_orders = Order.objects.filter(
+        counts = Order.objects.filter(
             referral_code=self.referral_code,
             created_at__gte=start_date
+        ).aggregate(
+            total_orders=Count('id'),
+            completed_orders=Count('id', filter=Q(order_status__in=COUNTED_STATUSES)),
+            pending_orders=Count('id', filter=Q(order_status='PENDING')),
         )
         
-        # All time stats
-        all_orders = Order.objects.filter(referral_code=self.referral_code)
-        
         stats = {
             # Current period
-            'total_orders': current_period_orders.count(),
-            'completed_orders': current_period_orders.filter(
-                order_status__in=['COMPLETED', 'DELIVERED']
-            ).count(),
-            'pending_orders': current_period_orders.filter(
-                order_status='PENDING'
-            ).count(),
+            'total_orders': counts['total_orders'],
+            'completed_orders': counts['completed_orders'],
+            'pending_orders': counts['pending_orders'],
             'total_earnings': float(self.total_earnings),
-            'potential_earnings': current_period_orders.count() * 200,
+            'potential_earnings': counts['total_orders'] * int(EARNING_PER_REFERRAL),
             
             # Lifetime stats
             'lifetime_referrals': self.lifetime_referrals,
@@ -0,0 +1,14 @@
+# signals.py
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from order.signals import status_change
+from stumart.models import Order
+from . import earnings
+
+
+@receiver(post_save, sender=Order)
+def update_referral_earnings(sender, instance, **kwargs):
+    """Credit (or take back) the referral when an order enters (or leaves) COMPLETED/DELIVERED."""
+    previous, _ = status_change(instance, 'referral_earnings')
+    earnings.track(instance, previous)
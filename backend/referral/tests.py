@@ -1,3 +1,44 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from order.signals import UNKNOWN
+from referral import earnings, signals
+from stumart.models import Order
+
+
+class TrackTest(SimpleTestCase):
+    def order(self, status, code='ab12'):
+        return Order(referral_code=code, order_status=status)
+
+    @mock.patch('referral.earnings._apply')
+    def test_counts_entering_and_leaving_completed(self, apply):
+        earnings.track(self.order('COMPLETED'), 'PENDING')
+        earnings.track(self.order('CANCELLED'), 'DELIVERED')
+        self.assertEqual(apply.call_args_list, [mock.call('AB12', 1), mock.call('AB12', -1)])
+
+    @mock.patch('referral.earnings._apply')
+    def test_ignores_unchanged_unknown_and_unreferred(self, apply):
+        earnings.track(self.order('DELIVERED'), 'COMPLETED')
+        earnings.track(self.order('COMPLETED'), UNKNOWN)
+        earnings.track(self.order('COMPLETED', code=None), None)
+
+        # The receiver sees each transition once, however often the order is saved
+        order = self.order('COMPLETED')
+        signals.update_referral_earnings(Order, order)
+        signals.update_referral_earnings(Order, order)
+        self.assertEqual(apply.call_count, 1)
+
+
+class PayableTest(SimpleTestCase):
+    def where(self, **kwargs):
+        return str(earnings.payable(**kwargs).query).split('WHERE', 1)[1]
+
+    def test_payout_run_skips_inactive_referrals(self):
+        self.assertIn('is_active', self.where())
+
+    def test_admin_selection_includes_inactive_referrals(self):
+        # The single-referral reset and the admin action pay out deactivated referrals too
+        where = self.where(active_only=False)
+        self.assertIn('total_earnings', where)
+        self.assertNotIn('is_active', where)
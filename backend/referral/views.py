@@ -7,6 +7,7 @@ from django.utils import timezone
 from django.db import transaction
 from django.db.models import Sum, Count, Q
 
+from . import earnings
 from .models import Referral, PayoutHistory
 from .serializers import (
     ReferralCreateSerializer,
@@ -106,40 +107,37 @@ class ListAllReferralsView(APIView):
     permission_classes = [IsAdminUser]
     
     def get(self, request):
-        # Get all referrals
+        # Get all referrals (stats are kept current as orders complete)
         referrals = Referral.objects.all().order_by('-created_at')
         
-        # Update stats for all referrals
-        for referral in referrals:
-            referral.update_stats()
-        
         # Serialize referrals
         serializer = ReferralListSerializer(referrals, many=True)
         
-        # Calculate aggregate statistics
+        # Calculate aggregate statistics in one query
+        totals = referrals.aggregate(
+            count=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            lifetime_earnings=Sum('lifetime_earnings'),
+            current_earnings=Sum('total_earnings'),
+            paid_out=Sum('total_paid_out'),
+            completed_orders=Sum('total_referrals'),
+            lifetime_orders=Sum('lifetime_referrals'),
+        )
         aggregate_stats = {
-            'total_referrals': referrals.count(),
-            'total_active': referrals.filter(is_active=True).count(),
-            'total_lifetime_earnings': float(referrals.aggregate(
-                total=Sum('lifetime_earnings')
-            )['total'] or 0),
-            'total_current_earnings': float(referrals.aggregate(
-                total=Sum('total_earnings')
-            )['total'] or 0),
-            'total_paid_out': float(referrals.aggregate(
-                total=Sum('total_paid_out')
-            )['total'] or 0),
-            'total_pending_payout': float(referrals.aggregate(
-                total=Sum('total_earnings')
-            )['total'] or 0),
-            'total_completed_orders': sum(r.total_referrals for r in referrals),
-            'total_lifetime_orders': sum(r.lifetime_referrals for r in referrals),
+            'total_referrals': totals['count'],
+            'total_active': totals['active'],
+            'total_lifetime_earnings': float(totals['lifetime_earnings'] or 0),
+            'total_current_earnings': float(totals['current_earnings'] or 0),
+            'total_paid_out': float(totals['paid_out'] or 0),
+            'total_pending_payout': float(totals['current_earnings'] or 0),
+            'total_completed_orders': totals['completed_orders'] or 0,
+            'total_lifetime_orders': totals['lifetime_orders'] or 0,
         }
         
         return Response({
             'referrals': serializer.data,
             'summary': aggregate_stats,
-            'total_count': referrals.count()
+            'total_count': totals['count']
         }, status=status.HTTP_200_OK)
 
 
@@ -154,9 +152,6 @@ class GetReferralByCodeView(APIView):
     def get(self, request, referral_code):
         referral = get_student_referral_for_user(request.user, referral_code=referral_code)
         
-        # Update stats before returning
-        referral.update_stats()
-        
         serializer = ReferralDetailSerializer(referral)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -172,9 +167,6 @@ class GetReferralByEmailView(APIView):
     def get(self, request, email):
         referral = get_student_referral_for_user(request.user)
         
-        # Update stats before returning
-        referral.update_stats()
-        
         serializer = ReferralDetailSerializer(referral)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -219,9 +211,6 @@ class ReferralStatsView(APIView):
     def get(self, request, referral_code):
         referral = get_student_referral_for_user(request.user, referral_code=referral_code)
         
-        # Update stats
-        referral.update_stats()
-        
         stats = referral.get_stats()
         
         return Response({
@@ -266,33 +255,20 @@ class ResetReferralEarningsView(APIView):
         referral_code = referral_code.upper()
         referral = get_object_or_404(Referral, referral_code=referral_code)
         
-        # Update stats first to ensure accurate amounts
-        referral.update_stats()
-        
-        # Store payout info before reset
-        payout_amount = referral.total_earnings
-        referral_count = referral.total_referrals
-        period_end = timezone.now()
-        period_start = referral.last_reset_date if referral.last_reset_date else referral.created_at
-        
-        if payout_amount <= 0:
+        # An admin picked this referral, so pay it out even if it has been deactivated
+        payouts = earnings.bulk_reset(Referral.objects.filter(pk=referral.pk), active_only=False)
+        if not payouts:
             return Response({
                 'error': 'No earnings to reset',
                 'message': 'This referral has no current earnings to payout.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        with transaction.atomic():
-            # Reset the earnings
-            payout_info = referral.reset_earnings()
-            
-            # Create payout history record
-            payout_history = PayoutHistory.objects.create(
-                referral=referral,
-                amount=payout_amount,
-                referral_count=referral_count,
-                period_start=period_start,
-                period_end=period_end
-            )
+        referral.refresh_from_db()
+        payout_info = {
+            'payout_amount': float(referral.last_payout_amount),
+            'payout_date': referral.last_payout_date,
+            'total_paid_out': float(referral.total_paid_out)
+        }
         
         return Response({
             'message': 'Earnings reset successfully',
@@ -314,59 +290,29 @@ class BulkResetEarningsView(APIView):
     permission_classes = [IsAdminUser]
     
     def post(self, request):
-        # Get all referrals with earnings
-        referrals_with_earnings = Referral.objects.filter(
-            total_earnings__gt=0,
-            is_active=True
-        )
+        # Lock, record and zero every referral with earnings in a few statements
+        payouts = earnings.bulk_reset()
         
-        if not referrals_with_earnings.exists():
+        if not payouts:
             return Response({
                 'message': 'No referrals with earnings to reset',
                 'count': 0
             }, status=status.HTTP_200_OK)
         
-        reset_count = 0
-        total_amount = 0
-        payout_records = []
-        
-        with transaction.atomic():
-            for referral in referrals_with_earnings:
-                # Update stats first
-                referral.update_stats()
-                
-                if referral.total_earnings > 0:
-                    # Store info before reset
-                    payout_amount = referral.total_earnings
-                    referral_count = referral.total_referrals
-                    period_end = timezone.now()
-                    period_start = referral.last_reset_date if referral.last_reset_date else referral.created_at
-                    
-                    # Reset earnings
-                    referral.reset_earnings()
-                    
-                    # Create payout history
-                    PayoutHistory.objects.create(
-                        referral=referral,
-                        amount=payout_amount,
-                        referral_count=referral_count,
-                        period_start=period_start,
-                        period_end=period_end
-                    )
-                    
-                    reset_count += 1
-                    total_amount += payout_amount
-                    
-                    payout_records.append({
-                        'referral_code': referral.referral_code,
-                        'name': f"{referral.first_name} {referral.last_name}",
-                        'email': referral.email,
-                        'amount': float(payout_amount)
-                    })
+        payout_records = [
+            {
+                'referral_code': payout.referral.referral_code,
+                'name': f"{payout.referral.first_name} {payout.referral.last_name}",
+                'email': payout.referral.email,
+                'amount': float(payout.amount)
+            }
+            for payout in payouts
+        ]
+        total_amount = sum(payout.amount for payout in payouts)
         
         return Response({
-            'message': f'Successfully reset earnings for {reset_count} referrals',
-            'count': reset_count,
+            'message': f'Successfully reset earnings for {len(payouts)} referrals',
+            'count': len(payouts),
             'total_amount': float(total_amount),
             'payouts': payout_records
         }, status=status.HTTP_200_OK)
@@ -7,7 +7,9 @@ class StumartConfig(AppConfig):
     name = 'stumart'
 
     def ready(self):
-        """Start scheduler when Django starts"""
+        """Connect signal handlers and start scheduler when Django starts"""
+        from . import signals  # noqa: F401
+
         # Only start scheduler in main process, not in reloader
         if os.environ.get('RUN_MAIN') != 'true':
             return
@@ -0,0 +1,151 @@
+# caching.py
+"""
+Cache-aside helpers over Django's default cache (Redis or memcached in
+production, so every worker shares entries and invalidations).
+
+    from stumart import caching
+    banks = caching.get_or_set(
+        caching.make_key('paystack', 'banks'), fetch_banks,
+        timeout=86400, stale_timeout=3600,
+    )
+
+Entries are stored as ``(value, fresh_until)`` and kept ``stale_timeout``
+seconds past freshness:
+
+    fresh      served directly
+    stale      served while the one caller that wins the entry's lock
+               (``cache.add``) rebuilds it — stale-while-revalidate; if
+               the rebuild raises, the stale value keeps being served
+    missing    the lock winner builds; everyone else waits up to
+               ``LOCK_WAIT_SECONDS`` (while the lock is held) for its
+               result before building themselves, so an expired hot key
+               costs one backend call instead of one per worker
+
+A cache outage (the backends are configured to swallow errors) reads as a
+miss with no lock to wait on, so callers build straight away.
+
+Keys are ``<namespace>:<part>:...`` (``make_key``); ``settings.CACHES``
+adds the deployment-wide ``KEY_PREFIX``. ``stats()`` reports hits, misses,
+stale serves, builds and lock waits per namespace for this process.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 30
+LOCK_WAIT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.05
+
+_metrics = defaultdict(Counter)
+_metrics_lock = threading.Lock()
+
+
+def make_key(namespace, *parts):
+    return ':'.join(str(part) for part in (namespace, *parts))
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def _record(namespace, event):
+    with _metrics_lock:
+        _metrics[namespace][event] += 1
+
+
+def _unpack(entry):
+    # Anything not written by this module (e.g. a value from before a deploy) is a miss
+    if isinstance(entry, tuple) and len(entry) == 2:
+        return entry
+    return None
+
+
+def _build(key, namespace, build, timeout, stale_timeout, cacheable):
+    value = build()
+    _record(namespace, 'builds')
+    if cacheable is None or cacheable(value):
+        cache.set(key, (value, time.time() + timeout), timeout + stale_timeout)
+    return value
+
+
+def fetch(key, build, timeout, stale_timeout=0, namespace=None, cacheable=None):
+    """
+    ``(value, cached)`` for ``key``, calling ``build()`` on a miss. Values
+    for which ``cacheable(value)`` is false are returned but not stored.
+    Exceptions from ``build`` propagate unless a stale value can be served.
+    """
+    namespace = namespace or key.split(':', 1)[0]
+    entry = _unpack(cache.get(key))
+
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            _record(namespace, 'hits')
+            return value, True
+        _record(namespace, 'stale')
+        if not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+            return value, True
+        try:
+            return _build(key, namespace, build, timeout, stale_timeout, cacheable), False
+        except Exception:
+            logger.exception("Rebuilding cache entry %s failed; serving stale value", key)
+            return value, True
+        finally:
+            cache.delete(_lock_key(key))
+
+    _record(namespace, 'misses')
+    locked = cache.add(_lock_key(key), 1, LOCK_TIMEOUT)
+    if locked is None:
+        # The backend swallowed an error (IGNORE_EXCEPTIONS) — there is no
+        # lock to wait on, so build now rather than stall every request
+        return _build(key, namespace, build, timeout, stale_timeout, cacheable), False
+    if locked:
+        try:
+            return _build(key, namespace, build, timeout, stale_timeout, cacheable), False
+        finally:
+            cache.delete(_lock_key(key))
+
+    # Someone else is building it — give them a moment before piling on
+    _record(namespace, 'lock_waits')
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        lock_held = cache.get(_lock_key(key)) is not None
+        entry = _unpack(cache.get(key))
+        if entry is not None:
+            return entry[0], True
+        if not lock_held:
+            # The builder gave up without storing, or the backend stopped
+            # answering (gets come back empty) — waiting longer won't help
+            break
+    return _build(key, namespace, build, timeout, stale_timeout, cacheable), False
+
+
+def get_or_set(key, build, timeout, stale_timeout=0, namespace=None, cacheable=None):
+    """``fetch`` without the cached flag."""
+    return fetch(key, build, timeout, stale_timeout, namespace, cacheable)[0]
+
+
+def invalidate(key):
+    cache.delete(key)
+
+
+def stats():
+    """``{namespace: {hits, misses, stale, builds, lock_waits, hit_ratio}}`` for this process."""
+    with _metrics_lock:
+        snapshot = {namespace: dict(counts) for namespace, counts in _metrics.items()}
+    for counts in snapshot.values():
+        served = counts.get('hits', 0) + counts.get('stale', 0)
+        total = served + counts.get('misses', 0)
+        counts['hit_ratio'] = round(served / total, 3) if total else None
+    return snapshot
+
+
+def reset_stats():
+    with _metrics_lock:
+        _metrics.clear()
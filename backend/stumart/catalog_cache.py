@@ -0,0 +1,114 @@
+# catalog_cache.py
+"""
+Response cache for the catalog read endpoints.
+
+Cached entries are keyed on the *generation* of every scope they depend on:
+
+    institution:<name>  products of vendors in one school
+    institution:*       any product anywhere (cross-school listings)
+    product:<id>        a single product detail page
+    vendor:<user_id>    a single vendor's own info
+    vendors             vendor directory listings
+
+Writes never delete keys — once they commit, they bump the generation
+counters of the scopes they touch (see stumart.signals), so every key built
+from an old generation simply stops being read and ages out. An edit in one
+school leaves every other school's cached pages intact.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import caching
+
+CATALOG_CACHE_TIMEOUT = 300
+GENERATION_TIMEOUT = None  # counters must outlive every entry built from them
+
+ALL_INSTITUTIONS = 'institution:*'
+VENDORS = 'vendors'
+
+
+def institution_scope(institution):
+    return f"institution:{(institution or '').strip().lower()}"
+
+
+def product_scope(product_id):
+    return f"product:{product_id}"
+
+
+def vendor_scope(user_id):
+    return f"vendor:{user_id}"
+
+
+def _generation_key(scope):
+    return f"catalog:gen:{scope}"
+
+
+def get_generations(scopes):
+    """Current generation for each scope, fetched in one round trip."""
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate everything cached under ``scopes``."""
+    for scope in set(scopes):
+        key = _generation_key(scope)
+        # add() is a no-op if the counter exists; incr() is atomic on Redis
+        cache.add(key, 0, GENERATION_TIMEOUT)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, GENERATION_TIMEOUT)
+
+
+def bump_institution(institution):
+    bump(institution_scope(institution), ALL_INSTITUTIONS)
+
+
+def build_key(namespace, scopes, request, extra=None):
+    """
+    Key for one cached response: namespace + scope generations + a digest
+    of everything else the response depends on (scopes, path and query
+    string, host for absolute image URLs, and any caller-supplied context).
+    """
+    generations = get_generations(scopes)
+    fingerprint = json.dumps(
+        {
+            'scopes': list(scopes),
+            'path': request.path,
+            'params': sorted(request.query_params.lists()),
+            'host': request.get_host(),
+            'extra': extra,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.md5(fingerprint.encode()).hexdigest()
+    versions = '.'.join(str(generation) for generation in generations)
+    return f"catalog:{namespace}:{versions}:{digest}"
+
+
+def cached_response(namespace, scopes, request, build, extra=None, timeout=CATALOG_CACHE_TIMEOUT):
+    """
+    Serve ``build()``'s Response from cache when possible. Only 200 responses
+    are stored; errors are always recomputed. Concurrent misses on one key
+    build it once (stumart.caching).
+    """
+    key = build_key(namespace, scopes, request, extra)
+    built = {}
+
+    def build_data():
+        built['response'] = build()
+        return built['response'].data
+
+    data = caching.get_or_set(
+        key, build_data, timeout,
+        namespace=f"catalog:{namespace}",
+        cacheable=lambda _: built['response'].status_code == status.HTTP_200_OK,
+    )
+    return built.get('response') or Response(data, status=status.HTTP_200_OK)
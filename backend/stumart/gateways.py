@@ -0,0 +1,261 @@
+# gateways.py
+"""
+Shared HTTP client for third-party gateways (Paystack, Termii).
+
+Every outbound call goes through one ``GatewayClient`` per gateway, which
+provides:
+
+    pooling        a process-wide requests.Session with keep-alive, so
+                   calls reuse TCP/TLS connections instead of handshaking
+    timeouts       short connect timeout, bounded read timeout
+    retries        connection errors and 502/503/504 are retried with
+                   exponential backoff + jitter — only for idempotent
+                   calls (GETs, or POSTs that carry their own reference)
+    circuit        after CIRCUIT_FAILURE_THRESHOLD consecutive failures
+    breaker        the gateway is considered down for CIRCUIT_RESET_SECONDS
+                   and calls fail immediately with GatewayUnavailable;
+                   one trial call is let through once that window passes
+    metrics        per-client call / failure / retry counts and latency,
+                   exposed by ``stats()``; slow calls are logged
+
+GatewayUnavailable subclasses requests' ConnectionError, so existing
+``except requests.RequestException`` handlers treat an open circuit like
+any other network failure.
+
+    from stumart import gateways
+    response = gateways.paystack().get("/bank/resolve", params={...})
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+MAX_RETRIES = 2
+BACKOFF_SECONDS = 0.5
+RETRY_STATUSES = (502, 503, 504)
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30
+SLOW_CALL_SECONDS = 5
+POOL_SIZE = 20
+
+
+class GatewayUnavailable(requests.exceptions.ConnectionError):
+    """Raised without a network call while a gateway's circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed → open → half-open (one trial) → closed."""
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+        raise GatewayUnavailable(f"{self.name} circuit is open; failing fast")
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("%s circuit closed", self.name)
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            reopen = self.trial_in_flight
+            self.trial_in_flight = False
+            if reopen or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                logger.error("%s circuit opened after %d consecutive failures", self.name, self.failures)
+
+
+class GatewayClient:
+    def __init__(self, name, base_url, headers=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, pool_size=POOL_SIZE, breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker(name)
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'calls': 0, 'failures': 0, 'retries': 0, 'short_circuited': 0,
+                         'total_seconds': 0.0, 'max_seconds': 0.0}
+
+    def url(self, path):
+        if path.startswith(('http://', 'https://')):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    # ── Calls ────────────────────────────────────────────────────────────────
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        """
+        Send one request and return the ``requests.Response``. Raises
+        ``requests.RequestException`` (GatewayUnavailable when the circuit
+        is open). Non-2xx responses are returned, not raised; only
+        connection errors and 5xx gateway statuses count against the breaker.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in ('GET', 'HEAD', 'OPTIONS')
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url(path)
+        attempts = 1 + (self.max_retries if idempotent else 0)
+
+        for attempt in range(1, attempts + 1):
+            try:
+                self.breaker.before_call()
+            except GatewayUnavailable:
+                self._record(short_circuited=1)
+                raise
+
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                self._finish(method, url, started, failed=True)
+                self.breaker.record_failure()
+                if attempt < attempts:
+                    self._sleep(attempt)
+                    continue
+                logger.warning("%s %s %s failed: %s", self.name, method, url, exc)
+                raise
+            except Exception:
+                self._finish(method, url, started, failed=True)
+                self.breaker.record_failure()
+                raise
+
+            failed = response.status_code >= 500
+            self._finish(method, url, started, failed=failed)
+            if failed:
+                self.breaker.record_failure()
+                if attempt < attempts and response.status_code in RETRY_STATUSES:
+                    self._sleep(attempt)
+                    continue
+            else:
+                self.breaker.record_success()
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def _sleep(self, attempt):
+        self._record(retries=1)
+        delay = self.backoff * (2 ** (attempt - 1))
+        time.sleep(delay + random.uniform(0, delay / 2))
+
+    # ── Metrics ──────────────────────────────────────────────────────────────
+
+    def _record(self, **increments):
+        with self._metrics_lock:
+            for name, value in increments.items():
+                self._metrics[name] += value
+
+    def _finish(self, method, url, started, failed):
+        elapsed = time.monotonic() - started
+        with self._metrics_lock:
+            self._metrics['calls'] += 1
+            self._metrics['failures'] += int(failed)
+            self._metrics['total_seconds'] += elapsed
+            self._metrics['max_seconds'] = max(self._metrics['max_seconds'], elapsed)
+        if elapsed >= SLOW_CALL_SECONDS:
+            logger.warning("%s %s %s took %.2fs", self.name, method, url, elapsed)
+        else:
+            logger.debug("%s %s %s took %.3fs", self.name, method, url, elapsed)
+
+    def stats(self):
+        with self._metrics_lock:
+            stats = dict(self._metrics)
+        stats['avg_seconds'] = stats['total_seconds'] / stats['calls'] if stats['calls'] else 0.0
+        stats['circuit'] = self.breaker.state
+        return stats
+
+
+# ── Registry ──────────────────────────────────────────────────────────────────
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def paystack():
+    return _client('paystack', lambda: GatewayClient(
+        'paystack',
+        getattr(settings, 'PAYSTACK_BASE_URL', 'https://api.paystack.co'),
+        headers={
+            'Authorization': f"Bearer {settings.PAYSTACK_SECRET_KEY}",
+            'Content-Type': 'application/json',
+        },
+        pool_size=max(getattr(settings, 'PAYSTACK_TRANSFER_WORKERS', 8), POOL_SIZE),
+    ))
+
+
+def termii():
+    return _client('termii', lambda: GatewayClient(
+        'termii',
+        getattr(settings, 'TERMII_BASE_URL', 'https://api.ng.termii.com/api'),
+        headers={'Content-Type': 'application/json'},
+        timeout=(CONNECT_TIMEOUT, 10),
+    ))
+
+
+def stats():
+    """Metrics for every client created in this process, keyed by gateway name."""
+    return {name: client.stats() for name, client in list(_clients.items())}
+
+
+def reset():
+    """Drop cached clients (settings changes in tests, after fork)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
@@ -0,0 +1,139 @@
+# inventory.py
+"""
+Bulk stock adjustments for orders.
+
+An order's line items are folded into per-SKU quantities and applied with
+one conditional UPDATE per table (products, sizes, colours):
+
+    UPDATE ... SET in_stock = GREATEST(in_stock - d.qty, 0)
+    FROM (VALUES ...) AS d WHERE ... RETURNING ...
+
+The arithmetic happens in the database on the locked row, so concurrent
+checkouts can't overwrite each other's decrements, and RETURNING reports
+the new levels (and therefore what just sold out) in the same statement.
+Because these are raw UPDATEs no post_save fires — the catalog cache is
+bumped explicitly once the transaction commits.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from . import catalog_cache
+from .models import Product, ProductColor, ProductSize
+
+logger = logging.getLogger(__name__)
+
+
+def _fold(order_items):
+    """Sum quantities per product, per (product, size) and per (product, colour)."""
+    products, sizes, colors = defaultdict(int), defaultdict(int), defaultdict(int)
+    for item in order_items:
+        products[item.product_id] += item.quantity
+        if item.size:
+            sizes[(item.product_id, item.size)] += item.quantity
+        if item.color:
+            colors[(item.product_id, item.color)] += item.quantity
+    return products, sizes, colors
+
+
+def _set_expression(column, deduct):
+    if deduct:
+        return f"{column} = GREATEST(t.{column} - d.qty, 0)"
+    return f"{column} = t.{column} + d.qty"
+
+
+def _adjust_products(quantities, deduct):
+    """Returns ``[(product_id, in_stock, institution), ...]`` for the rows touched."""
+    if not quantities:
+        return []
+    rows = sorted(quantities.items())
+    values = ", ".join(["(%s::integer, %s::integer)"] * len(rows))
+    sql = (
+        f"UPDATE {connection.ops.quote_name(Product._meta.db_table)} AS t "
+        f"SET {_set_expression('in_stock', deduct)} "
+        f"FROM (VALUES {values}) AS d(id, qty) "
+        f"WHERE t.id = d.id "
+        f"RETURNING t.id, t.in_stock, t.institution"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [v for row in rows for v in row])
+        return cursor.fetchall()
+
+
+def _adjust_variants(model, key_column, quantities, deduct):
+    """Returns ``[(product_id, key, quantity), ...]`` for the rows touched."""
+    if not quantities:
+        return []
+    rows = sorted(quantities.items())
+    values = ", ".join(["(%s::integer, %s::varchar, %s::integer)"] * len(rows))
+    sql = (
+        f"UPDATE {connection.ops.quote_name(model._meta.db_table)} AS t "
+        f"SET {_set_expression('quantity', deduct)} "
+        f"FROM (VALUES {values}) AS d(product_id, variant, qty) "
+        f"WHERE t.product_id = d.product_id AND t.{key_column} = d.variant "
+        f"RETURNING t.product_id, t.{key_column}, t.quantity"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [v for (product_id, key), qty in rows for v in (product_id, key, qty)])
+        return cursor.fetchall()
+
+
+def _invalidate_on_commit(product_rows):
+    institutions = {institution for _, _, institution in product_rows}
+    scopes = [catalog_cache.product_scope(product_id) for product_id, _, _ in product_rows]
+
+    def bump():
+        for institution in institutions:
+            catalog_cache.bump_institution(institution)
+        catalog_cache.bump(*scopes)
+
+    transaction.on_commit(bump)
+
+
+def _apply(order_items, deduct):
+    products, sizes, colors = _fold(order_items)
+
+    with transaction.atomic():
+        product_rows = _adjust_products(products, deduct)
+        size_rows = _adjust_variants(ProductSize, 'size', sizes, deduct)
+        color_rows = _adjust_variants(ProductColor, 'color', colors, deduct)
+        _invalidate_on_commit(product_rows)
+
+    missing_sizes = set(sizes) - {(pid, key) for pid, key, _ in size_rows}
+    missing_colors = set(colors) - {(pid, key) for pid, key, _ in color_rows}
+    for product_id, size in missing_sizes:
+        logger.warning("Size %s not found for product %s", size, product_id)
+    for product_id, color in missing_colors:
+        logger.warning("Color %s not found for product %s", color, product_id)
+
+    return product_rows, size_rows, color_rows
+
+
+def deduct_stock(order_items):
+    """
+    Take every line item's quantity off product, size and colour stock
+    (floored at zero). Returns the SKUs now at zero as a dict of sets::
+
+        {'products': {product_id}, 'sizes': {(product_id, size)}, 'colors': {(product_id, color)}}
+    """
+    product_rows, size_rows, color_rows = _apply(order_items, deduct=True)
+    sold_out = {
+        'products': {product_id for product_id, in_stock, _ in product_rows if in_stock == 0},
+        'sizes': {(product_id, size) for product_id, size, qty in size_rows if qty == 0},
+        'colors': {(product_id, color) for product_id, color, qty in color_rows if qty == 0},
+    }
+    logger.info(
+        "Deducted stock for %d product(s), %d size(s), %d colour(s); %d SKU(s) now sold out",
+        len(product_rows), len(size_rows), len(color_rows), sum(len(s) for s in sold_out.values()),
+    )
+    return sold_out
+
+
+def restore_stock(order_items):
+    """Put every line item's quantity back (cancellations)."""
+    product_rows, size_rows, color_rows = _apply(order_items, deduct=False)
+    logger.info(
+        "Restored stock for %d product(s), %d size(s), %d colour(s)",
+        len(product_rows), len(size_rows), len(color_rows),
+    )
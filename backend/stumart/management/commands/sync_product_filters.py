@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from stumart import catalog_cache, product_index
+
+
+class Command(BaseCommand):
+    help = "Backfill and verify the vendor columns denormalized onto products (KYC, institution, state)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only count products whose columns disagree with their vendor'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=product_index.BATCH_SIZE,
+            help=f'Products rewritten per UPDATE (default: {product_index.BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        stale = product_index.verify()
+        if not stale:
+            self.stdout.write(self.style.SUCCESS("✓ All product filter columns match their vendors"))
+            return
+
+        if options['verify']:
+            self.stdout.write(self.style.ERROR(f"✗ {stale} product(s) out of date; rerun without --verify to fix"))
+            return
+
+        fixed, institutions = product_index.backfill(batch_size=options['batch_size'])
+        for institution in institutions:
+            catalog_cache.bump_institution(institution)
+        self.stdout.write(self.style.SUCCESS(f"✓ Rewrote filter columns on {fixed} product(s)"))
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_search_vectors(apps, schema_editor):
+    Product = apps.get_model('stumart', 'Product')
+    Vendor = apps.get_model('user', 'Vendor')
+    business_name = Subquery(
+        Vendor.objects.filter(user_id=OuterRef('vendor_id')).values('business_name')[:1]
+    )
+    Product.objects.update(
+        search_vector=(
+            SearchVector('name', weight='A', config='english')
+            + SearchVector('keyword', weight='A', config='english')
+            + SearchVector(Coalesce(business_name, Value('')), weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stumart', '0004_cartitem_gift_item_alter_cartitem_product'),
+        ('user', '0004_user_residence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='prod_name_search',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='prod_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='prod_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower, Trim
+
+
+def resync_vendor_columns(apps, schema_editor):
+    # Older rows were only filled when blank, so refresh all of them from the vendor
+    Product = apps.get_model('stumart', 'Product')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    KYCVerification = apps.get_model('user', 'KYCVerification')
+
+    def vendor_value(field):
+        return Coalesce(Subquery(User.objects.filter(pk=OuterRef('vendor_id')).values(field)[:1]), Value(''))
+
+    Product.objects.update(
+        institution=vendor_value('institution'),
+        state=vendor_value('state'),
+        kyc_approved=Exists(
+            KYCVerification.objects.filter(user_id=OuterRef('vendor_id'), verification_status='approved')
+        ),
+        institution_key=Lower(Trim(vendor_value('institution'))),
+        state_key=Lower(Trim(vendor_value('state'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stumart', '0005_product_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='institution_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='state_key',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='institution',
+            field=models.CharField(default='', help_text='Denormalized from vendor.institution for fast filtering', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='kyc_approved',
+            field=models.BooleanField(default=False, help_text='Denormalized from vendor KYC status'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='state',
+            field=models.CharField(default='', help_text='Denormalized from vendor.state for fast filtering', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['kyc_approved', 'institution_key', '-created_at'], name='prod_kyc_inst_date'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['kyc_approved', 'state_key', '-created_at'], name='prod_kyc_state_date'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['kyc_approved', '-created_at'], name='prod_kyc_date'),
+        ),
+        migrations.RunPython(resync_vendor_columns, migrations.RunPython.noop),
+    ]
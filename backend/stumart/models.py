@@ -6,6 +6,14 @@ User = get_user_model()
 from cloudinary.models import CloudinaryField
 from user.models import Vendor
 from django.utils.translation import gettext_lazy as _
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+
+
+def location_key(value):
+    """Normalized form of an institution / state name used for filtering."""
+    return (value or '').strip().lower()
+
 
 class Product(models.Model):
     """Base product model with optimized indexes"""
@@ -62,24 +70,28 @@ class Product(models.Model):
         blank=True
     )
 
-        # In stumart/models.py — add to Product model
+    # Denormalized from the vendor for join-free catalog filtering.
+    # Kept in step by stumart.product_index — never set directly.
     institution = models.CharField(
         max_length=100, 
-        db_index=True,
         default='',
         help_text="Denormalized from vendor.institution for fast filtering"
     )
     state = models.CharField(
         max_length=50,
-        db_index=True, 
         default='',
         help_text="Denormalized from vendor.state for fast filtering"
     )
     kyc_approved = models.BooleanField(
         default=False,
-        db_index=True,
-        help_text="Denormalized from vendor KYC status — updated on KYC approval"
+        help_text="Denormalized from vendor KYC status"
     )
+    # Trimmed, lower-cased copies so case-insensitive filters can use an index
+    institution_key = models.CharField(max_length=100, default='', editable=False)
+    state_key = models.CharField(max_length=50, default='', editable=False)
+
+    # Maintained by stumart.search.refresh_search_vectors — never set directly
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
@@ -107,12 +119,19 @@ class Product(models.Model):
             # 7. Vendor + Price (for vendor price filtering)
             models.Index(fields=['vendor', 'price'], name='prod_vendor_price'),
             
-            # 8. Search optimization (name, keyword fields)
-            # Note: For better search, consider PostgreSQL full-text search or Elasticsearch
-            models.Index(fields=['name'], name='prod_name_search'),
+            # 8. Full-text search (name/keyword > business_name > description)
+            GinIndex(fields=['search_vector'], name='prod_search_vector'),
+
+            # 8b. Trigram fallback for misspelled product names
+            GinIndex(fields=['name'], name='prod_name_trgm', opclasses=['gin_trgm_ops']),
             
             # 9. Promotion filtering
             models.Index(fields=['promotion_price'], name='prod_promo'),
+
+            # 10. Catalog listings: approved vendors in one school / state, newest first
+            models.Index(fields=['kyc_approved', 'institution_key', '-created_at'], name='prod_kyc_inst_date'),
+            models.Index(fields=['kyc_approved', 'state_key', '-created_at'], name='prod_kyc_state_date'),
+            models.Index(fields=['kyc_approved', '-created_at'], name='prod_kyc_date'),
         ]
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
@@ -143,14 +162,20 @@ class Product(models.Model):
         """Check if product is available in stock"""
         return self.in_stock > 0
     def save(self, *args, **kwargs):
-        # Denormalize vendor location onto product for fast filtering
-        if not self.institution and self.vendor_id:
-            self.institution = self.vendor.institution or ''
-            self.state = self.vendor.state or ''
-            self.kyc_approved = getattr(
-                getattr(self.vendor, 'kyc', None), 
-                'verification_status', ''
-            ) == 'approved'
+        # Denormalize vendor location and KYC onto new products; later vendor
+        # changes are propagated in bulk by stumart.product_index
+        if self.vendor_id and self._state.adding:
+            from .product_index import vendor_columns
+            columns = vendor_columns(self.vendor_id)
+            if columns:
+                for field, value in columns.items():
+                    setattr(self, field, value)
+        self.institution_key = location_key(self.institution)
+        self.state_key = location_key(self.state)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'institution', 'state'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'institution_key', 'state_key'}
         super().save(*args, **kwargs)
 
 
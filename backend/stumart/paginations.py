@@ -1,7 +1,149 @@
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from . import caching
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 18
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+
+# ── Keyset (cursor) pagination ────────────────────────────────────────────────
+
+class KeysetPagination:
+    """
+    Seek-method pagination: each page is fetched with
+    ``WHERE (sort columns) beyond <last row seen> ORDER BY ... LIMIT n``
+    so page 500 costs the same as page 1 and no COUNT(*) is issued.
+
+    ``ordering`` must end in a unique column (``-id``) so the cursor is a
+    total order; the leading columns should match an existing index, e.g.
+    ``('-created_at', '-id')`` or ``('price', '-created_at', '-id')``.
+    Columns may also be non-null annotations already on the queryset.
+    """
+    page_size = 18
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.has_next = False
+        self.next_cursor = None
+
+    @staticmethod
+    def is_requested(request):
+        """Cursor mode is opt-in so existing page-number clients keep working."""
+        params = request.query_params
+        return 'cursor' in params or params.get('pagination') == 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request):
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(seek_filter(self._decode_cursor(encoded, queryset)))
+
+        # One extra row tells us whether another page exists without counting
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = self._encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data, count=None):
+        return Response(OrderedDict([
+            ('count', count),
+            ('next_cursor', self.next_cursor),
+            ('has_next', self.has_next),
+            ('page_size', self.page_size),
+            ('results', data),
+        ]))
+
+    # ── Cursor encoding ──────────────────────────────────────────────────────
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _encode_cursor(self, instance):
+        values = []
+        for name, _ in self._fields():
+            value = getattr(instance, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def _decode_cursor(self, encoded, queryset):
+        annotations = queryset.query.annotations
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            fields = self._fields()
+            if len(values) != len(fields):
+                raise ValueError(encoded)
+            return [
+                (name, descending, _output_field(queryset.model, annotations, name).to_python(value))
+                for (name, descending), value in zip(fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+
+def _output_field(model, annotations, name):
+    if name in annotations:
+        return annotations[name].output_field
+    return model._meta.get_field(name)
+
+
+def seek_filter(position):
+    """
+    Rows strictly after ``position`` — a list of ``(field, descending, value)``.
+    Expands the row comparison ``(a, b, c) > (x, y, z)`` with per-column
+    direction into ``a>x OR (a=x AND b>y) OR (a=x AND b=y AND c>z)``.
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for name, descending, value in position:
+        lookup = f"{name}__lt" if descending else f"{name}__gt"
+        condition |= equal_so_far & Q(**{lookup: value})
+        equal_so_far &= Q(**{name: value})
+    return condition
+
+
+# ── Counts ────────────────────────────────────────────────────────────────────
+
+APPROXIMATE_COUNT_TIMEOUT = 120
+
+
+def cached_count(queryset, timeout=APPROXIMATE_COUNT_TIMEOUT):
+    """
+    COUNT(*) for ``queryset`` cached for ``timeout`` seconds, keyed on its SQL.
+    Good enough for "N products" badges and infinite-scroll totals, where an
+    exact count on every request costs more than the page itself.
+    """
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    digest = hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+    key = f"approx_count:{queryset.model._meta.label_lower}:{digest}"
+
+    # A slightly stale total is fine here; serve it while one worker recounts
+    return caching.get_or_set(key, queryset.count, timeout, stale_timeout=timeout)
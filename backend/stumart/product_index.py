@@ -0,0 +1,120 @@
+# product_index.py
+"""
+Denormalized vendor columns on Product.
+
+Catalog listings filter on who sold a product — approved KYC, school,
+state — and used to reach those through ``vendor__kyc`` /
+``vendor__institution__iexact`` joins on every request. Each product now
+carries its own copy:
+
+    institution, state      the vendor's values as entered
+    institution_key,        trimmed + lower-cased, so case-insensitive
+    state_key               filters are plain equality on an index
+    kyc_approved            the vendor's KYC status is ``approved``
+
+``Product.save`` fills them for new products. When a vendor's location or
+KYC changes, stumart.signals calls ``sync_vendor_products`` which rewrites
+all of that vendor's products with one UPDATE. ``python manage.py
+sync_product_filters`` backfills and verifies the whole table.
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Lower, Trim
+
+from user.models import KYCVerification
+from .models import Product, location_key
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+COLUMNS = ('institution', 'state', 'kyc_approved', 'institution_key', 'state_key')
+
+
+def vendor_columns(user_id):
+    """The denormalized column values for ``user_id``'s products, or None if the user is gone."""
+    row = (
+        User.objects.filter(pk=user_id)
+        .annotate(approved=Exists(
+            KYCVerification.objects.filter(user_id=OuterRef('pk'), verification_status='approved')
+        ))
+        .values('institution', 'state', 'approved')
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        'institution': row['institution'] or '',
+        'state': row['state'] or '',
+        'kyc_approved': row['approved'],
+        'institution_key': location_key(row['institution']),
+        'state_key': location_key(row['state']),
+    }
+
+
+def sync_vendor_products(user_id):
+    """Rewrite the denormalized columns on every product of ``user_id``. Returns rows changed."""
+    columns = vendor_columns(user_id)
+    if columns is None:
+        return 0
+    stale = ~Q(**columns)
+    return Product.objects.filter(stale, vendor_id=user_id).update(**columns)
+
+
+# ── Whole-table backfill / verify ─────────────────────────────────────────────
+
+def _vendor_value(field):
+    return Coalesce(
+        Subquery(User.objects.filter(pk=OuterRef('vendor_id')).values(field)[:1]),
+        Value(''),
+    )
+
+
+def expected_columns():
+    """Per-row expressions for the correct column values, usable in annotate() and update()."""
+    return {
+        'institution': _vendor_value('institution'),
+        'state': _vendor_value('state'),
+        'kyc_approved': Exists(
+            KYCVerification.objects.filter(user_id=OuterRef('vendor_id'), verification_status='approved')
+        ),
+        'institution_key': Lower(Trim(_vendor_value('institution'))),
+        'state_key': Lower(Trim(_vendor_value('state'))),
+    }
+
+
+def stale_products():
+    """Products whose denormalized columns disagree with their vendor."""
+    expected = {f"expected_{field}": expression for field, expression in expected_columns().items()}
+    mismatch = Q()
+    for field in COLUMNS:
+        mismatch |= ~Q(**{field: F(f"expected_{field}")})
+    return Product.objects.annotate(**expected).filter(mismatch)
+
+
+def verify():
+    """Number of products with stale columns."""
+    return stale_products().count()
+
+
+def backfill(batch_size=BATCH_SIZE):
+    """
+    Recompute the columns for every stale product, ``batch_size`` rows per
+    UPDATE so a large backfill never holds long row locks. Returns the
+    number of rows fixed and every institution whose listings changed.
+    """
+    fixed, institutions = 0, set()
+    while True:
+        rows = list(stale_products().order_by('pk').values_list('pk', 'institution')[:batch_size])
+        if not rows:
+            break
+        ids = [pk for pk, _ in rows]
+        institutions.update(institution for _, institution in rows)
+        fixed += Product.objects.filter(pk__in=ids).update(**expected_columns())
+        institutions.update(Product.objects.filter(pk__in=ids).values_list('institution', flat=True))
+    if fixed:
+        logger.info("Backfilled denormalized vendor columns on %d products", fixed)
+    return fixed, institutions
@@ -32,6 +32,36 @@ def retry_pending_disbursements():
     except Exception as e:
         logger.error(f"Error in pending disbursements retry: {str(e)}")
 
+def reconcile_wallets():
+    """Fold platform wallet shards and check balances against the journal"""
+    try:
+        logger.info("Running wallet reconciliation...")
+        call_command('reconcile_wallets')
+        logger.info("Wallet reconciliation completed")
+    except Exception as e:
+        logger.error(f"Error in wallet reconciliation: {str(e)}")
+
+def process_notification_outbox():
+    """Send queued order and payment notifications"""
+    try:
+        call_command('process_notification_outbox')
+    except Exception as e:
+        logger.error(f"Error processing notification outbox: {str(e)}")
+
+def send_newsletters():
+    """Deliver queued newsletter campaigns"""
+    try:
+        call_command('send_newsletters')
+    except Exception as e:
+        logger.error(f"Error sending newsletters: {str(e)}")
+
+def refresh_platform_metrics():
+    """Refresh the materialized admin dashboard metrics"""
+    try:
+        call_command('refresh_platform_metrics')
+    except Exception as e:
+        logger.error(f"Error refreshing platform metrics: {str(e)}")
+
 def start():
     """Start the scheduler"""
     scheduler = BackgroundScheduler()
@@ -45,5 +75,18 @@ def start():
     # Retry pending disbursements every 5 minutes (catch COMPLETED orders that weren't disbursed)
     scheduler.add_job(retry_pending_disbursements, 'interval', minutes=5, id='retry_pending_disbursements')
     
+    # Fold platform wallet shards and report ledger drift every 15 minutes
+    scheduler.add_job(reconcile_wallets, 'interval', minutes=15, id='reconcile_wallets')
+    
+    # Drain the notification outbox every 30 seconds (a run that is still
+    # sending makes the next tick skip rather than overlap)
+    scheduler.add_job(process_notification_outbox, 'interval', seconds=30, id='process_notification_outbox')
+    
+    # Send queued newsletters every minute; each run drains what is due
+    scheduler.add_job(send_newsletters, 'interval', minutes=1, id='send_newsletters')
+    
+    # Refresh the admin dashboard snapshot and daily history every 5 minutes
+    scheduler.add_job(refresh_platform_metrics, 'interval', minutes=5, id='refresh_platform_metrics')
+    
     scheduler.start()
     logger.info("Scheduler started - Automated payouts active")
\ No newline at end of file
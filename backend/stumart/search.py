@@ -0,0 +1,96 @@
+# search.py
+"""
+Product search backed by PostgreSQL full-text search.
+
+Every product carries a ``search_vector`` column (GIN indexed) built from:
+
+    A — name, keyword
+    B — the vendor's business_name
+    C — description
+
+Queries match the vector — as typed, and with the last word as a prefix so
+that partial input ("iph", "galaxy sams") still matches — and fall back to
+trigram similarity on the product name so that typos ("iphnoe") still find
+something. Results are ranked by text relevance, then trigram similarity,
+then recency — all in a single SQL statement.
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db.models import BooleanField, ExpressionWrapper, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from user.models import Vendor
+
+SEARCH_CONFIG = 'english'
+
+
+def _product_search_vector():
+    """Expression that rebuilds ``Product.search_vector`` inside an UPDATE."""
+    business_name = Subquery(
+        Vendor.objects.filter(user_id=OuterRef('vendor_id')).values('business_name')[:1]
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('keyword', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(business_name, Value('')), weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recompute the search vector for every product in ``queryset`` with one UPDATE."""
+    return queryset.update(search_vector=_product_search_vector())
+
+
+def prefix_query_text(term):
+    """``term`` as a raw tsquery with its last word matched as a prefix, or '' if it has no words."""
+    words = re.findall(r'\w+', term)
+    if not words:
+        return ''
+    return ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+
+
+def build_search_query(term):
+    query = SearchQuery(term, search_type='websearch', config=SEARCH_CONFIG)
+    prefix = prefix_query_text(term)
+    if prefix:
+        query |= SearchQuery(prefix, search_type='raw', config=SEARCH_CONFIG)
+    return query
+
+
+def filter_products(queryset, term):
+    """Restrict ``queryset`` to products matching ``term`` without changing its ordering."""
+    return queryset.filter(
+        Q(search_vector=build_search_query(term)) | Q(name__trigram_similar=term)
+    )
+
+
+def search_products(queryset, term):
+    """Filter ``queryset`` by ``term`` and order the results by relevance."""
+    query = build_search_query(term)
+    return filter_products(queryset, term).annotate(
+        rank=SearchRank(F('search_vector'), query),
+        similarity=TrigramSimilarity('name', term),
+    ).order_by('-rank', '-similarity', '-created_at')
+
+
+def annotate_product_match(queryset, term):
+    """
+    Flag rows whose own text matches ``term`` (as opposed to matching only
+    through the vendor's business name). Evaluated on the matched rows only.
+    """
+    query = build_search_query(term)
+    return queryset.annotate(
+        product_text=SearchVector('name', 'keyword', 'description', config=SEARCH_CONFIG),
+    ).annotate(
+        product_match=ExpressionWrapper(
+            Q(product_text=query) | Q(name__trigram_similar=term),
+            output_field=BooleanField(),
+        ),
+    )
@@ -591,8 +591,15 @@ class AddProductVideoSerializer(serializers.ModelSerializer):
 # ══════════════════════════════════════════════════════════════════
 
 class SpecificVendorProductsQuerySerializer(serializers.Serializer):
-    page      = serializers.IntegerField(required=False, default=1, min_value=1)
-    page_size = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+    page       = serializers.IntegerField(required=False, default=1, min_value=1)
+    page_size  = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+    pagination = serializers.ChoiceField(
+        required=False, choices=['page', 'cursor'],
+        help_text="'cursor' switches to keyset pagination (infinite scroll)",
+    )
+    cursor     = serializers.CharField(
+        required=False, help_text="next_cursor from the previous response (implies pagination=cursor)"
+    )
 
 
 class VendorsByCategoryQuerySerializer(serializers.Serializer):
@@ -621,6 +628,17 @@ class AllProductsQuerySerializer(serializers.Serializer):
     school            = serializers.CharField(required=False, allow_blank=True)
     vendor            = serializers.CharField(required=False, allow_blank=True)
     viewOtherProducts = serializers.BooleanField(required=False, default=False)
+    pagination        = serializers.ChoiceField(
+        required=False, choices=['page', 'cursor'],
+        help_text="'cursor' switches to keyset pagination (infinite scroll)",
+    )
+    cursor            = serializers.CharField(
+        required=False, help_text="next_cursor from the previous response (implies pagination=cursor)"
+    )
+    count             = serializers.ChoiceField(
+        required=False, default='approximate', choices=['approximate', 'none'],
+        help_text="Cursor mode only — 'approximate' returns a cached total",
+    )
 
 
 class SearchProductsQuerySerializer(serializers.Serializer):
@@ -713,11 +731,12 @@ class ProductReviewUpdateBodySerializer(serializers.Serializer):
 # ══════════════════════════════════════════════════════════════════
 
 class PaginationMetaSerializer(serializers.Serializer):
-    current_page   = serializers.IntegerField()
-    total_pages    = serializers.IntegerField()
-    total_products = serializers.IntegerField()
+    current_page   = serializers.IntegerField(required=False, help_text="Page mode only")
+    total_pages    = serializers.IntegerField(required=False, help_text="Page mode only")
+    total_products = serializers.IntegerField(help_text="Approximate (cached) in cursor mode")
     has_next       = serializers.BooleanField()
-    has_previous   = serializers.BooleanField()
+    has_previous   = serializers.BooleanField(required=False, help_text="Page mode only")
+    next_cursor    = serializers.CharField(required=False, allow_null=True, help_text="Cursor mode only")
     page_size      = serializers.IntegerField()
 
 
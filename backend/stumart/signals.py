@@ -0,0 +1,134 @@
+# signals.py
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from user.models import KYCVerification, Vendor
+from . import catalog_cache, product_index
+from .models import Product, ProductColor, ProductImage, ProductSize
+from .search import refresh_search_vectors
+
+User = get_user_model()
+
+SEARCH_FIELDS = {'name', 'keyword', 'description'}
+
+
+# ── Search vector maintenance ─────────────────────────────────────────────────
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Rebuild the product's search vector whenever its searchable text changes."""
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_init, sender=Vendor)
+def remember_vendor_business_name(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads (.only()) don't trigger a query
+    instance._indexed_business_name = instance.__dict__.get('business_name')
+
+
+@receiver(post_save, sender=Vendor)
+def update_vendor_products_search_vector(sender, instance, created, **kwargs):
+    """The vendor's business name is part of every product vector — keep them in step."""
+    if not created and instance.business_name != instance._indexed_business_name:
+        refresh_search_vectors(Product.objects.filter(vendor_id=instance.user_id))
+    instance._indexed_business_name = instance.business_name
+
+
+# ── Denormalized vendor columns ───────────────────────────────────────────────
+
+@receiver(post_init, sender=User)
+def remember_user_location(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads (.only()) don't trigger a query
+    instance._indexed_location = (instance.__dict__.get('institution'), instance.__dict__.get('state'))
+
+
+@receiver(post_save, sender=User)
+def sync_vendor_product_location(sender, instance, created, **kwargs):
+    """A vendor who moves school takes their products along; both schools' listings change."""
+    previous = instance._indexed_location
+    instance._indexed_location = (instance.institution, instance.state)
+    if created or previous == instance._indexed_location:
+        return
+    if product_index.sync_vendor_products(instance.pk):
+        _bump_on_commit([previous[0]])
+        _invalidate_vendor(instance.pk, instance.institution)
+
+
+@receiver(post_save, sender=KYCVerification)
+@receiver(post_delete, sender=KYCVerification)
+def sync_vendor_product_kyc(sender, instance, **kwargs):
+    product_index.sync_vendor_products(instance.user_id)
+
+
+# ── Catalog cache invalidation ────────────────────────────────────────────────
+
+def _bump_on_commit(institutions, *scopes):
+    # Bumping before commit lets a concurrent reader cache the old rows under
+    # the new generation, and nothing would bump it again — so wait for the
+    # commit. Institutions and scopes are resolved now, while the rows exist.
+    def bump():
+        for institution in institutions:
+            catalog_cache.bump_institution(institution)
+        if scopes:
+            catalog_cache.bump(*scopes)
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    _bump_on_commit([instance.institution], catalog_cache.product_scope(instance.pk))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductSize)
+@receiver(post_delete, sender=ProductSize)
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+def invalidate_product_child_cache(sender, instance, **kwargs):
+    institution = (
+        Product.objects.filter(pk=instance.product_id)
+        .values_list('institution', flat=True)
+        .first()
+    )
+    _bump_on_commit([institution], catalog_cache.product_scope(instance.product_id))
+
+
+def _owner_institution(instance):
+    # The owning user may already be gone when this runs inside a cascade delete
+    try:
+        return instance.user.institution
+    except ObjectDoesNotExist:
+        return None
+
+
+def _invalidate_vendor(user_id, institution):
+    _bump_on_commit(
+        [institution],
+        catalog_cache.VENDORS,
+        catalog_cache.vendor_scope(user_id),
+        *(
+            catalog_cache.product_scope(product_id)
+            for product_id in Product.objects.filter(vendor_id=user_id).values_list('id', flat=True)
+        ),
+    )
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def invalidate_vendor_cache(sender, instance, **kwargs):
+    _invalidate_vendor(instance.user_id, _owner_institution(instance))
+
+
+@receiver(post_save, sender=KYCVerification)
+@receiver(post_delete, sender=KYCVerification)
+def invalidate_kyc_cache(sender, instance, **kwargs):
+    """KYC status gates every catalog listing the vendor appears in."""
+    _invalidate_vendor(instance.user_id, _owner_institution(instance))
@@ -1,3 +1,191 @@
-from django.test import TestCase
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresWrapper
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from stumart import caching, catalog_cache, signals
+from stumart.gateways import CircuitBreaker, GatewayClient, GatewayUnavailable
+from stumart.models import Product
+from stumart.paginations import KeysetPagination, seek_filter
+from stumart.search import filter_products, prefix_query_text
+from stumart.views import AllProductsView
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """Answers every request with 503 and counts the hits."""
+    hits = 0
+
+    def _reply(self):
+        type(self).hits += 1
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class GatewayClientTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), UnavailableHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        UnavailableHandler.hits = 0
+
+    def gateway(self, **kwargs):
+        breaker = CircuitBreaker('test', failure_threshold=3, reset_seconds=60)
+        return GatewayClient('test', self.base_url, backoff=0, breaker=breaker, **kwargs)
+
+    def test_idempotent_calls_are_retried(self):
+        client = self.gateway(max_retries=2)
+        response = client.get('/bank')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(UnavailableHandler.hits, 3)
+        self.assertEqual(client.stats()['retries'], 2)
+
+    def test_non_idempotent_calls_are_not_retried(self):
+        client = self.gateway(max_retries=2)
+        client.post('/transaction/initialize', json={})
+        self.assertEqual(UnavailableHandler.hits, 1)
+
+    def test_circuit_opens_and_fails_fast(self):
+        client = self.gateway(max_retries=0)
+        for _ in range(3):
+            client.get('/bank')
+
+        with self.assertRaises(GatewayUnavailable):
+            client.get('/bank')
+        self.assertEqual(UnavailableHandler.hits, 3)
+
+        stats = client.stats()
+        self.assertEqual(stats['circuit'], 'open')
+        self.assertEqual(stats['short_circuited'], 1)
+        self.assertEqual(stats['failures'], 3)
+
+
+class ProductFilterIndexTest(SimpleTestCase):
+    def test_school_filter_is_join_free_and_case_insensitive(self):
+        request = SimpleNamespace(user=AnonymousUser())
+        queryset = AllProductsView()._apply_school_filter(
+            Product.objects.filter(kyc_approved=True), request, {'school': '  UNILAG ', 'view_other_products': False}
+        )
+        sql = str(queryset.query)
+
+        self.assertNotIn('JOIN', sql)
+        self.assertIn('"institution_key" = unilag', sql)
+
+
+class RatingKeysetTest(SimpleTestCase):
+    def test_rating_sort_has_a_cursor_ordering(self):
+        view = AllProductsView()
+        queryset = view._apply_sorting(Product.objects.all(), 'rating')
+        paginator = KeysetPagination(view.KEYSET_ORDERINGS['rating'])
+
+        last_row = SimpleNamespace(vendor_rating=Decimal('4.50'), created_at=timezone.now(), id=7)
+        position = paginator._decode_cursor(paginator._encode_cursor(last_row), queryset)
+        self.assertEqual(position[0], ('vendor_rating', True, Decimal('4.50')))
+
+        sql = str(queryset.order_by(*paginator.ordering).filter(seek_filter(position)).query)
+        self.assertIn('COALESCE("user_vendor"."rating"', sql)
+        self.assertIn('< 4.50', sql)
+
+
+class ProductSearchTest(SimpleTestCase):
+    def test_short_prefix_matches_as_you_type(self):
+        self.assertEqual(prefix_query_text('iph'), 'iph:*')
+        self.assertEqual(prefix_query_text('galaxy  sams!'), 'galaxy & sams:*')
+        self.assertEqual(prefix_query_text(' & '), '')
+
+        postgres = PostgresWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+        sql, params = filter_products(Product.objects.all(), 'iph').query.get_compiler(connection=postgres).as_sql()
+        self.assertIn('to_tsquery', sql)
+        self.assertIn('iph:*', params)
+
+
+class CachingTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+
+    def test_concurrent_misses_build_once(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'banks'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(caching.get_or_set('test:banks', build, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['banks'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(caching.stats()['test']['lock_waits'], 4)
+
+    def test_stale_value_served_when_rebuild_fails(self):
+        caching.get_or_set('test:codes', lambda: {'gtbank': '058'}, timeout=0, stale_timeout=60)
+
+        def failing():
+            raise ValueError('paystack down')
+
+        self.assertEqual(caching.fetch('test:codes', failing, 60, 60), ({'gtbank': '058'}, True))
+        self.assertEqual(caching.get_or_set('test:codes', lambda: {'uba': '033'}, 60, 60), {'uba': '033'})
+
+    def test_uncacheable_values_are_not_stored(self):
+        caching.get_or_set('test:empty', list, 60, cacheable=bool)
+        self.assertEqual(caching.fetch('test:empty', lambda: ['bank'], 60, cacheable=bool), (['bank'], False))
+
+    def test_cache_outage_builds_without_waiting(self):
+        # django-redis with IGNORE_EXCEPTIONS: add() returns None, get() a miss
+        with mock.patch.object(cache, 'add', return_value=None), mock.patch('stumart.caching.time.sleep') as sleep:
+            self.assertEqual(caching.fetch('test:down', lambda: 'banks', 60), ('banks', False))
+        sleep.assert_not_called()
+
+        # memcached with ignore_exc: add() reports False, but the lock never reads back
+        with mock.patch.object(cache, 'add', return_value=False), mock.patch.object(cache, 'get', return_value=None), \
+                mock.patch('stumart.caching.time.sleep') as sleep:
+            self.assertEqual(caching.fetch('test:down', lambda: 'banks', 60), ('banks', False))
+        self.assertEqual(sleep.call_count, 1)
+
+
+class CatalogInvalidationTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_generations_bump_only_after_commit(self):
+        scopes = [catalog_cache.institution_scope('UNILAG'), catalog_cache.product_scope(7)]
+        with mock.patch('stumart.signals.transaction.on_commit') as on_commit:
+            signals.invalidate_product_cache(Product, Product(pk=7, institution='UNILAG'))
+            # A reader inside the write's window still builds the old generation
+            self.assertEqual(catalog_cache.get_generations(scopes), [0, 0])
+
+        on_commit.call_args.args[0]()
+        self.assertEqual(catalog_cache.get_generations(scopes), [1, 1])
@@ -77,11 +77,13 @@ from django.http import HttpResponse
 from weasyprint import HTML
 from io import BytesIO
 from django.utils.timezone import now
-from . paginations import CustomPagination
+from . paginations import CustomPagination, KeysetPagination, cached_count
+from . import catalog_cache, search
 from django.db import transaction
 from rest_framework import generics, status
-from django.db.models import Avg, Count, Q, Max, Prefetch, OuterRef, Subquery
-from .models import Product, VendorReview, Vendor
+from django.db.models import Avg, Count, Q, Max, Prefetch, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Product, VendorReview, Vendor, location_key
 from user.models import Vendor
 from django.utils.html import strip_tags
 from django.views.decorators.csrf import csrf_exempt
@@ -113,17 +115,38 @@ class SpecificVendorProductsView(APIView):
                 vendor=vendor.user
             ).order_by('-created_at')
 
-            page      = int(request.query_params.get("page", 1))
-            page_size = int(request.query_params.get("page_size", 20))
-            paginator = Paginator(products, page_size)
+            if KeysetPagination.is_requested(request):
+                # Uses the (vendor, -created_at) index — no OFFSET, no COUNT
+                keyset = KeysetPagination(('-created_at', '-id'))
+                keyset.page_size = 20
+                paginated_products = keyset.paginate_queryset(products, request)
+                pagination = {
+                    "next_cursor":    keyset.next_cursor,
+                    "has_next":       keyset.has_next,
+                    "total_products": cached_count(products),
+                    "page_size":      keyset.page_size,
+                }
+            else:
+                page      = int(request.query_params.get("page", 1))
+                page_size = int(request.query_params.get("page_size", 20))
+                paginator = Paginator(products, page_size)
 
-            try:
-                paginated_products = paginator.page(page)
-            except Exception:
-                return Response(
-                    {"error": "Invalid page number"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                try:
+                    paginated_products = paginator.page(page)
+                except Exception:
+                    return Response(
+                        {"error": "Invalid page number"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                pagination = {
+                    "current_page":   paginated_products.number,
+                    "total_pages":    paginator.num_pages,
+                    "total_products": paginator.count,
+                    "has_next":       paginated_products.has_next(),
+                    "has_previous":   paginated_products.has_previous(),
+                    "page_size":      page_size,
+                }
 
             business_data = {
                 "business_name":        vendor.business_name,
@@ -149,14 +172,7 @@ class SpecificVendorProductsView(APIView):
                 {
                     "vendor_details": business_data,
                     "products":       product_data,
-                    "pagination": {
-                        "current_page":   paginated_products.number,
-                        "total_pages":    paginator.num_pages,
-                        "total_products": paginator.count,
-                        "has_next":       paginated_products.has_next(),
-                        "has_previous":   paginated_products.has_previous(),
-                        "page_size":      page_size,
-                    },
+                    "pagination":     pagination,
                 },
                 status=status.HTTP_200_OK
             )
@@ -190,21 +206,12 @@ class VendorsByOtherView(APIView):
             )
 
         try:
-            filters = {"business_category__iexact": category}
-            if specific_category:
-                filters["specific_category__iexact"] = specific_category
-
-            vendors = Vendor.objects.filter(**filters)
-            vendors = self._apply_kyc_filtering(vendors)
-
-            if not vendors.exists():
-                return Response(
-                    {"error": "No vendor found for this category"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            serializer = VendorSerializer(vendors, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return catalog_cache.cached_response(
+                'vendors_by_category',
+                [catalog_cache.VENDORS],
+                request,
+                lambda: self._build_response(category, specific_category),
+            )
 
         except Exception as e:
             return Response(
@@ -212,10 +219,24 @@ class VendorsByOtherView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _build_response(self, category, specific_category):
+        filters = {"business_category__iexact": category}
+        if specific_category:
+            filters["specific_category__iexact"] = specific_category
+
+        vendors = Vendor.objects.select_related('user').filter(**filters)
+        vendors = self._apply_kyc_filtering(vendors)
+
+        serializer = VendorSerializer(vendors, many=True)
+        if not serializer.data:
+            return Response(
+                {"error": "No vendor found for this category"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     def _apply_kyc_filtering(self, queryset):
-        queryset = queryset.filter(user__kyc__verification_status='approved')
-        print(f"After KYC filtering (approved vendors only): {queryset.count()}")
-        return queryset
+        return queryset.filter(user__kyc__verification_status='approved')
 
 
 class VendorsByOtherandSchoolView(APIView):
@@ -325,6 +346,14 @@ class ProductView(APIView):
     serializer_class = ProductSerializer
 
     def get(self, request, id):
+        return catalog_cache.cached_response(
+            'product_detail',
+            [catalog_cache.product_scope(id)],
+            request,
+            lambda: self._build_response(request, id),
+        )
+
+    def _build_response(self, request, id):
         try:
             product = (
                 Product.objects
@@ -353,6 +382,14 @@ class GetVendorView(APIView):
     serializer_class      = GetVendorResponseSerializer
 
     def get(self, request, *args, **kwargs):
+        return catalog_cache.cached_response(
+            'vendor_info',
+            [catalog_cache.vendor_scope(request.user.id)],
+            request,
+            lambda: self._build_response(request),
+        )
+
+    def _build_response(self, request):
         try:
             user = request.user
             vendor = Vendor.objects.get(user=user)
@@ -683,8 +720,9 @@ def send_vendor_notification_email(email, application, service):
 
 class SearchProductsView(APIView):
     """
-    Search products by name, description, or keyword.
-    Falls back to vendor business name search if no products match.
+    Search products by name, keyword, description, or vendor business name.
+    Uses the full-text search vector with a trigram fallback for typos;
+    results are ranked by relevance and fetched in a single query.
 
     Request:  SearchProductsQuerySerializer  (query params)
     Response: SearchProductsResponseSerializer
@@ -693,63 +731,52 @@ class SearchProductsView(APIView):
     serializer_class          = SearchProductsResponseSerializer
 
     def get(self, request):
-        product_name = request.query_params.get('product_name')
+        product_name = (request.query_params.get('product_name') or '').strip()
         state = request.query_params.get('state')
         school = request.query_params.get('institution')
 
         try:
-            products_query = Product.objects.all()
-            print(f"\nSearch parameters - Product: {product_name}, State: {state}, School: {school}")
-
-            if product_name:
-                products_query = products_query.filter(
-                    Q(name__icontains=product_name) |
-                    Q(description__icontains=product_name) |
-                    Q(keyword__icontains=product_name)
-                )
-
-                if not products_query.exists():
-                    print(f"No products found, checking vendor business names for: {product_name}")
-                    matching_vendors = Vendor.objects.filter(business_name__icontains=product_name)
-
-                    if matching_vendors.exists():
-                        vendor_users = [vendor.user for vendor in matching_vendors]
-                        products_query = Product.objects.filter(vendor__in=vendor_users)
+            products_query = Product.objects.select_related(
+                'vendor__vendor_profile',
+            ).prefetch_related('additional_images', 'sizes', 'colors')
 
             if state:
-                products_query = products_query.filter(vendor__state__iexact=state)
+                products_query = products_query.filter(state_key=location_key(state))
 
             if school:
-                products_query = products_query.filter(vendor__institution__iexact=school)
+                products_query = products_query.filter(institution_key=location_key(school))
+
+            if product_name:
+                products_query = search.annotate_product_match(
+                    search.search_products(products_query, product_name),
+                    product_name,
+                )
+
+            products = list(products_query)
 
-            products = products_query.select_related('vendor').all()
+            # "vendor" when every hit came through the vendor's business name only
+            search_type = "product"
+            if product_name and not any(product.product_match for product in products):
+                search_type = "vendor"
 
-            if not products.exists():
+            if not products:
                 return Response({
                     "status": "not_found",
                     "message": "No products found matching your criteria",
-                    "search_type": "vendor" if product_name and not products_query.filter(
-                        Q(name__icontains=product_name) |
-                        Q(description__icontains=product_name) |
-                        Q(keyword__icontains=product_name)
-                    ).exists() else "product"
+                    "search_type": search_type,
                 }, status=status.HTTP_404_NOT_FOUND)
 
             serializer = ProductSerializer(products, many=True, context={'request': request})
 
             return Response({
                 "status": "success",
-                "count": products.count(),
+                "count": len(products),
                 "products": serializer.data,
-                "search_type": "vendor" if product_name and not products_query.filter(
-                    Q(name__icontains=product_name) |
-                    Q(description__icontains=product_name) |
-                    Q(keyword__icontains=product_name)
-                ).exists() else "product"
+                "search_type": search_type,
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
-            print(f"\nError in search: {str(e)}")
+            logger.error(f"Error in search: {str(e)}")
             return Response({
                 "status": "error",
                 "message": f"An error occurred: {str(e)}"
@@ -823,23 +850,50 @@ class AllProductsView(APIView):
     def get(self, request):
         try:
             filters = self._parse_request_params(request)
-
-            queryset = Product.objects.select_related(
-                'vendor',
-                'vendor__vendor_profile',
-            ).filter(
-                vendor__kyc__verification_status='approved'
+            user = request.user
+            user_institution = user.institution if user.is_authenticated else None
+
+            return catalog_cache.cached_response(
+                'all_products',
+                self._cache_scopes(request, filters),
+                request,
+                lambda: self._build_response(request, filters),
+                extra={'user_institution': user_institution},
             )
 
-            queryset = self._apply_school_filter(queryset, request, filters)
-            queryset = self._apply_common_filters(queryset, filters)
-            queryset = self._apply_sorting(queryset, filters['sort'])
-
-            return self._paginate_and_serialize(queryset, request, filters)
-
         except Exception as e:
             return self._handle_error(e)
 
+    def _build_response(self, request, filters):
+        queryset = Product.objects.select_related(
+            'vendor',
+            'vendor__vendor_profile',
+        ).filter(
+            kyc_approved=True
+        )
+
+        queryset = self._apply_school_filter(queryset, request, filters)
+        queryset = self._apply_common_filters(queryset, filters)
+        queryset = self._apply_sorting(queryset, filters['sort'])
+
+        return self._paginate_and_serialize(queryset, request, filters)
+
+    def _cache_scopes(self, request, filters):
+        """Cache scopes mirror _apply_school_filter: one school, or every school."""
+        user = request.user
+        if user.is_authenticated and not filters['view_other_products']:
+            institution = user.institution
+        else:
+            institution = filters['school']
+
+        scopes = [catalog_cache.ALL_INSTITUTIONS]
+        if institution:
+            scopes = [catalog_cache.institution_scope(institution)]
+        if user.is_authenticated:
+            # user_institution_product_count always looks at the user's own school
+            scopes.append(catalog_cache.institution_scope(user.institution))
+        return scopes
+
     # ── Filters ────────────────────────────────────────────────────────────────
 
     def _apply_school_filter(self, queryset, request, filters):
@@ -848,16 +902,16 @@ class AllProductsView(APIView):
             if filters['view_other_products']:
                 if filters['school']:
                     queryset = queryset.filter(
-                        vendor__institution__iexact=filters['school']
+                        institution_key=location_key(filters['school'])
                     )
             else:
                 queryset = queryset.filter(
-                    vendor__institution__iexact=user.institution
+                    institution_key=location_key(user.institution)
                 )
         else:
             if filters['school']:
                 queryset = queryset.filter(
-                    vendor__institution__iexact=filters['school']
+                    institution_key=location_key(filters['school'])
                 )
         return queryset
 
@@ -873,14 +927,11 @@ class AllProductsView(APIView):
         )
 
         if filters['search']:
-            queryset = queryset.filter(
-                Q(name__icontains=filters['search']) |
-                Q(description__icontains=filters['search'])
-            )
+            queryset = search.filter_products(queryset, filters['search'])
 
         if filters['state']:
             queryset = queryset.filter(
-                vendor__state__iexact=filters['state']
+                state_key=location_key(filters['state'])
             )
 
         if filters['vendor']:
@@ -892,8 +943,14 @@ class AllProductsView(APIView):
         sort_map = {
             'price_low':  'price',
             'price_high': '-price',
-            'rating':     '-vendor__rating',
+            'rating':     '-vendor_rating',
         }
+        if sort_option == 'rating':
+            # Vendors without a profile sort as unrated instead of as NULL,
+            # so the column can also anchor a keyset cursor
+            queryset = queryset.annotate(
+                vendor_rating=Coalesce('vendor__vendor_profile__rating', Value(Decimal('0.00')))
+            )
         return queryset.order_by(sort_map.get(sort_option, '-created_at'))
 
     # ── Params ─────────────────────────────────────────────────────────────────
@@ -925,31 +982,53 @@ class AllProductsView(APIView):
             # vendor param is now an ID (int) coming from the dropdown
             'vendor':              params.get('vendor', '').strip(),
             'view_other_products': params.get('viewOtherProducts', '').lower() == 'true',
+            # cursor mode only: 'approximate' (cached) or 'none'
+            'count':               params.get('count', 'approximate').strip().lower(),
         }
 
     # ── Pagination & serialization ─────────────────────────────────────────────
 
+    # Keyset orderings — each ends in the pk as a tie-breaker. The price and
+    # default orderings match an existing Product index, so cursor pages are
+    # index range scans; rating sorts on the annotation _apply_sorting adds.
+    KEYSET_ORDERINGS = {
+        'price_low':  ('price', '-created_at', '-id'),
+        'price_high': ('-price', '-created_at', '-id'),
+        'rating':     ('-vendor_rating', '-created_at', '-id'),
+    }
+    DEFAULT_KEYSET_ORDERING = ('-created_at', '-id')
+
     def _paginate_and_serialize(self, queryset, request, filters):
-        paginator = self.pagination_class()
-        paginated_products = paginator.paginate_queryset(queryset, request)
+        if KeysetPagination.is_requested(request):
+            ordering = self.KEYSET_ORDERINGS.get(filters['sort'], self.DEFAULT_KEYSET_ORDERING)
+            paginator = KeysetPagination(ordering)
+            paginated_products = paginator.paginate_queryset(queryset, request)
+        else:
+            paginator = self.pagination_class()
+            paginated_products = paginator.paginate_queryset(queryset, request)
 
         serializer = ProductCardSerializer(
             paginated_products,
             many=True,
             context={'request': request},
         )
-        response = paginator.get_paginated_response(serializer.data)
 
-        # DRF paginator already provides `count` (total rows) — no extra .count() needed
+        if isinstance(paginator, KeysetPagination):
+            count = cached_count(queryset) if filters['count'] == 'approximate' else None
+            response = paginator.get_paginated_response(serializer.data, count=count)
+        else:
+            # DRF paginator already provides `count` (total rows) — no extra .count() needed
+            response = paginator.get_paginated_response(serializer.data)
+
         response.data['user_institution'] = (
             request.user.institution if request.user.is_authenticated else None
         )
         response.data['view_other_products'] = filters['view_other_products']
 
         response.data['user_institution_product_count'] = (
-            queryset.filter(
-                vendor__institution__iexact=request.user.institution
-            ).count()
+            cached_count(
+                queryset.filter(institution_key=location_key(request.user.institution))
+            )
             if request.user.is_authenticated
             else None
         )
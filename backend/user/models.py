@@ -372,11 +372,7 @@ class KYCVerification(models.Model):
             if hasattr(self.user, 'vendor_profile'):
                 self.user.vendor_profile.is_verified = True
                 self.user.vendor_profile.save()
-                # Denormalize KYC status onto all products
-                self.user.products.update(kyc_approved=True)
-        elif self.verification_status == 'rejected':
-            if hasattr(self.user, 'vendor_profile'):
-                self.user.products.update(kyc_approved=False)
+        # Product.kyc_approved follows via stumart.signals once the row is saved
         super().save(*args, **kwargs)
 
 
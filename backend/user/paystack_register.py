@@ -8,8 +8,9 @@ import logging
 from django.conf import settings
 from typing import Dict, Optional, Tuple
 
-logger = logging.getLogger(__name__)
+from stumart import gateways
 
+logger = logging.getLogger(__name__)
 
 class PaystackTransferService:
     """Service class for handling Paystack transfers"""
@@ -23,7 +24,9 @@ class PaystackTransferService:
         'bank of agriculture': 'BOA',
     }
     
-    def __init__(self):
+    def __init__(self, client: Optional[gateways.GatewayClient] = None):
+        self.http = client or gateways.paystack()
+        self.BASE_URL = self.http.base_url
         self.secret_key = settings.PAYSTACK_SECRET_KEY
         self.headers = {
             "Authorization": f"Bearer {self.secret_key}",
@@ -62,7 +65,7 @@ class PaystackTransferService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers, timeout=30)
+            response = self.http.post(url, json=payload, headers=self.headers)
             data = response.json()
             
             if response.status_code == 201 and data.get("status"):
@@ -92,7 +95,7 @@ class PaystackTransferService:
         url = f"{self.BASE_URL}/bank"
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.http.get(url, headers=self.headers)
             data = response.json()
             
             if response.status_code == 200 and data.get("status"):
@@ -146,7 +149,7 @@ class PaystackTransferService:
         }
         
         try:
-            response = requests.get(url, params=params, headers=self.headers, timeout=30)
+            response = self.http.get(url, params=params, headers=self.headers)
             data = response.json()
             
             if response.status_code == 200 and data.get("status"):
@@ -184,7 +187,8 @@ class PaystackTransferService:
             payload["reference"] = reference
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers, timeout=30)
+            # A transfer carrying a reference is idempotent on Paystack's side, so it is safe to retry
+            response = self.http.post(url, json=payload, headers=self.headers, idempotent=bool(reference))
             data = response.json()
             
             if response.status_code == 200 and data.get("status"):
@@ -206,7 +210,7 @@ class PaystackTransferService:
         url = f"{self.BASE_URL}/transfer/verify/{reference}"
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.http.get(url, headers=self.headers)
             data = response.json()
             
             if response.status_code == 200 and data.get("status"):
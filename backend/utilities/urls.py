@@ -7,6 +7,9 @@ urlpatterns = [
     path('admin/download/vendors/', views.DownloadVendorsListView.as_view(), name='download_vendors'),
     path('admin/download/pickers/', views.DownloadPickersListView.as_view(), name='download_pickers'),
     path('admin/download/transactions/', views.DownloadTransactionsListView.as_view(), name='download_transactions'),
+    path('admin/export/<str:dataset>/', views.StreamingExportView.as_view(), name='streaming_export'),
+    path('admin/cache/stats/', views.CacheStatsView.as_view(), name='cache_stats'),
+    path('admin/gateways/stats/', views.GatewayStatsView.as_view(), name='gateway_stats'),
     path('admin/send/kyc-reminder/', views.SendKYCReminderView.as_view(), name='send_kyc_reminder'),
     path('admin/send/product-reminder/', views.SendProductReminderView.as_view(), name='send_product_reminder'),
     path('admin/send/newsletter/', views.SendNewsletterView.as_view(), name='send_newsletter'),
@@ -21,6 +21,8 @@ from django.utils.html import strip_tags
 
 from user.models import User, Vendor, Picker, StudentPicker, KYCVerification, Student
 from user.serializers import UserSerializer  # Assuming you have serializers
+from .exports import ExportError, streaming_export
+from stumart import caching, gateways
 
 
 class DownloadUsersListView(APIView):
@@ -275,6 +277,39 @@ class DownloadTransactionsListView(APIView):
 
 
 
+class StreamingExportView(APIView):
+    """
+    Stream orders, payments, wallet transactions or withdrawals as CSV or
+    NDJSON (see utilities/exports.py for datasets and filters)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, dataset):
+        try:
+            return streaming_export(dataset, request.query_params)
+        except ExportError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class GatewayStatsView(APIView):
+    """Call counts, failures, retries, latency and circuit state per payment/SMS gateway (this worker only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(gateways.stats())
+
+
+class CacheStatsView(APIView):
+    """Hits, misses, stale serves, rebuilds and lock waits per cache namespace (this worker only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(caching.stats())
+
+
 class SendKYCReminderView(APIView):
     """Send KYC reminder to users without KYC verification"""
     permission_classes = [IsAdminUser]
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import PickerWalletAccount, StudentPickerWalletAccount, WalletTransactionAccount,StumartWalletAccount, CompanyWallet, VendorWallets, WithdrawalRequest, DeliveryOpportunity
+from .models import PickerWalletAccount, StudentPickerWalletAccount, WalletTransactionAccount,StumartWalletAccount, CompanyWallet, VendorWallets, WithdrawalRequest, DeliveryOpportunity, JournalEntry, PlatformWalletShard
 
 @admin.register(WalletTransactionAccount)
 class WalletTransactionAdmin(admin.ModelAdmin):
@@ -54,3 +54,21 @@ class DeliveryOpportunityAdmin(admin.ModelAdmin):
     search_fields = ('order__order_number', 'user_picker__email', 'company_rider__name')
     # readonly_fields = ('created_at', 'updated_at')
 
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'account', 'amount', 'transaction', 'memo', 'created_at')
+    list_filter = ('account',)
+    search_fields = ('account', 'memo')
+    raw_id_fields = ('transaction',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(PlatformWalletShard)
+class PlatformWalletShardAdmin(admin.ModelAdmin):
+    list_display = ('shard', 'balance', 'total_tax_collected', 'total_commission_collected', 'updated_at')
+    readonly_fields = ('updated_at',)
@@ -0,0 +1,222 @@
+# ledger.py
+"""
+Wallet ledger.
+
+Balances used to be changed with read-modify-write ``save()`` calls, so two
+requests crediting the same wallet could lose one of the updates, and every
+order completion serialized on the single ``StumartWalletAccount`` row.
+All balance movements now go through this module:
+
+    wallets     ``credit`` / ``debit`` apply the change with one
+                ``UPDATE ... SET balance = balance + x`` (F expression), so
+                concurrent movements never overwrite each other; ``debit``
+                can refuse to take a wallet below zero in the same statement.
+    platform    tax and commission land on one of ``PLATFORM_SHARDS``
+                ``PlatformWalletShard`` rows picked at random, so concurrent
+                completions rarely touch the same row. ``StumartWalletAccount``
+                is the folded running total; ``platform_totals`` adds the
+                unfolded shards on top.
+    journal     each movement appends two ``JournalEntry`` lines that sum to
+                zero — the wallet's account and its contra account
+                (``external`` for money entering or leaving through
+                Paystack) — linked to the ``WalletTransactionAccount`` row
+                that explains it when there is one.
+
+``python manage.py reconcile_wallets`` folds the platform shards and checks
+every wallet's stored balance against its journal total.
+
+Account names: ``vendor:<wallet id>``, ``picker:<id>``, ``student_picker:<id>``,
+``company:<id>``, ``platform:tax``, ``platform:commission``, ``external``,
+``adjustment``.
+"""
+import logging
+import random
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import (
+    CompanyWallet, JournalEntry, PickerWalletAccount, PlatformWalletShard,
+    StudentPickerWalletAccount, StumartWalletAccount, VendorWallets,
+)
+
+logger = logging.getLogger(__name__)
+
+EXTERNAL = 'external'
+ADJUSTMENT = 'adjustment'
+PLATFORM_ACCOUNTS = {'tax': 'platform:tax', 'commission': 'platform:commission'}
+PLATFORM_SHARDS = 8
+
+# wallet model -> (account prefix, balance field)
+WALLETS = {
+    VendorWallets: ('vendor', 'balance'),
+    CompanyWallet: ('company', 'balance'),
+    PickerWalletAccount: ('picker', 'amount'),
+    StudentPickerWalletAccount: ('student_picker', 'amount'),
+}
+
+
+class InsufficientFunds(Exception):
+    """A debit would take the wallet below zero."""
+
+
+def _money(amount):
+    return Decimal(str(amount))
+
+
+def account_for(wallet):
+    prefix, _ = WALLETS[type(wallet)]
+    return f"{prefix}:{wallet.pk}"
+
+
+def wallet_for_user(user):
+    """The wallet row for ``user`` by user type (created if missing), or None."""
+    if user.user_type == 'vendor':
+        return VendorWallets.objects.get_or_create(vendor=user.vendor_profile)[0]
+    if user.user_type == 'picker':
+        return PickerWalletAccount.objects.get_or_create(picker=user.picker_profile)[0]
+    if user.user_type == 'student_picker':
+        return StudentPickerWalletAccount.objects.get_or_create(student_picker=user.student_picker_profile)[0]
+    if user.user_type == 'company':
+        return CompanyWallet.objects.get_or_create(company=user.company_profile)[0]
+    return None
+
+
+def journal_lines(amount, account, contra=EXTERNAL, transaction=None, memo=''):
+    """The balanced pair of (unsaved) journal lines for one movement."""
+    return [
+        JournalEntry(account=account, amount=amount, transaction=transaction, memo=memo[:255]),
+        JournalEntry(account=contra, amount=-amount, transaction=transaction, memo=memo[:255]),
+    ]
+
+
+# ── Wallets ───────────────────────────────────────────────────────────────────
+
+def credit(wallet, amount, transaction=None, memo='', contra=EXTERNAL):
+    """Add ``amount`` to ``wallet`` atomically and journal it. Refreshes the in-memory balance."""
+    amount = _money(amount)
+    _, field = WALLETS[type(wallet)]
+    with db_transaction.atomic():
+        type(wallet).objects.filter(pk=wallet.pk).update(
+            **{field: F(field) + amount, 'updated_at': timezone.now()}
+        )
+        JournalEntry.objects.bulk_create(journal_lines(amount, account_for(wallet), contra, transaction, memo))
+    wallet.refresh_from_db(fields=[field])
+    return wallet
+
+
+def debit(wallet, amount, transaction=None, memo='', contra=EXTERNAL, allow_negative=False):
+    """
+    Take ``amount`` from ``wallet`` atomically and journal it. Unless
+    ``allow_negative``, the balance check and the update are one statement,
+    so two concurrent withdrawals cannot both spend the same money.
+    """
+    amount = _money(amount)
+    _, field = WALLETS[type(wallet)]
+    rows = type(wallet).objects.filter(pk=wallet.pk)
+    if not allow_negative:
+        rows = rows.filter(**{f"{field}__gte": amount})
+    with db_transaction.atomic():
+        if not rows.update(**{field: F(field) - amount, 'updated_at': timezone.now()}):
+            raise InsufficientFunds(f"{account_for(wallet)} cannot cover ₦{amount}")
+        JournalEntry.objects.bulk_create(journal_lines(-amount, account_for(wallet), contra, transaction, memo))
+    wallet.refresh_from_db(fields=[field])
+    return wallet
+
+
+# ── Platform wallet ───────────────────────────────────────────────────────────
+
+def platform_credit(kind, amount, transaction=None, memo=''):
+    """Credit platform ``kind`` ('tax' or 'commission') on a random shard and journal it."""
+    amount = _money(amount)
+    total_field = f"total_{kind}_collected"
+    shard = random.randrange(PLATFORM_SHARDS)
+    with db_transaction.atomic():
+        updated = PlatformWalletShard.objects.filter(shard=shard).update(
+            balance=F('balance') + amount, **{total_field: F(total_field) + amount},
+        )
+        if not updated:
+            PlatformWalletShard.objects.get_or_create(shard=shard)
+            PlatformWalletShard.objects.filter(shard=shard).update(
+                balance=F('balance') + amount, **{total_field: F(total_field) + amount},
+            )
+        JournalEntry.objects.bulk_create(journal_lines(amount, PLATFORM_ACCOUNTS[kind], EXTERNAL, transaction, memo))
+
+
+def platform_totals():
+    """Folded platform totals plus whatever the shards hold right now. Two small reads."""
+    wallet = StumartWalletAccount.get_instance()
+    shards = PlatformWalletShard.objects.aggregate(
+        balance=Sum('balance'), tax=Sum('total_tax_collected'), commission=Sum('total_commission_collected'),
+    )
+    return {
+        'balance': wallet.balance + (shards['balance'] or 0),
+        'total_tax_collected': wallet.total_tax_collected + (shards['tax'] or 0),
+        'total_commission_collected': wallet.total_commission_collected + (shards['commission'] or 0),
+    }
+
+
+def fold_platform_shards():
+    """Move shard totals into StumartWalletAccount and zero the shards. Returns the amount folded."""
+    with db_transaction.atomic():
+        shards = list(PlatformWalletShard.objects.select_for_update())
+        balance = sum((s.balance for s in shards), Decimal('0'))
+        tax = sum((s.total_tax_collected for s in shards), Decimal('0'))
+        commission = sum((s.total_commission_collected for s in shards), Decimal('0'))
+        if not (balance or tax or commission):
+            return Decimal('0')
+
+        StumartWalletAccount.get_instance()
+        StumartWalletAccount.objects.filter(pk=1).update(
+            balance=F('balance') + balance,
+            total_tax_collected=F('total_tax_collected') + tax,
+            total_commission_collected=F('total_commission_collected') + commission,
+            updated_at=timezone.now(),
+        )
+        PlatformWalletShard.objects.filter(pk__in=[s.pk for s in shards]).update(
+            balance=0, total_tax_collected=0, total_commission_collected=0,
+        )
+    return balance
+
+
+# ── Reconciliation ────────────────────────────────────────────────────────────
+
+def journal_balances():
+    """``{account: journal total}`` in one GROUP BY."""
+    rows = JournalEntry.objects.values('account').annotate(total=Sum('amount')).order_by()
+    return {row['account']: row['total'] for row in rows}
+
+
+def reconcile(fix=False):
+    """
+    Compare every wallet's stored balance with its journal total. Returns
+    ``[(account, stored, journaled)]`` for the ones that differ; with ``fix``
+    an adjustment pair is journaled for each so the journal matches the
+    stored balance (the first run uses this to open balances that predate
+    the journal).
+    """
+    journaled = journal_balances()
+    drift = []
+    for model, (prefix, field) in WALLETS.items():
+        for pk, stored in model.objects.values_list('pk', field).iterator(chunk_size=2000):
+            account = f"{prefix}:{pk}"
+            expected = journaled.get(account, Decimal('0'))
+            if stored != expected:
+                drift.append((account, stored, expected))
+
+    totals = platform_totals()
+    platform_journaled = sum((journaled.get(a, Decimal('0')) for a in PLATFORM_ACCOUNTS.values()), Decimal('0'))
+    if totals['balance'] != platform_journaled:
+        drift.append(('platform', totals['balance'], platform_journaled))
+
+    if drift:
+        logger.warning("Wallet ledger drift on %d accounts", len(drift))
+    if fix and drift:
+        lines = []
+        for account, stored, expected in drift:
+            target = PLATFORM_ACCOUNTS['commission'] if account == 'platform' else account
+            lines += journal_lines(stored - expected, target, ADJUSTMENT, memo='Reconciliation adjustment')
+        JournalEntry.objects.bulk_create(lines, batch_size=1000)
+    return drift
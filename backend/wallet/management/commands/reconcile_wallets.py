@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from wallet.ledger import fold_platform_shards, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Fold the platform wallet shards and check wallet balances against the journal'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Journal an adjustment for every drifted account (use once to open pre-ledger balances)'
+        )
+
+    def handle(self, *args, **options):
+        folded = fold_platform_shards()
+        self.stdout.write(f"Folded ₦{folded} from platform wallet shards")
+
+        drift = reconcile(fix=options['fix'])
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("✓ All wallet balances match the journal"))
+            return
+
+        for account, stored, journaled in drift:
+            self.stdout.write(
+                self.style.WARNING(f"{account}: stored ₦{stored}, journal ₦{journaled} (drift ₦{stored - journaled})")
+            )
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Journaled adjustments for {len(drift)} account(s)"))
+        else:
+            self.stdout.write(self.style.ERROR(f"✗ {len(drift)} account(s) drifted; rerun with --fix to adjust"))
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformWalletShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(unique=True)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_tax_collected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_commission_collected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'wallet_platform_shards',
+                'ordering': ['shard'],
+            },
+        ),
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=50)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('memo', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='journal_entries', to='wallet.wallettransactionaccount')),
+            ],
+            options={
+                'db_table': 'wallet_journal',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['account', 'id'], name='journal_account_idx')],
+            },
+        ),
+    ]
@@ -91,23 +91,21 @@ class StumartWalletAccount(models.Model):
         return wallet
 
     
-    def add_tax(self, amount):
-        """Add tax amount to the wallet"""
+    def add_tax(self, amount, transaction=None):
+        """Add tax amount to the platform wallet (lands on a shard, see wallet/ledger.py)"""
+        from .ledger import platform_credit
         amount = Decimal(str(amount))
-        self.balance = Decimal(str(self.balance))  # Ensure balance is Decimal
-        self.balance += amount
-        self.total_tax_collected = Decimal(str(self.total_tax_collected))
-        self.total_tax_collected += amount
-        self.save()
-
-    def add_commission(self, amount):
-        """Add commission amount to the wallet"""
+        platform_credit('tax', amount, transaction=transaction)
+        self.balance = Decimal(str(self.balance)) + amount
+        self.total_tax_collected = Decimal(str(self.total_tax_collected)) + amount
+
+    def add_commission(self, amount, transaction=None):
+        """Add commission amount to the platform wallet (lands on a shard, see wallet/ledger.py)"""
+        from .ledger import platform_credit
         amount = Decimal(str(amount))
-        self.balance = Decimal(str(self.balance))  # Ensure balance is Decimal
-        self.balance += amount
-        self.total_commission_collected = Decimal(str(self.total_commission_collected))
-        self.total_commission_collected += amount
-        self.save()
+        platform_credit('commission', amount, transaction=transaction)
+        self.balance = Decimal(str(self.balance)) + amount
+        self.total_commission_collected = Decimal(str(self.total_commission_collected)) + amount
 
 
 class CompanyWallet(models.Model):
@@ -192,4 +190,56 @@ class WalletTransactionAccount(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.get_transaction_type_display()} - ₦{self.amount} - {self.user.email}"
\ No newline at end of file
+        return f"{self.get_transaction_type_display()} - ₦{self.amount} - {self.user.email}"
+
+class JournalEntry(models.Model):
+    """
+    One line of the double-entry wallet journal (see wallet/ledger.py).
+    Every balance movement writes two lines that sum to zero; lines are
+    append-only, corrections are new lines.
+    """
+    account = models.CharField(max_length=50)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    transaction = models.ForeignKey(
+        WalletTransactionAccount, null=True, blank=True, on_delete=models.CASCADE, related_name='journal_entries'
+    )
+    memo = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'wallet_journal'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['account', 'id'], name='journal_account_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account} {self.amount:+}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Journal entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Journal entries are append-only")
+
+
+class PlatformWalletShard(models.Model):
+    """
+    Slice of the platform wallet. Order completions credit a random shard
+    with an F() update instead of all contending on the StumartWalletAccount
+    row; ``reconcile_wallets`` folds the shards back into that row.
+    """
+    shard = models.PositiveSmallIntegerField(unique=True)
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_tax_collected = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_commission_collected = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'wallet_platform_shards'
+        ordering = ['shard']
+
+    def __str__(self):
+        return f"Platform wallet shard {self.shard}: ₦{self.balance}"
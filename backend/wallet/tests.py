@@ -1,3 +1,23 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from wallet.ledger import journal_lines
+from wallet.models import JournalEntry
+
+
+class JournalTest(SimpleTestCase):
+    def test_movements_are_balanced(self):
+        lines = journal_lines(Decimal('150.00'), 'vendor:7', memo='Order #1 payment')
+
+        self.assertEqual([line.account for line in lines], ['vendor:7', 'external'])
+        self.assertEqual(sum(line.amount for line in lines), 0)
+
+    def test_entries_are_append_only(self):
+        entry = JournalEntry(account='vendor:7', amount=Decimal('1.00'))
+        entry._state.adding = False
+
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
@@ -6,7 +6,6 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from stumart.models import *
 from stumart.serializers import *
 import uuid
-import requests
 import json
 from django.conf import settings
 from django.utils.timezone import now
@@ -25,6 +24,8 @@ from rest_framework import generics
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
 from stumart.paginations import CustomPagination
+from stumart import gateways
+from wallet import ledger as wallet_ledger
 from django.db import transaction
 import string
 import random
@@ -423,7 +424,7 @@ class PaystackPaymentInitializeView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # If validation passes, proceed with Paystack payment initialization
-            url = "https://api.paystack.co/transaction/initialize"
+            url = "/transaction/initialize"
             headers = {
                 "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
                 "Content-Type": "application/json"
@@ -435,7 +436,7 @@ class PaystackPaymentInitializeView(APIView):
                 "reference": f"ORD-{order.order_number}-{uuid.uuid4().hex[:8]}"
             }
             
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
+            response = gateways.paystack().post(url, headers=headers, data=json.dumps(payload))
             response_data = response.json()
             
             if response_data.get('status'):
@@ -512,13 +513,13 @@ class PaystackPaymentVerifyView(APIView):
                 }, status=status.HTTP_200_OK)
             
             # Only verify with Paystack if transaction hasn't been completed
-            url = f"https://api.paystack.co/transaction/verify/{reference}"
+            url = f"/transaction/verify/{reference}"
             headers = {
                 "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
                 "Content-Type": "application/json"
             }
 
-            response = requests.get(url, headers=headers)
+            response = gateways.paystack().get(url, headers=headers)
             response_data = response.json()
 
             if not response_data.get('status'):
@@ -2265,8 +2266,7 @@ class CustomerConfirmationView(APIView):
                     company=company,
                     defaults={'balance': Decimal('0')}
                 )
-                company_wallet.balance += rider_earnings  # Company gets the rider earnings
-                company_wallet.save()
+                wallet_ledger.credit(company_wallet, rider_earnings, memo=f"Rider earnings for order #{order.order_number}")  # Company gets the rider earnings
                 
                 # Add commission to Stumart earnings
                 stumart_earnings += company_commission
@@ -2290,8 +2290,7 @@ class CustomerConfirmationView(APIView):
                         picker=picker.picker_profile,
                         defaults={'amount': Decimal('0')}
                     )
-                    picker_wallet.amount += shipping_fee
-                    picker_wallet.save()
+                    wallet_ledger.credit(picker_wallet, shipping_fee, memo=f"Delivery for order #{order.order_number}")
                     
                     # Update picker stats
                     picker.picker_profile.total_deliveries += 1
@@ -2302,8 +2301,7 @@ class CustomerConfirmationView(APIView):
                         student_picker=picker.student_picker_profile,
                         defaults={'amount': Decimal('0')}
                     )
-                    picker_wallet.amount += shipping_fee
-                    picker_wallet.save()
+                    wallet_ledger.credit(picker_wallet, shipping_fee, memo=f"Delivery for order #{order.order_number}")
                     
                     # Update student picker stats
                     picker.student_picker_profile.total_deliveries += 1
@@ -2392,8 +2390,7 @@ class CustomerConfirmationView(APIView):
                         vendor=vendor,
                         defaults={'balance': Decimal('0')}
                     )
-                    wallet.balance += amount
-                    wallet.save()
+                    wallet_ledger.credit(wallet, amount, memo=f"Order #{order.order_number} payment")
                     
                     logger.info(f"Updated wallet for vendor {vendor_id}, credited: ₦{amount}")
                     